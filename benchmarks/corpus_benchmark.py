@@ -0,0 +1,129 @@
+"""
+以錄製的結果頁面樣本測試解析與匯出
+
+讀取 PageRecorder 保存的樣本（預設為 fixtures/pages，於 main.py 設定 RECORD_PAGES = True 後查詢即會錄製），
+離線執行：
+1. 解析：逐頁呼叫 ExcelExporter.add_data()，量測耗時，並與錄製時的解析結果比對
+2. 匯出：以全部樣本的資料匯出指定格式，量測耗時
+
+使用方式：
+    python benchmarks/corpus_benchmark.py
+    python benchmarks/corpus_benchmark.py --fixtures fixtures/pages --repeat 3 --formats xlsx csv --json corpus.json
+
+任一頁面的解析結果與錄製時不同時，程式以結束代碼 1 結束，可用於確認解析器修改後結果不變。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from page_recorder import PageRecorder
+
+
+def load_corpus(fixture_dir):
+    """讀取所有樣本，回傳 [(中繼資料, HTML)]"""
+    return [(entry, PageRecorder.read_page(fixture_dir, entry)) for entry in PageRecorder.load_index(fixture_dir)]
+
+
+def parse_corpus(corpus, repeat):
+    """
+    逐頁解析，回傳每頁的耗時中位數、解析結果不同的頁面與最後一次解析的匯出器
+    """
+    from excel_exporter import ExcelExporter
+
+    timings = {}
+    mismatches = []
+    exporter = None
+    for run in range(repeat):
+        exporter = ExcelExporter()
+        for entry, html in corpus:
+            if entry['no_result']:
+                continue
+            start = time.perf_counter()
+            exporter.add_data(entry['alias'], html)
+            timings.setdefault(entry['alias'], []).append(time.perf_counter() - start)
+
+            if run == 0:
+                parsed = exporter.projects_data[-1]
+                actual = {'info': parsed['info'], 'subtotals': parsed['subtotals']}
+                if actual != entry['expected']:
+                    mismatches.append(entry['alias'])
+    return {alias: statistics.median(values) for alias, values in timings.items()}, mismatches, exporter
+
+
+def export_corpus(exporter, formats, repeat):
+    """以解析後的資料匯出各格式，回傳每種格式的耗時中位數"""
+    from excel_exporter import EXPORT_FORMATS
+
+    output_dir = tempfile.mkdtemp(prefix='itouch_corpus_')
+    try:
+        timings = {}
+        for export_format in formats:
+            method = getattr(exporter, EXPORT_FORMATS[export_format]['method'])
+            values = []
+            for run in range(repeat):
+                start = time.perf_counter()
+                method(output_dir, f'{export_format}_{run}')
+                values.append(time.perf_counter() - start)
+            timings[export_format] = statistics.median(values)
+        return timings
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以錄製的頁面樣本量測解析與匯出，並比對解析結果')
+    parser.add_argument('--fixtures', default=os.path.join(PROJECT_DIR, 'fixtures', 'pages'), help='樣本資料夾')
+    parser.add_argument('--repeat', type=int, default=3, help='重複量測次數，取中位數')
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], help='匯出格式（delta 需要歷史資料，不適用）')
+    parser.add_argument('--top', type=int, default=5, help='列出解析最慢的前幾個頁面')
+    parser.add_argument('--json', help='將結果寫入指定的 JSON 檔案')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.fixtures)
+    if not corpus:
+        print(f"找不到頁面樣本: {args.fixtures}")
+        return 1
+    entries = {entry['alias']: entry for entry, _ in corpus}
+
+    parse_times, mismatches, exporter = parse_corpus(corpus, args.repeat)
+    total_parse = sum(parse_times.values())
+    total_bytes = sum(entries[alias]['size'] for alias in parse_times)
+    print(f"樣本 {len(corpus)} 頁（有資料 {len(parse_times)} 頁，共 {total_bytes / (1024 * 1024):.1f} MB，"
+          f"明細 {sum(entries[alias]['rows'] for alias in parse_times)} 列）")
+    if parse_times:
+        print(f"解析: 合計 {total_parse * 1000:.1f} ms，每頁中位數 {statistics.median(parse_times.values()) * 1000:.1f} ms，"
+              f"{total_bytes / (1024 * 1024) / total_parse:.1f} MB/秒")
+        for alias, seconds in sorted(parse_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            entry = entries[alias]
+            print(f"  {alias}: {seconds * 1000:8.1f} ms（{entry['rows']} 列，{entry['size'] / 1024:.0f} KB）")
+
+    export_times = export_corpus(exporter, args.formats, args.repeat) if exporter and exporter.projects_data else {}
+    for export_format, seconds in export_times.items():
+        print(f"匯出 {export_format}: {seconds * 1000:.1f} ms")
+
+    if mismatches:
+        print(f"解析結果與錄製時不同: {', '.join(mismatches)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fixtures': args.fixtures,
+                'pages': len(corpus),
+                'parse_seconds': parse_times,
+                'export_seconds': export_times,
+                'mismatches': mismatches
+            }, f, ensure_ascii=False, indent=2)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
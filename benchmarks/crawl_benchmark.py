@@ -0,0 +1,213 @@
+"""
+端對端查詢效能測試
+
+啟動本機 iTouch 模擬伺服器（benchmarks/mock_itouch.py），以無頭模式執行完整流程：
+登入 → 導航到會計經費查詢 → 依序查詢計畫 → 匯出，並列出：
+1. 每分鐘處理計畫數與各階段 p50/p95 耗時（取自 RunMetrics 的 summary 紀錄）
+2. 查詢期間程式與瀏覽器（chromedriver 與 Chrome 程序）的記憶體用量峰值（需要 psutil）
+
+使用方式：
+    python benchmarks/crawl_benchmark.py
+    python benchmarks/crawl_benchmark.py --plans 100 --rows 20 --max-rows 500 --latency 0.3 --depth 1 2 4 --json crawl.json
+
+計時紀錄、逾時樣本、歷史資料庫、頁面封存與匯出檔案都寫入暫存資料夾，不影響正式使用的資料。
+指定 --min-rate 時，任一同時查詢數的每分鐘處理計畫數低於門檻即以結束代碼 1 結束。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import functools
+import threading
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_itouch import MockItouchServer
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class MemorySampler:
+    """在背景執行緒定期取樣程式與瀏覽器的記憶體用量，記錄峰值（MB）"""
+
+    def __init__(self, browser, interval=0.5):
+        from browser_watchdog import BrowserWatchdog
+        self.watchdog = BrowserWatchdog(browser)
+        self.interval = interval
+        self.process = psutil.Process() if psutil else None
+        self.peak_crawler_mb = None
+        self.peak_browser_mb = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        if self.process is not None:
+            crawler_mb = self.process.memory_info().rss / (1024 * 1024)
+            self.peak_crawler_mb = max(self.peak_crawler_mb or 0.0, crawler_mb)
+        browser_mb = self.watchdog.sample_rss_mb()
+        if browser_mb is not None:
+            self.peak_browser_mb = max(self.peak_browser_mb or 0.0, browser_mb)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.sample()
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='memory-sampler', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.sample()
+        return {'crawler_mb': self.peak_crawler_mb, 'browser_mb': self.peak_browser_mb}
+
+
+def read_summary(metrics):
+    """從計時紀錄檔讀取最近一次查詢的 summary 紀錄"""
+    summary = None
+    with open(metrics.log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            event = json.loads(line)
+            if event.get('type') == 'summary' and event.get('run_id') == metrics.run_id:
+                summary = event
+    return summary
+
+
+def create_crawler(work_dir, login_url, show_browser):
+    """建立隱藏視窗的 ItouchCrawler，並將紀錄與資料檔導向暫存資料夾"""
+    import tkinter as tk
+    import main
+    import excel_exporter
+    from history_store import HistoryStore
+    from page_archive import PageArchive
+    from run_metrics import RunMetrics
+    from timeout_policy import TimeoutPolicy
+
+    root = tk.Tk()
+    root.withdraw()
+    app = main.ItouchCrawler(root)
+    app.DEVELOPER_MODE = show_browser
+    app.ITOUCH_URL = login_url
+    app.metrics = RunMetrics(work_dir)
+    app.timeouts = TimeoutPolicy(os.path.join(work_dir, 'timeouts.json'))
+    app.page_archive = PageArchive(os.path.join(work_dir, 'archive')) if app.ARCHIVE_PAGES else None
+    # 查詢結束時寫入的歷史資料改寫到暫存資料庫
+    excel_exporter.HistoryStore = functools.partial(HistoryStore, os.path.join(work_dir, 'history.db'))
+
+    for entry in (app.username, app.password):
+        entry.delete(0, tk.END)
+        entry.insert(0, 'benchmark')
+    return root, app
+
+
+def format_memory(memory):
+    if memory['crawler_mb'] is None and memory['browser_mb'] is None:
+        return "記憶體: 無法取樣（需安裝 psutil）"
+    crawler = f"{memory['crawler_mb']:.0f} MB" if memory['crawler_mb'] is not None else '-'
+    browser = f"{memory['browser_mb']:.0f} MB" if memory['browser_mb'] is not None else '-'
+    return f"記憶體峰值: 程式 {crawler}，瀏覽器 {browser}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以本機模擬伺服器量測端對端查詢效能')
+    parser.add_argument('--plans', type=int, default=50, help='查詢的計畫數')
+    parser.add_argument('--rows', type=int, default=20, help='每個計畫的明細列數（最少）')
+    parser.add_argument('--max-rows', type=int, help='每個計畫的明細列數（最多）')
+    parser.add_argument('--subjects', type=int, default=5, help='每個計畫的科目數')
+    parser.add_argument('--latency', type=float, default=0.2, help='結果頁的回應延遲（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='結果頁額外的隨機延遲上限（秒）')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='其他頁面的回應延遲（秒）')
+    parser.add_argument('--depth', type=int, nargs='+', default=[1], help='同時查詢數，可指定多個依序量測')
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], help='匯出格式')
+    parser.add_argument('--show-browser', action='store_true', help='顯示瀏覽器（預設為無頭模式）')
+    parser.add_argument('--min-rate', type=float, help='每分鐘處理計畫數的門檻')
+    parser.add_argument('--keep', action='store_true', help='保留暫存資料夾（計時紀錄與匯出檔案）')
+    parser.add_argument('--json', help='將結果寫入指定的 JSON 檔案')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='itouch_benchmark_')
+    server = MockItouchServer(min_rows=args.rows, max_rows=args.max_rows, subjects=args.subjects,
+                              latency=args.latency, jitter=args.jitter, page_latency=args.page_latency).start()
+    plans = [f'B{index:05d}' for index in range(1, args.plans + 1)]
+    results = []
+    root = app = None
+    try:
+        root, app = create_crawler(work_dir, server.login_url, args.show_browser)
+
+        start = time.perf_counter()
+        if not app.login() or not app.navigate_to_query():
+            print("登入模擬伺服器失敗，詳見 logs/error_*.log")
+            return 1
+        print(f"登入並進入查詢系統: {time.perf_counter() - start:.1f} 秒")
+
+        for depth in args.depth:
+            sampler = MemorySampler(app.browser).start()
+            ok = app.run_query_batch(server.years[0], plans, args.formats, depth, output_folder=work_dir)
+            memory = sampler.stop()
+            summary = read_summary(app.metrics)
+            if not ok or summary is None:
+                print(f"同時查詢 {depth}: 查詢失敗，詳見 logs/error_*.log")
+                return 1
+
+            print(f"\n同時查詢 {depth}:")
+            for line in app.metrics.format_summary(summary):
+                print(line)
+            print(format_memory(memory))
+            results.append({
+                'depth': depth,
+                'plans': summary['plans'],
+                'elapsed': summary['elapsed'],
+                'plans_per_minute': summary['plans_per_minute'],
+                'phases': summary['phases'],
+                'counters': summary['counters'],
+                'memory': memory
+            })
+    finally:
+        if app is not None:
+            app.status_bus.stop()
+            if app.page_archive:
+                app.page_archive.close()
+            if app.browser:
+                app.browser.quit()
+        if root is not None:
+            root.destroy()
+        server.stop()
+        if args.keep:
+            print(f"\n暫存資料夾: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    failures = [result['depth'] for result in results
+                if args.min_rate is not None and result['plans_per_minute'] < args.min_rate]
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'plans': args.plans,
+                'server': {'rows': args.rows, 'max_rows': args.max_rows, 'subjects': args.subjects,
+                           'latency': args.latency, 'jitter': args.jitter, 'page_latency': args.page_latency},
+                'results': results,
+                'requests': server.request_counts,
+                'thresholds': {'min_rate': args.min_rate},
+                'failures': failures
+            }, f, ensure_ascii=False, indent=2)
+
+    if failures:
+        print(f"每分鐘處理計畫數低於門檻 {args.min_rate}: 同時查詢 {', '.join(map(str, failures))}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
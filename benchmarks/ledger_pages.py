@@ -0,0 +1,81 @@
+"""
+產生與 iTouch 經費申請明細帳（科目）結果頁面結構相同的 HTML
+
+供模擬伺服器與效能測試使用，版面只保留 ExcelExporter 解析時用到的部分：
+- 第一個 table1：學年度、單位與計畫編號／名稱、目前預算
+- table2：各科目的明細列與「小計」列（金額以 <strong> 標示），最後為預算收支小計
+- 最後一個 table1：可用餘額
+"""
+import random
+import zlib
+
+NO_RESULT_PAGE = '''<html><head><meta charset="utf-8"><title>經費申請明細帳(科目)</title></head>
+<body><p>沒查詢到任何結果</p></body></html>'''
+
+SUBJECT_NAMES = ['業務費', '設備費', '旅運費', '人事費', '耗材費', '雜支', '國外差旅費', '研究生助學金']
+
+
+def plan_seed(plan_code):
+    """以計畫編號產生固定的亂數種子，同一個計畫每次產生的頁面相同"""
+    return zlib.crc32(str(plan_code).encode('utf-8'))
+
+
+def build_ledger_page(year, plan_code, rows=20, subjects=5, seed=None):
+    """
+    產生一個計畫的明細帳頁面
+
+    Args:
+        year: 學年度（如 '113'）
+        plan_code: 計畫編號
+        rows: 明細列數（平均分配到各科目）
+        subjects: 科目數
+        seed: 亂數種子，None 時依計畫編號決定
+
+    Returns:
+        str: 頁面 HTML
+    """
+    rng = random.Random(plan_seed(plan_code) if seed is None else seed)
+    subjects = max(1, subjects)
+    budget = rng.randint(100, 5000) * 1000
+
+    ledger_rows = []
+    spent = 0
+    for index in range(subjects):
+        subject_code = f'5{index + 1:02d}{rng.randint(10, 99)}'
+        subject_name = SUBJECT_NAMES[index % len(SUBJECT_NAMES)]
+        count = rows // subjects + (1 if index < rows % subjects else 0)
+        subtotal = 0
+        for line in range(count):
+            amount = rng.randint(1, 500) * 10
+            subtotal += amount
+            ledger_rows.append(
+                f'<tr><td>{year}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}</td>'
+                f'<td>P{plan_seed(plan_code) % 100000:05d}{index:02d}{line:05d}</td>'
+                f'<td>{subject_code} {subject_name}</td><td>經費請購 第 {line + 1} 筆</td>'
+                f'<td align="right">{amount:,}</td></tr>'
+            )
+        spent += subtotal
+        ledger_rows.append(
+            f'<tr><td colspan="3">{subject_code} {subject_name}小計</td><td></td>'
+            f'<td align="right"><strong>{subtotal:,}</strong></td></tr>'
+        )
+    ledger_rows.append(
+        f'<tr><td colspan="3">預算收支小計</td><td></td><td align="right"><strong>{spent:,}</strong></td></tr>'
+    )
+
+    return f'''<html><head><meta charset="utf-8"><title>經費申請明細帳(科目)</title></head>
+<body>
+<a href="/finance/">年度與報表選擇</a>
+<table id="table1">
+<tr><td colspan="2">中原大學 {year} 學年度 經費申請明細帳(科目)</td></tr>
+<tr><td>單位：A{plan_seed(plan_code) % 1000:03d} 測試單位</td><td>計畫編號：{plan_code}</td><td>計畫名稱：模擬計畫 {plan_code}</td></tr>
+<tr><td>目前預算</td><td>{budget:,}</td></tr>
+</table>
+<table id="table2">
+<tr><th>日期</th><th>傳票號碼</th><th>科目</th><th>摘要</th><th>金額</th></tr>
+{chr(10).join(ledger_rows)}
+</table>
+<table id="table1">
+<tr><td>可用餘額</td><td>{budget - spent:,}</td></tr>
+</table>
+</body></html>'''
@@ -0,0 +1,229 @@
+"""
+本機 iTouch 模擬伺服器
+
+依序提供與正式系統相同的頁面流程，讓爬蟲不需連線學校系統即可測試與量測效能：
+登入頁（UserNm／UserPasswd／Submit）→ 首頁與網站地圖 → 請款.授權.查詢系統 → 會計經費查詢（swYear）
+→ 經費申請明細帳(科目)輸入頁（pjNoFrom／pjNoTo）→ 明細帳結果頁。
+結果頁的明細列數與回應延遲可調整，未列在 missing 中的計畫編號一律有資料。
+
+使用方式：
+    python benchmarks/mock_itouch.py --port 8765 --rows 50 --latency 0.3
+    （再將 main.py 的 ITOUCH_URL 改為 http://127.0.0.1:8765/home/）
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ledger_pages import build_ledger_page, plan_seed, NO_RESULT_PAGE
+
+LOGIN_PAGE = '''<html><head><meta charset="utf-8"><title>iTouch</title></head>
+<body>
+<form method="post" action="/home/login">
+帳號 <input type="text" name="UserNm">
+密碼 <input type="password" name="UserPasswd">
+<input type="submit" name="Submit" value="登入">
+</form>
+</body></html>'''
+
+PORTAL_PAGE = '''<html><head><meta charset="utf-8"><title>iTouch</title></head>
+<body>
+<div class="app-header__logo">iTouch</div>
+<button class="info" onclick="document.getElementById('sitemap').style.display='block'">網站地圖</button>
+<div id="sitemap" style="display:none">
+<ul>
+<li class="menuLevel1Folder">會計室
+  <ul><li class="menuLevel2Folder">經費請款系統
+    <ul><li><a href="/query/" target="_blank">請款.授權.查詢系統</a></li></ul>
+  </li></ul>
+</li>
+</ul>
+</div>
+</body></html>'''
+
+QUERY_SYSTEM_PAGE = '''<html><head><meta charset="utf-8"><title>請款.授權.查詢系統</title></head>
+<body><a href="/finance/" target="_blank">會計經費查詢</a></body></html>'''
+
+FINANCE_PAGE = '''<html><head><meta charset="utf-8"><title>會計經費查詢</title></head>
+<body>
+<select name="swYear" onchange="document.getElementById('lblYear').textContent=this.value">
+<option value="">請選擇</option>
+{options}
+</select>
+學年：<span id="lblYear"></span>
+<table><tr>
+<td style="cursor:pointer" onclick="window.open('/ledger/input?year=' + document.getElementById('lblYear').textContent, '_blank')">經費申請明細帳(科目)</td>
+</tr></table>
+</body></html>'''
+
+INPUT_PAGE = '''<html><head><meta charset="utf-8"><title>經費申請明細帳(科目)</title></head>
+<body>
+<a href="/finance/">年度與報表選擇</a>
+<form method="post" action="/ledger/result" target="_blank">
+<input type="hidden" name="year" value="{year}">
+計畫編號 <input type="text" id="pjNoFrom" name="pjNoFrom">
+至 <input type="text" id="pjNoTo" name="pjNoTo"
+    onfocus="if (!this.value) this.value = document.getElementById('pjNoFrom').value">
+<input type="submit" name="Submit" value="查詢">
+</form>
+</body></html>'''
+
+
+class MockItouchServer:
+    """
+    在背景執行緒執行的模擬伺服器
+
+    結果頁依計畫編號產生固定內容，明細列數在 min_rows 與 max_rows 之間；
+    每個結果頁延遲 latency 秒（加上 0～jitter 秒的隨機延遲），其他頁面延遲 page_latency 秒。
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, min_rows=20, max_rows=None, subjects=5,
+                 latency=0.0, jitter=0.0, page_latency=0.0, years=('113', '112', '111'), missing=()):
+        self.min_rows = min_rows
+        self.max_rows = max_rows if max_rows is not None else min_rows
+        self.subjects = subjects
+        self.latency = latency
+        self.jitter = jitter
+        self.page_latency = page_latency
+        self.years = list(years)
+        self.missing = set(missing)
+
+        self.lock = threading.Lock()
+        self.request_counts = {}
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def login_url(self):
+        return f'{self.base_url}/home/'
+
+    def start(self):
+        """於背景執行緒開始服務"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-itouch', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服務"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def count(self, path):
+        with self.lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def rows_for(self, plan_code):
+        """計畫的明細列數（同一個計畫固定）"""
+        return random.Random(plan_seed(plan_code)).randint(self.min_rows, max(self.min_rows, self.max_rows))
+
+    def result_page(self, year, plan_code):
+        """查詢結果頁與回應前的延遲秒數"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if not plan_code or plan_code in self.missing:
+            return NO_RESULT_PAGE, delay
+        return build_ledger_page(year, plan_code, self.rows_for(plan_code), self.subjects), delay
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # 不輸出每個請求的紀錄
+
+            def send_html(self, html, delay=None):
+                time.sleep(server.page_latency if delay is None else delay)
+                body = html.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def redirect(self, location):
+                self.send_response(303)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def read_form(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                data = self.rfile.read(length).decode('utf-8') if length else ''
+                return {key: values[0] for key, values in parse_qs(data).items()}
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                server.count(url.path)
+                if url.path in ('/', '/home', '/home/'):
+                    self.send_html(LOGIN_PAGE)
+                elif url.path == '/home/portal':
+                    self.send_html(PORTAL_PAGE)
+                elif url.path == '/query/':
+                    self.send_html(QUERY_SYSTEM_PAGE)
+                elif url.path == '/finance/':
+                    options = '\n'.join(f'<option value="{year}">{year}</option>' for year in server.years)
+                    self.send_html(FINANCE_PAGE.format(options=options))
+                elif url.path == '/ledger/input':
+                    self.send_html(INPUT_PAGE.format(year=query.get('year', server.years[0])))
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                form = self.read_form()
+                server.count(url.path)
+                if url.path == '/home/login':
+                    if form.get('UserNm') and form.get('UserPasswd'):
+                        self.redirect('/home/portal')
+                    else:
+                        self.send_html(LOGIN_PAGE)
+                elif url.path == '/ledger/result':
+                    plan_code = form.get('pjNoFrom', '').strip()
+                    html, delay = server.result_page(form.get('year', server.years[0]), plan_code)
+                    self.send_html(html, delay)
+                else:
+                    self.send_error(404)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本機 iTouch 模擬伺服器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows', type=int, default=20, help='每個計畫的明細列數（最少）')
+    parser.add_argument('--max-rows', type=int, help='每個計畫的明細列數（最多），未指定時與 --rows 相同')
+    parser.add_argument('--subjects', type=int, default=5, help='每個計畫的科目數')
+    parser.add_argument('--latency', type=float, default=0.0, help='結果頁的回應延遲（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='結果頁額外的隨機延遲上限（秒）')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='其他頁面的回應延遲（秒）')
+    parser.add_argument('--missing', nargs='*', default=[], help='查無資料的計畫編號')
+    args = parser.parse_args()
+
+    server = MockItouchServer(args.host, args.port, args.rows, args.max_rows, args.subjects,
+                              args.latency, args.jitter, args.page_latency, missing=args.missing)
+    print(f"模擬伺服器已啟動: {server.login_url}（Ctrl+C 結束）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+解析與匯出的效能測試（合成資料）
+
+以 benchmarks/ledger_pages.py 產生不同規模的明細帳頁面與計畫資料，分別量測：
+1. 明細列數（預設 10～100000 列）：BeautifulSoup 解析、extract_project_info、extract_subtotals、add_data
+2. 計畫數（預設 1～10000 個）：build_report_frame、export_excel（及 --formats 指定的其他格式）
+每個項目列出耗時中位數，以及以 tracemalloc 量測的記憶體：
+net 為執行後仍保留的配置量，peak 為執行期間的配置峰值。
+
+使用方式：
+    python benchmarks/parser_benchmark.py --save-baseline parser_baseline.json
+    python benchmarks/parser_benchmark.py --baseline parser_baseline.json --tolerance 1.2
+    python benchmarks/parser_benchmark.py --rows 10 1000 --projects 10 1000 --repeat 5
+
+指定 --baseline 時列出與基準的比較，任一項目的耗時或峰值記憶體超過基準的 tolerance 倍即以結束代碼 1 結束。
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ledger_pages import build_ledger_page, SUBJECT_NAMES
+
+YEAR = '113'
+
+# 基準比較時忽略的微小差異（耗時秒數、記憶體 KB），避免極短的項目因誤差被判定為退化
+MIN_SECONDS = 0.005
+MIN_KB = 64
+
+
+def measure(func, repeat, budget):
+    """
+    量測一個項目：先重複計時（不開啟 tracemalloc，避免影響耗時），再以 tracemalloc 執行一次量測記憶體
+
+    Args:
+        func: 不需參數的函式
+        repeat: 最多計時次數，取中位數
+        budget: 累計計時超過此秒數後不再重複（至少執行一次）
+
+    Returns:
+        dict: seconds、net_kb、peak_kb
+    """
+    timings = []
+    while len(timings) < repeat and (not timings or sum(timings) < budget):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {
+        'seconds': statistics.median(timings),
+        'net_kb': (after - before) / 1024,
+        'peak_kb': (peak - before) / 1024
+    }
+
+
+def synthetic_projects(count, subject_pool=200, subjects_per_project=8, seed=0):
+    """產生與 add_data() 結果相同格式的計畫資料（科目從固定的科目清單中隨機選取）"""
+    rng = random.Random(seed)
+    subjects = [f'5{index:04d} {SUBJECT_NAMES[index % len(SUBJECT_NAMES)]}小計' for index in range(subject_pool)]
+    projects = []
+    for index in range(count):
+        budget = rng.randint(100, 5000) * 1000
+        subtotals = {subject: str(rng.randint(1, 5000) * 10)
+                     for subject in rng.sample(subjects, min(subjects_per_project, subject_pool))}
+        projects.append({
+            'info': {
+                '學年度': f'{YEAR}學年度',
+                '計畫編號': f'B{index:05d}',
+                '計畫名稱': f'模擬計畫 {index}',
+                '目前預算': f'{budget:,}',
+                '可用餘額': f'{budget - sum(int(value) for value in subtotals.values()):,}'
+            },
+            'subtotals': subtotals,
+            'fetched_at': datetime(2025, 1, 1).isoformat(timespec='seconds')
+        })
+    return projects
+
+
+def bench_rows(rows, repeat, budget):
+    """量測單一頁面的解析（依明細列數）"""
+    import excel_exporter
+
+    html = build_ledger_page(YEAR, '129101', rows=rows, subjects=max(5, min(50, rows // 20)))
+    exporter = excel_exporter.ExcelExporter()
+    BeautifulSoup = excel_exporter.BeautifulSoup  # 建立 ExcelExporter 時才載入
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def add_data():
+        exporter.projects_data = []
+        exporter.add_data('129101', html)
+
+    return {
+        'soup': measure(lambda: BeautifulSoup(html, 'html.parser'), repeat, budget),
+        'extract_project_info': measure(lambda: exporter.extract_project_info(soup), repeat, budget),
+        'extract_subtotals': measure(lambda: exporter.extract_subtotals(soup), repeat, budget),
+        'add_data': measure(add_data, repeat, budget)
+    }, len(html.encode('utf-8'))
+
+
+def bench_projects(count, formats, output_dir, repeat, budget):
+    """量測報表建立與匯出（依計畫數）"""
+    from excel_exporter import ExcelExporter, EXPORT_FORMATS
+
+    exporter = ExcelExporter()
+    exporter.projects_data = synthetic_projects(count)
+    results = {'build_report_frame': measure(exporter.build_report_frame, repeat, budget)}
+    for export_format in formats:
+        method = getattr(exporter, EXPORT_FORMATS[export_format]['method'])
+        results[f'export_{export_format}'] = measure(lambda: method(output_dir, f'{export_format}_{count}'),
+                                                      repeat, budget)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    與基準比較
+
+    Returns:
+        tuple: (比較結果文字, 退化的項目清單)
+    """
+    lines = []
+    regressions = []
+    for group in ('rows', 'projects'):
+        for size, stages in results[group].items():
+            for stage, current in stages.items():
+                previous = baseline.get(group, {}).get(size, {}).get(stage)
+                if previous is None:
+                    continue
+                time_ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+                peak_ratio = current['peak_kb'] / previous['peak_kb'] if previous['peak_kb'] > 0 else 1.0
+                slower = time_ratio > tolerance and current['seconds'] - previous['seconds'] > MIN_SECONDS
+                larger = peak_ratio > tolerance and current['peak_kb'] - previous['peak_kb'] > MIN_KB
+                mark = ' <- 退化' if slower or larger else ''
+                lines.append(f"  {group}={size:<7} {stage:<22} 耗時 x{time_ratio:5.2f}  峰值記憶體 x{peak_ratio:5.2f}{mark}")
+                if mark:
+                    regressions.append(f'{group}={size} {stage}')
+    return lines, regressions
+
+
+def print_group(title, group):
+    print(title)
+    for size, stages in group.items():
+        for stage, stats in stages.items():
+            print(f"  {size:>7} {stage:<22}{stats['seconds'] * 1000:10.2f} ms"
+                  f"  net {stats['net_kb']:10.1f} KB  peak {stats['peak_kb']:10.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以合成資料量測 ExcelExporter 的解析與匯出')
+    parser.add_argument('--rows', type=int, nargs='*', default=[10, 100, 1000, 10000, 100000], help='頁面的明細列數')
+    parser.add_argument('--projects', type=int, nargs='*', default=[1, 10, 100, 1000, 10000], help='匯出的計畫數')
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], help='匯出格式（delta 需要歷史資料，不適用）')
+    parser.add_argument('--repeat', type=int, default=3, help='每個項目最多計時次數，取中位數')
+    parser.add_argument('--budget', type=float, default=10.0, help='每個項目累計計時超過此秒數後不再重複')
+    parser.add_argument('--baseline', help='比較用的基準結果（JSON）')
+    parser.add_argument('--tolerance', type=float, default=1.2, help='超過基準幾倍視為退化')
+    parser.add_argument('--save-baseline', help='將本次結果存為基準（JSON）')
+    args = parser.parse_args()
+
+    results = {'rows': {}, 'projects': {}, 'page_bytes': {}}
+    for rows in args.rows:
+        results['rows'][str(rows)], results['page_bytes'][str(rows)] = bench_rows(rows, args.repeat, args.budget)
+
+    output_dir = tempfile.mkdtemp(prefix='itouch_parser_')
+    try:
+        for count in args.projects:
+            results['projects'][str(count)] = bench_projects(count, args.formats, output_dir, args.repeat, args.budget)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    if results['rows']:
+        print_group('依明細列數:', results['rows'])
+    if results['projects']:
+        print_group('依計畫數:', results['projects'])
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline, args.tolerance)
+        print(f"與基準比較（{args.baseline}，容許 {args.tolerance} 倍）:")
+        for line in lines:
+            print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                **results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"已儲存基準: {args.save_baseline}")
+
+    if regressions:
+        print(f"效能退化: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
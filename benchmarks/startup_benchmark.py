@@ -0,0 +1,149 @@
+"""
+啟動時間基準測試
+
+量測兩項指標，並與門檻值比較：
+1. 匯入 main.py 的時間（以 python -X importtime 取得各套件的累計匯入時間）
+2. 從程序啟動到第一個視窗顯示的時間
+
+使用方式：
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 5 --max-import 0.3 --max-window 1.5 --json startup.json
+
+任一指標的中位數超過門檻時，程式以結束代碼 1 結束，可用於 CI 檢查效能退化。
+"""
+import os
+import sys
+import re
+import json
+import argparse
+import statistics
+import subprocess
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子程序中量測到第一個視窗顯示的時間
+FIRST_WINDOW_SCRIPT = r'''
+import time
+start = time.perf_counter()
+import tkinter as tk
+import main
+root = tk.Tk()
+app = main.ItouchCrawler(root)
+root.update()
+elapsed = time.perf_counter() - start
+root.destroy()
+print(f"FIRST_WINDOW={elapsed:.6f}")
+'''
+
+IMPORTTIME_PATTERN = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run_python(python, code, extra_args=()):
+    """在專案目錄下以新的直譯器執行程式碼"""
+    return subprocess.run(
+        [python, *extra_args, '-c', code],
+        cwd=PROJECT_DIR, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+
+
+def measure_import(python):
+    """匯入 main.py，回傳總匯入時間（秒）與各最上層套件的累計時間"""
+    result = run_python(python, 'import main', ['-X', 'importtime'])
+    if result.returncode != 0:
+        raise RuntimeError(f"匯入 main.py 失敗:\n{result.stderr}")
+
+    # importtime 先列出子模組再列出父模組，因此先暫存第一層的模組，遇到 main 時才歸入統計
+    packages = {}
+    children = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2)) / 1e6
+        # 每層巢狀匯入縮排兩個空白
+        level = (len(match.group(3)) - 1) // 2
+        name = match.group(4)
+        if level == 1:
+            children.append((name, cumulative))
+        elif level == 0:
+            if name == 'main':
+                total = cumulative
+                for child, seconds in children:
+                    # 依最上層套件彙總
+                    top_level = child.split('.')[0]
+                    packages[top_level] = packages.get(top_level, 0.0) + seconds
+            children = []
+    return total, packages
+
+
+def measure_first_window(python):
+    """回傳從直譯器啟動到第一個視窗顯示的時間（秒），無法建立視窗時回傳 None"""
+    result = run_python(python, FIRST_WINDOW_SCRIPT)
+    match = re.search(r'FIRST_WINDOW=([\d.]+)', result.stdout)
+    if not match:
+        print(f"無法量測視窗顯示時間（可能沒有圖形環境）: {result.stderr.strip().splitlines()[-1:]}")
+        return None
+    return float(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='量測 main.py 的啟動時間')
+    parser.add_argument('--python', default=sys.executable, help='要量測的 Python 直譯器')
+    parser.add_argument('--runs', type=int, default=5, help='重複量測次數，取中位數')
+    parser.add_argument('--max-import', type=float, default=0.3, help='匯入 main.py 的時間門檻（秒）')
+    parser.add_argument('--max-window', type=float, default=1.5, help='第一個視窗顯示的時間門檻（秒）')
+    parser.add_argument('--top', type=int, default=10, help='列出匯入時間最長的前幾個套件')
+    parser.add_argument('--json', help='將結果寫入指定的 JSON 檔案')
+    args = parser.parse_args()
+
+    import_times = []
+    window_times = []
+    package_times = {}
+    for _ in range(args.runs):
+        total, packages = measure_import(args.python)
+        import_times.append(total)
+        for name, seconds in packages.items():
+            package_times.setdefault(name, []).append(seconds)
+
+        window_time = measure_first_window(args.python)
+        if window_time is not None:
+            window_times.append(window_time)
+
+    import_median = statistics.median(import_times)
+    window_median = statistics.median(window_times) if window_times else None
+    breakdown = sorted(((name, statistics.median(times)) for name, times in package_times.items()),
+                       key=lambda item: item[1], reverse=True)
+
+    print(f"匯入 main.py: {import_median * 1000:.1f} ms（門檻 {args.max_import * 1000:.0f} ms）")
+    for name, seconds in breakdown[:args.top]:
+        print(f"  {name:<24}{seconds * 1000:8.1f} ms")
+    if window_median is not None:
+        print(f"第一個視窗顯示: {window_median * 1000:.1f} ms（門檻 {args.max_window * 1000:.0f} ms）")
+
+    failures = []
+    if import_median > args.max_import:
+        failures.append('import')
+    if window_median is not None and window_median > args.max_window:
+        failures.append('first_window')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': args.python,
+                'runs': args.runs,
+                'import_seconds': import_median,
+                'first_window_seconds': window_median,
+                'import_breakdown': dict(breakdown),
+                'thresholds': {'import': args.max_import, 'first_window': args.max_window},
+                'failures': failures
+            }, f, ensure_ascii=False, indent=2)
+
+    if failures:
+        print(f"超過門檻: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from chrome_manager import ChromeDriverManager
+
+# 隱藏自動化控制特徵的腳本
+HIDE_WEBDRIVER_SCRIPT = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+'''
+
+class BrowserManager:
+    """
+    管理瀏覽器與 chromedriver 的生命週期
+
+    重新啟動程式時只做軟重置（關閉多餘分頁、清除登入狀態），保留 Chrome 與 chromedriver 程序；
+    只有健康檢查失敗時才關閉並重新啟動瀏覽器。
+    """
+
+    def __init__(self, options_factory, status_callback=None, max_retries=3, page_load_timeout=30):
+        """
+        Args:
+            options_factory: 回傳 ChromeOptions 的函式，每次啟動瀏覽器時呼叫
+            status_callback: 顯示狀態訊息的函式
+            max_retries: 啟動瀏覽器的重試次數
+            page_load_timeout: 頁面載入超時（秒）
+        """
+        self.options_factory = options_factory
+        self.status_callback = status_callback or (lambda message: None)
+        self.max_retries = max_retries
+        self.page_load_timeout = page_load_timeout
+
+        self.driver = None
+        self.service = None
+        self.driver_manager = None
+        self.lock = threading.RLock()
+
+        # 統計次數，供除錯參考
+        self.cold_starts = 0
+        self.soft_resets = 0
+
+    def get_driver(self):
+        """取得可用的瀏覽器，現有瀏覽器健康時直接沿用，否則重新啟動"""
+        with self.lock:
+            if self.driver and self.is_healthy():
+                return self.driver
+            self.quit()
+            return self.start()
+
+    def start(self):
+        """啟動 chromedriver 與瀏覽器"""
+        with self.lock:
+            # chromedriver 路徑與 Service 只在第一次啟動時準備，重新啟動時沿用
+            if self.service is None:
+                self.driver_manager = ChromeDriverManager()
+                self.service = Service(self.driver_manager.install())
+
+            retry_count = 0
+            while True:
+                try:
+                    self.driver = webdriver.Chrome(service=self.service, options=self.options_factory())
+                    self.prepare_current_tab()
+
+                    # 設定頁面加載超時
+                    self.driver.set_page_load_timeout(self.page_load_timeout)
+                    self.cold_starts += 1
+                    return self.driver
+
+                except Exception as e:
+                    self.driver = None
+                    retry_count += 1
+                    if retry_count >= self.max_retries:
+                        raise e
+                    self.status_callback(f"初始化瀏覽器失敗，正在重試 ({retry_count}/{self.max_retries})...")
+                    time.sleep(2)  # 等待2秒後重試
+
+                    # 緩存的驅動程式可能與更新後的 Chrome 不符，等待版本偵測完成後重新確認
+                    self.service = Service(self.driver_manager.install(wait_for_probe=True))
+
+    def get_service_pid(self):
+        """回傳 chromedriver 程序的 PID（Chrome 為其子程序），尚未啟動時回傳 None"""
+        process = getattr(self.service, 'process', None) if self.service else None
+        return process.pid if process else None
+
+    def prepare_current_tab(self):
+        """設定目前分頁（新分頁需重新註冊隱藏自動化特徵的腳本）"""
+        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': HIDE_WEBDRIVER_SCRIPT
+        })
+
+    def is_healthy(self):
+        """健康檢查：瀏覽器仍可回應指令且至少有一個分頁"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script('return 1;')
+            return bool(self.driver.window_handles)
+        except Exception as e:
+            logging.warning(f"瀏覽器健康檢查失敗: {str(e)}")
+            return False
+
+    def soft_reset(self):
+        """
+        軟重置：開啟一個乾淨的分頁並關閉其他分頁，清除 cookie 以便重新登入
+
+        瀏覽器無回應或重置失敗時關閉瀏覽器，下次呼叫 get_driver() 時再重新啟動。
+
+        Returns:
+            bool: 是否成功保留瀏覽器
+        """
+        with self.lock:
+            if not self.driver:
+                return False
+            if not self.is_healthy():
+                self.quit()
+                return False
+
+            try:
+                # 以新分頁取代舊分頁，舊分頁的 sessionStorage 與頁面狀態一併捨棄
+                old_handles = self.driver.window_handles
+                self.driver.switch_to.new_window('tab')
+                new_handle = self.driver.current_window_handle
+                for handle in old_handles:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                self.driver.switch_to.window(new_handle)
+                self.prepare_current_tab()
+
+                # 清除登入狀態
+                self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+                self.soft_resets += 1
+                return True
+
+            except Exception as e:
+                logging.warning(f"瀏覽器軟重置失敗，改為重新啟動: {str(e)}")
+                self.quit()
+                return False
+
+    def hard_restart(self):
+        """關閉並重新啟動瀏覽器"""
+        with self.lock:
+            self.quit()
+            return self.start()
+
+    def quit(self):
+        """關閉瀏覽器與 chromedriver"""
+        with self.lock:
+            if self.driver:
+                try:
+                    self.driver.quit()
+                except:
+                    pass
+                self.driver = None
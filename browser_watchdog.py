@@ -0,0 +1,110 @@
+import time
+import logging
+import statistics
+
+try:
+    import psutil
+except ImportError:
+    # 未安裝 psutil 時（例如打包時遺漏）只依計畫數與指令延遲判斷，由呼叫端提示使用者
+    psutil = None
+
+class BrowserWatchdog:
+    """
+    監看瀏覽器健康狀態，決定何時需要重新啟動瀏覽器
+
+    長時間查詢時 Chrome 分頁程序的記憶體會逐漸增加，回應也會變慢。
+    每處理 sample_every 個計畫取樣一次 chromedriver 與 Chrome 程序的記憶體用量（需要 psutil）
+    及一次 WebDriver 指令的往返時間；達到計畫數上限、記憶體或延遲門檻時回傳重新啟動的原因。
+    """
+
+    def __init__(self, browser, recycle_every=200, max_rss_mb=1500, max_latency=1.0,
+                 sample_every=10, latency_window=3):
+        """
+        Args:
+            browser: BrowserManager 物件
+            recycle_every: 每處理幾個計畫重新啟動一次瀏覽器，0 表示不限
+            max_rss_mb: chromedriver 與 Chrome 程序的記憶體用量合計上限（MB）
+            max_latency: 指令往返時間上限（秒），以最近 latency_window 次取樣的中位數判斷
+            sample_every: 每處理幾個計畫取樣一次
+            latency_window: 判斷延遲時使用的取樣數
+        """
+        self.browser = browser
+        self.recycle_every = recycle_every
+        self.max_rss_mb = max_rss_mb
+        self.max_latency = max_latency
+        self.sample_every = sample_every
+        self.latency_window = latency_window
+
+        self.plans_since_recycle = 0
+        self.latencies = []
+        self.last_sample = None
+        self.recycle_count = 0
+
+    def sample_rss_mb(self):
+        """取得 chromedriver 及其所有子程序（Chrome、分頁程序）的記憶體用量（MB），無法取得時回傳 None"""
+        pid = self.browser.get_service_pid()
+        if psutil is None or pid is None:
+            return None
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+        except psutil.Error:
+            return None
+
+        total = 0
+        for child in processes:
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue  # 程序可能已結束
+        return total / (1024 * 1024)
+
+    def sample_latency(self):
+        """量測一次 WebDriver 指令的往返時間（秒）"""
+        start = time.perf_counter()
+        self.browser.driver.execute_script('return 1;')
+        return time.perf_counter() - start
+
+    def sample(self):
+        """取樣記憶體用量與指令延遲"""
+        try:
+            latency = self.sample_latency()
+        except Exception as e:
+            logging.warning(f"瀏覽器延遲取樣失敗: {str(e)}")
+            latency = None
+        if latency is not None:
+            self.latencies = (self.latencies + [latency])[-self.latency_window:]
+
+        self.last_sample = {
+            'rss_mb': self.sample_rss_mb(),
+            'latency': latency,
+            'plans_since_recycle': self.plans_since_recycle
+        }
+        return self.last_sample
+
+    def plan_done(self):
+        """
+        完成一個計畫後呼叫，必要時取樣並判斷是否需要重新啟動瀏覽器
+
+        Returns:
+            str: 需要重新啟動的原因，不需要時回傳 None
+        """
+        self.plans_since_recycle += 1
+        if self.recycle_every and self.plans_since_recycle >= self.recycle_every:
+            return f"已處理 {self.plans_since_recycle} 個計畫"
+
+        if self.sample_every and self.plans_since_recycle % self.sample_every == 0:
+            sample = self.sample()
+            if sample['rss_mb'] is not None and sample['rss_mb'] > self.max_rss_mb:
+                return f"記憶體用量 {sample['rss_mb']:.0f} MB"
+            if len(self.latencies) >= self.latency_window:
+                latency = statistics.median(self.latencies)
+                if latency > self.max_latency:
+                    return f"指令延遲 {latency:.2f} 秒"
+        return None
+
+    def recycled(self):
+        """重新啟動瀏覽器後呼叫，重設計數與取樣"""
+        self.plans_since_recycle = 0
+        self.latencies = []
+        self.recycle_count += 1
@@ -6,11 +6,21 @@ import platform
 import zipfile
 import shutil
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
-from datetime import datetime, timedelta
+import json
+import threading
+import hashlib
+import base64
+import time
+from datetime import datetime
 
 class ChromeDriverManager:
-    def __init__(self, cache_valid_days=7):
+    # 本機鏡像目錄的環境變數名稱
+    MIRROR_ENV = 'ITOUCH_DRIVER_MIRROR'
+
+    def __init__(self, max_drivers=3, mirror_dir=None):
         # 判斷是否為執行檔環境
         if getattr(sys, 'frozen', False):
             self.base_path = os.path.dirname(sys.executable)
@@ -21,14 +31,136 @@ class ChromeDriverManager:
         self.driver_dir = os.path.join(self.base_path, 'drivers')
         os.makedirs(self.driver_dir, exist_ok=True)
         
-        # 緩存資訊檔案
+        # 驅動程式存放區：依 Chrome 主版本分目錄存放，index.json 記錄各版本資訊與最後使用時間
+        self.store_dir = os.path.join(self.driver_dir, 'store')
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.index_file = os.path.join(self.store_dir, 'index.json')
+        self.index_lock = threading.RLock()
+        
+        # 最多保留的驅動程式數量，超過時移除最久未使用的版本
+        self.max_drivers = max_drivers
+        
+        # 舊版的單一驅動程式緩存資訊，首次使用存放區時轉移
         self.cache_info_file = os.path.join(self.driver_dir, 'driver_info.txt')
         
-        # 緩存有效期（天）
-        self.cache_valid_days = cache_valid_days
+        # Chrome 版本緩存（含執行檔指紋）
+        self.version_cache_file = os.path.join(self.driver_dir, 'chrome_version.json')
+        
+        # 本機鏡像目錄：放置預先下載的 chromedriver-<平台>-<版本>.zip，離線環境可直接安裝
+        self.mirror_dir = mirror_dir or os.environ.get(self.MIRROR_ENV) or os.path.join(self.driver_dir, 'mirror')
+        
+        # 共用連線的 HTTP session，連線失敗或伺服器錯誤時自動重試
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        self.session.mount('https://', HTTPAdapter(max_retries=retry, pool_connections=2, pool_maxsize=4))
+        
+        # 背景偵測 Chrome 版本的執行緒與結果
+        self.version_probe_thread = None
+        self.version_probe_lock = threading.Lock()
+        self.probed_chrome_version = None
+        
+        # 背景預先下載驅動程式的執行緒
+        self.prefetch_thread = None
+        
+        # 各主版本的安裝鎖：背景偵測、預先下載與前景安裝同時取得同一版本時依序執行，
+        # 避免同時寫入相同的下載暫存檔與解壓目錄
+        self.provision_locks = {}
+        self.provision_locks_guard = threading.Lock()
+
+    def find_chrome_binary(self):
+        """尋找 Chrome 執行檔路徑，找不到時回傳 None"""
+        system = platform.system()
+        if system == "Windows":
+            paths = [
+                r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+                r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe',
+                os.path.expanduser(r'~\AppData\Local\Google\Chrome\Application\chrome.exe')
+            ]
+        elif system == "Darwin":  # macOS
+            paths = ['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome']
+        else:
+            paths = [shutil.which(name) for name in ('google-chrome', 'google-chrome-stable')]
+            
+        for path in paths:
+            if path and os.path.exists(path):
+                return os.path.realpath(path)
+        return None
+
+    def get_binary_fingerprint(self, chrome_path):
+        """以路徑、檔案大小與修改時間作為 Chrome 執行檔的指紋，Chrome 更新後指紋即改變"""
+        try:
+            stat = os.stat(chrome_path)
+            return f"{chrome_path}|{stat.st_size}|{stat.st_mtime_ns}"
+        except (OSError, TypeError):
+            return None
+
+    def get_cached_chrome_version(self):
+        """若 Chrome 執行檔未變更，直接回傳上次偵測到的版本，不執行任何子程序"""
+        fingerprint = self.get_binary_fingerprint(self.find_chrome_binary())
+        if not fingerprint:
+            return None
+        try:
+            with open(self.version_cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('fingerprint') == fingerprint:
+                return cache.get('version')
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def save_chrome_version_cache(self, version):
+        """記錄偵測到的 Chrome 版本與執行檔指紋"""
+        fingerprint = self.get_binary_fingerprint(self.find_chrome_binary())
+        if not fingerprint or not version:
+            return
+        try:
+            with open(self.version_cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'fingerprint': fingerprint, 'version': version}, f)
+        except OSError as e:
+            logging.warning(f"無法寫入 Chrome 版本緩存: {str(e)}")
 
     def get_chrome_version(self):
-        """獲取當前系統已安裝的 Chrome 版本"""
+        """獲取當前系統已安裝的 Chrome 版本，Chrome 執行檔未變更時使用緩存結果"""
+        version = self.get_cached_chrome_version()
+        if version:
+            return version
+            
+        # 若背景偵測正在執行，等待其結果即可，避免重複啟動子程序
+        probe_thread = self.version_probe_thread
+        if probe_thread and probe_thread.is_alive() and probe_thread is not threading.current_thread():
+            probe_thread.join()
+            return self.probed_chrome_version
+            
+        version = self.probe_chrome_version()
+        self.save_chrome_version_cache(version)
+        return version
+
+    def start_version_probe(self):
+        """在背景偵測 Chrome 版本，偵測結果寫入緩存供下次使用"""
+        with self.version_probe_lock:
+            if self.version_probe_thread and self.version_probe_thread.is_alive():
+                return self.version_probe_thread
+            self.version_probe_thread = threading.Thread(target=self._run_version_probe, daemon=True)
+            self.version_probe_thread.start()
+            return self.version_probe_thread
+
+    def _run_version_probe(self):
+        """背景偵測 Chrome 版本，Chrome 已升級且存放區沒有對應的驅動程式時立即下載"""
+        version = self.probe_chrome_version()
+        self.probed_chrome_version = version
+        self.save_chrome_version_cache(version)
+        
+        if version:
+            major_version = version.split('.')[0]
+            if not self.lookup_driver(major_version):
+                logging.info(f"Chrome 已更新為 {version}，於背景下載對應的 ChromeDriver")
+                try:
+                    self.provision_driver(major_version)
+                except Exception as e:
+                    logging.warning(f"背景下載 ChromeDriver {major_version} 失敗: {str(e)}")
+
+    def probe_chrome_version(self):
+        """實際偵測已安裝的 Chrome 版本（可能需要啟動子程序，耗時較長）"""
         try:
             system = platform.system()
             if system == "Windows":
@@ -40,17 +172,13 @@ class ChromeDriverManager:
                     return version
                 except:
                     # 嘗試從安裝路徑獲取
-                    paths = [
-                        r'C:\Program Files\Google\Chrome\Application\chrome.exe',
-                        r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe',
-                        os.path.expanduser(r'~\AppData\Local\Google\Chrome\Application\chrome.exe')
-                    ]
-                    for path in paths:
-                        if os.path.exists(path):
-                            version_info = subprocess.check_output(f'wmic datafile where name="{path.replace("\\", "\\\\")}" get Version /value', shell=True)
-                            match = re.search(r'Version=(\d+\.\d+\.\d+\.\d+)', version_info.decode('utf-8'))
-                            if match:
-                                return match.group(1)
+                    path = self.find_chrome_binary()
+                    if path:
+                        escaped_path = path.replace('\\', '\\\\')
+                        version_info = subprocess.check_output(f'wmic datafile where name="{escaped_path}" get Version /value', shell=True)
+                        match = re.search(r'Version=(\d+\.\d+\.\d+\.\d+)', version_info.decode('utf-8'))
+                        if match:
+                            return match.group(1)
             elif system == "Darwin":  # macOS
                 process = subprocess.Popen(['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome', '--version'], stdout=subprocess.PIPE)
                 version = process.communicate()[0].decode('UTF-8').replace('Google Chrome ', '').strip()
@@ -65,166 +193,409 @@ class ChromeDriverManager:
         # 如果無法獲取版本，返回最新版本的下載鏈接
         return None
 
-    def get_compatible_driver_url(self, chrome_version):
-        """獲取與 Chrome 版本兼容的 ChromeDriver 下載 URL"""
-        if chrome_version:
-            major_version = chrome_version.split('.')[0]
-            
-            # 使用新的 Chrome for Testing 下載 API
-            # 參考: https://googlechromelabs.github.io/chrome-for-testing/
-            api_url = f"https://googlechromelabs.github.io/chrome-for-testing/LATEST_RELEASE_{major_version}"
-            try:
-                response = requests.get(api_url)
-                response.raise_for_status()
-                driver_version = response.text.strip()
-                
-                # 準備下載 URL
-                system = platform.system().lower()
-                if system == "windows":
-                    platform_name = "win32"
-                elif system == "darwin":  # macOS
-                    platform_name = "mac-x64" if platform.machine() != "arm64" else "mac-arm64"
-                else:  # Linux
-                    platform_name = "linux64"
-                
-                download_url = f"https://storage.googleapis.com/chrome-for-testing-public/{driver_version}/{platform_name}/chromedriver-{platform_name}.zip"
-                return download_url
-            except Exception as e:
-                logging.warning(f"使用 Chrome for Testing API 獲取 URL 失敗: {str(e)}")
+    def get_platform_name(self):
+        """取得 Chrome for Testing 使用的平台名稱"""
+        system = platform.system().lower()
+        if system == "windows":
+            return "win32"
+        elif system == "darwin":  # macOS
+            return "mac-x64" if platform.machine() != "arm64" else "mac-arm64"
+        else:  # Linux
+            return "linux64"
+
+    def get_driver_name(self):
+        """取得驅動程式執行檔名稱"""
+        return 'chromedriver.exe' if platform.system() == 'Windows' else 'chromedriver'
+
+    def get_driver_version(self, major_version=None):
+        """
+        查詢指定主版本最新的 ChromeDriver 版本號
+        
+        Args:
+            major_version: Chrome 主版本，為 None 時查詢最新穩定版
         
-        # 如果無法獲取特定版本，使用穩定版
+        Returns:
+            str: 版本號，查詢失敗時回傳 None
+        """
+        # 使用 Chrome for Testing 下載 API
+        # 參考: https://googlechromelabs.github.io/chrome-for-testing/
+        release = major_version or 'STABLE'
+        api_url = f"https://googlechromelabs.github.io/chrome-for-testing/LATEST_RELEASE_{release}"
         try:
-            # 獲取最新穩定版本
-            response = requests.get("https://googlechromelabs.github.io/chrome-for-testing/LATEST_RELEASE_STABLE")
+            response = self.session.get(api_url, timeout=10)
             response.raise_for_status()
-            stable_version = response.text.strip()
-            
-            system = platform.system().lower()
-            if system == "windows":
-                platform_name = "win32"
-            elif system == "darwin":  # macOS
-                platform_name = "mac-x64" if platform.machine() != "arm64" else "mac-arm64"
-            else:  # Linux
-                platform_name = "linux64"
-            
-            download_url = f"https://storage.googleapis.com/chrome-for-testing-public/{stable_version}/{platform_name}/chromedriver-{platform_name}.zip"
-            return download_url
+            return response.text.strip()
         except Exception as e:
-            logging.error(f"獲取 ChromeDriver 下載鏈接失敗: {str(e)}")
+            logging.warning(f"使用 Chrome for Testing API 獲取版本 {release} 失敗: {str(e)}")
             return None
+
+    def get_download_url(self, driver_version):
+        """獲取指定版本 ChromeDriver 的下載 URL"""
+        platform_name = self.get_platform_name()
+        return f"https://storage.googleapis.com/chrome-for-testing-public/{driver_version}/{platform_name}/chromedriver-{platform_name}.zip"
     
-    def is_cache_valid(self):
-        """檢查緩存的驅動程式是否仍然有效"""
-        if not os.path.exists(self.cache_info_file):
-            return False
+    def find_mirror_zip(self, major_version=None):
+        """
+        在本機鏡像目錄中尋找驅動程式壓縮檔
+        
+        Args:
+            major_version: Chrome 主版本，為 None 時不限版本
+        
+        Returns:
+            tuple: (壓縮檔路徑, 驅動程式版本)，找不到時回傳 (None, None)
+        """
+        if not os.path.isdir(self.mirror_dir):
+            return None, None
+            
+        pattern = re.compile(rf'^chromedriver-{re.escape(self.get_platform_name())}-(\d+(?:\.\d+)*)\.zip$')
+        
+        candidates = []
+        for entry in os.scandir(self.mirror_dir):
+            match = pattern.match(entry.name)
+            if not match:
+                continue
+            version = match.group(1)
+            if major_version is None or version.split('.')[0] == str(major_version):
+                candidates.append((tuple(int(part) for part in version.split('.')), entry.path, version))
+        
+        if not candidates:
+            return None, None
+        _, path, version = max(candidates)
+        return path, version
+
+    def load_index(self):
+        """讀取存放區索引，格式為 {主版本: 驅動程式資訊}"""
+        with self.index_lock:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('drivers', {})
+            except (OSError, ValueError):
+                return {}
+
+    def save_index(self, drivers):
+        """寫入存放區索引（先寫入暫存檔再替換，避免中斷時損壞）"""
+        with self.index_lock:
+            temp_file = self.index_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'drivers': drivers}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.index_file)
+
+    def lookup_driver(self, major_version, touch=False):
+        """
+        在存放區中查詢指定主版本的驅動程式
+        
+        Args:
+            major_version: Chrome 主版本
+            touch: 是否更新最後使用時間
+        
+        Returns:
+            str: 驅動程式路徑，不存在或檔案大小不符時回傳 None
+        """
+        with self.index_lock:
+            drivers = self.load_index()
+            entry = drivers.get(str(major_version))
+            if not entry:
+                return None
+                
+            driver_path = os.path.join(self.store_dir, entry['path'])
+            try:
+                if os.path.getsize(driver_path) != entry['size']:
+                    return None
+            except OSError:
+                return None
+                
+            if touch:
+                entry['last_used'] = time.time()
+                self.save_index(drivers)
+            return driver_path
+
+    def get_last_used_major(self):
+        """取得最近實際使用的驅動程式主版本（預先下載而尚未使用的版本不算），沒有時回傳 None"""
+        drivers = self.load_index()
+        used = [major for major in drivers if drivers[major].get('last_used', 0) > 0]
+        if not used:
+            return None
+        return max(used, key=lambda major: drivers[major]['last_used'])
+
+    def register_driver(self, major_version, driver_version, driver_path, driver_size, driver_sha256, used=True):
+        """
+        將驅動程式加入存放區索引，並移除超過數量上限的最久未使用版本
+        
+        Args:
+            used: 是否即將使用此驅動程式；預先下載時為 False，最後使用時間記為 0，
+                  避免 Chrome 版本未確認時誤用尚未對應的新版驅動程式
+        """
+        with self.index_lock:
+            drivers = self.load_index()
+            major_version = str(major_version)
+            drivers[major_version] = {
+                'driver_version': driver_version,
+                'path': os.path.relpath(driver_path, self.store_dir),
+                'size': driver_size,
+                'sha256': driver_sha256,
+                'installed_at': datetime.now().isoformat(timespec='seconds'),
+                'last_used': time.time() if used else 0
+            }
+            
+            # LRU：依最後使用時間保留最新的版本（剛加入的版本一律保留）
+            others = sorted((major for major in drivers if major != major_version),
+                            key=lambda major: drivers[major].get('last_used', 0), reverse=True)
+            keep = [major_version] + others[:self.max_drivers - 1]
+            for major in list(drivers):
+                if major not in keep:
+                    # 驅動程式仍在執行時（Windows 會鎖定檔案）可能無法刪除，留待下次清理
+                    shutil.rmtree(os.path.join(self.store_dir, major), ignore_errors=True)
+                    del drivers[major]
+                    
+            self.save_index(drivers)
+
+    def migrate_legacy_driver(self):
+        """將舊版 drivers/chromedriver 與 driver_info.txt 轉移至存放區，避免升級後重新下載"""
+        legacy_path = os.path.join(self.driver_dir, self.get_driver_name())
+        if not os.path.exists(legacy_path) or not os.path.exists(self.cache_info_file):
+            return
             
         try:
             with open(self.cache_info_file, 'r') as f:
                 lines = f.readlines()
-                if len(lines) >= 2:
-                    # 檢查日期
-                    cache_date = datetime.strptime(lines[0].strip(), '%Y-%m-%d')
-                    if datetime.now() - cache_date > timedelta(days=self.cache_valid_days):
-                        return False
+            chrome_version = lines[1].strip() if len(lines) >= 2 else ''
+            major_version = chrome_version.split('.')[0]
+            if major_version.isdigit() and not self.lookup_driver(major_version):
+                target_dir = os.path.join(self.store_dir, major_version)
+                os.makedirs(target_dir, exist_ok=True)
+                target_path = os.path.join(target_dir, self.get_driver_name())
+                shutil.copy2(legacy_path, target_path)
+                
+                sha256 = hashlib.sha256()
+                with open(target_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        sha256.update(chunk)
+                self.register_driver(major_version, chrome_version, target_path,
+                                     os.path.getsize(target_path), sha256.hexdigest())
+                logging.info(f"已將舊版 ChromeDriver ({chrome_version}) 轉移至存放區")
+                
+            os.remove(legacy_path)
+            os.remove(self.cache_info_file)
+        except Exception as e:
+            logging.warning(f"轉移舊版 ChromeDriver 失敗: {str(e)}")
+    
+    def download_file(self, url, target_path, max_retries=3):
+        """
+        下載檔案，中斷時從已下載的位置續傳
+        
+        下載中的內容寫入 <target_path>.part，完成並驗證大小與伺服器提供的 MD5 後才改名為 target_path
+        """
+        part_path = target_path + '.part'
+        last_error = None
+        
+        for attempt in range(max_retries):
+            try:
+                downloaded = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                headers = {'Range': f'bytes={downloaded}-'} if downloaded else {}
+                
+                with self.session.get(url, stream=True, headers=headers, timeout=(10, 60)) as response:
+                    # 已下載的部分不正確（例如遠端檔案已更換），從頭下載
+                    if response.status_code == 416:
+                        os.remove(part_path)
+                        continue
+                    response.raise_for_status()
                     
-                    # 檢查 Chrome 版本是否匹配
-                    cached_chrome_version = lines[1].strip()
-                    current_chrome_version = self.get_chrome_version()
+                    # 206 表示伺服器接受續傳，否則重新寫入
+                    if response.status_code == 206:
+                        mode = 'ab'
+                        total_size = response.headers.get('Content-Range', '').rpartition('/')[2]
+                    else:
+                        mode = 'wb'
+                        total_size = response.headers.get('Content-Length', '')
+                    total_size = int(total_size) if total_size.isdigit() else None
                     
-                    # 只比較主版本號
-                    if current_chrome_version:
-                        current_major = current_chrome_version.split('.')[0]
-                        cached_major = cached_chrome_version.split('.')[0]
-                        return current_major == cached_major
-                        
-            return False
-        except Exception:
-            return False
+                    # Google Cloud Storage 以 x-goog-hash 提供整個檔案的 MD5（base64）
+                    expected_md5 = None
+                    for item in response.headers.get('x-goog-hash', '').split(','):
+                        key, _, value = item.strip().partition('=')
+                        if key == 'md5':
+                            expected_md5 = value
+                    
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            f.write(chunk)
+                
+                # 驗證大小與 MD5
+                if total_size is not None and os.path.getsize(part_path) != total_size:
+                    raise IOError(f"下載大小不符: {os.path.getsize(part_path)} / {total_size}")
+                if expected_md5:
+                    md5 = hashlib.md5()
+                    with open(part_path, 'rb') as f:
+                        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                            md5.update(chunk)
+                    if base64.b64encode(md5.digest()).decode('ascii') != expected_md5:
+                        os.remove(part_path)
+                        raise IOError("下載檔案的 MD5 驗證失敗")
+                
+                os.replace(part_path, target_path)
+                return target_path
+                
+            except (requests.RequestException, IOError) as e:
+                last_error = e
+                logging.warning(f"下載中斷，準備續傳 ({attempt + 1}/{max_retries}): {str(e)}")
+                time.sleep(min(2 ** attempt, 5))
+        
+        raise IOError(f"下載失敗: {url} ({str(last_error)})")
     
-    def update_cache_info(self, chrome_version):
-        """更新緩存信息"""
-        with open(self.cache_info_file, 'w') as f:
-            f.write(f"{datetime.now().strftime('%Y-%m-%d')}\n")
-            f.write(f"{chrome_version}\n")
+    def extract_driver(self, zip_path, target_dir):
+        """只從壓縮檔中取出驅動程式執行檔至 target_dir，驗證大小後替換現有檔案，回傳 (路徑, 大小, SHA-256)"""
+        driver_name = self.get_driver_name()
+        os.makedirs(target_dir, exist_ok=True)
+        target_path = os.path.join(target_dir, driver_name)
+        temp_path = target_path + '.tmp'
+        
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            member = next((info for info in zip_ref.infolist()
+                           if os.path.basename(info.filename) == driver_name), None)
+            if member is None:
+                raise FileNotFoundError(f"無法在壓縮檔中找到 {driver_name}")
+            
+            # 串流解壓（zipfile 讀取時會一併檢查 CRC）並計算 SHA-256
+            sha256 = hashlib.sha256()
+            with zip_ref.open(member) as source, open(temp_path, 'wb') as target:
+                for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                    sha256.update(chunk)
+                    target.write(chunk)
+        
+        size = os.path.getsize(temp_path)
+        if size != member.file_size:
+            os.remove(temp_path)
+            raise IOError(f"解壓後的 {driver_name} 大小不符: {size} / {member.file_size}")
+        
+        # 設置執行權限 (Linux/Mac)
+        if platform.system() != 'Windows':
+            os.chmod(temp_path, 0o755)
+        
+        os.replace(temp_path, target_path)
+        return target_path, size, sha256.hexdigest()
     
-    def download_driver(self, url):
-        """下載並解壓 ChromeDriver"""
+    def download_driver(self, url, target_dir):
+        """下載並解壓 ChromeDriver 至 target_dir，回傳 (路徑, 大小, SHA-256)，失敗時回傳 None"""
         try:
-            # 下載 ZIP 文件
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            zip_path = os.path.join(self.driver_dir, 'chromedriver.zip')
-            with open(zip_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # 解壓 ZIP 文件
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.driver_dir)
-            
-            # 刪除 ZIP 文件
-            os.remove(zip_path)
-            
-            # 找到解壓後的驅動程式路徑
-            driver_name = 'chromedriver.exe' if platform.system() == 'Windows' else 'chromedriver'
-            
-            # 搜索解壓文件夾找到 chromedriver
-            for root, dirs, files in os.walk(self.driver_dir):
-                for file in files:
-                    if file == driver_name or file == driver_name.replace(".exe", ""):
-                        extracted_path = os.path.join(root, file)
-                        target_path = os.path.join(self.driver_dir, driver_name)
-                        
-                        # 如果目標路徑存在，先刪除
-                        if os.path.exists(target_path):
-                            os.remove(target_path)
-                            
-                        # 移動檔案到目標位置
-                        shutil.move(extracted_path, target_path)
-                        
-                        # 設置執行權限 (Linux/Mac)
-                        if platform.system() != 'Windows':
-                            os.chmod(target_path, 0o755)
-                        
-                        # 清理其他解壓出來的文件夾
-                        if root != self.driver_dir:
-                            shutil.rmtree(root)
-                            
-                        return target_path
+            # 以網址區分暫存檔，中斷後再次下載同一版本時可以續傳
+            url_hash = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+            zip_path = os.path.join(self.driver_dir, f'chromedriver-{url_hash}.zip')
+            self.download_file(url, zip_path)
             
-            raise FileNotFoundError(f"無法在解壓後的檔案中找到 {driver_name}")
+            try:
+                return self.extract_driver(zip_path, target_dir)
+            finally:
+                # 刪除 ZIP 文件
+                os.remove(zip_path)
             
         except Exception as e:
             logging.error(f"下載或解壓 ChromeDriver 失敗: {str(e)}")
             return None
     
-    def install(self):
-        """安裝與當前 Chrome 版本兼容的 ChromeDriver"""
-        driver_path = os.path.join(self.driver_dir, 'chromedriver.exe' if platform.system() == 'Windows' else 'chromedriver')
+    def provision_driver(self, major_version=None, prefetch=False):
+        """
+        取得驅動程式並加入存放區，優先使用本機鏡像，其次從網路下載
         
-        # 檢查緩存是否有效
-        if self.is_cache_valid() and os.path.exists(driver_path):
-            logging.info("使用緩存的 ChromeDriver")
-            return driver_path
+        Args:
+            major_version: Chrome 主版本，為 None 時安裝最新穩定版
+            prefetch: 是否為預先下載（不更新最後使用時間）
         
-        # 獲取 Chrome 版本
-        chrome_version = self.get_chrome_version()
-        logging.info(f"檢測到 Chrome 版本: {chrome_version}")
+        Returns:
+            str: 驅動程式路徑
+        """
+        with self.provision_locks_guard:
+            lock = self.provision_locks.setdefault(major_version, threading.Lock())
+        with lock:
+            # 等待期間其他執行緒可能已安裝相同版本
+            if major_version:
+                driver_path = self.lookup_driver(major_version, touch=not prefetch)
+                if driver_path:
+                    return driver_path
+            return self._provision_driver(major_version, prefetch)
+    
+    def _provision_driver(self, major_version, prefetch):
+        """provision_driver 的實際安裝步驟（需持有該主版本的安裝鎖）"""
+        installed = None
+        mirror_zip, driver_version = self.find_mirror_zip(major_version)
+        if mirror_zip:
+            logging.info(f"使用本機鏡像的 ChromeDriver: {mirror_zip}")
+            try:
+                installed = self.extract_driver(mirror_zip, os.path.join(self.store_dir, driver_version.split('.')[0]))
+            except Exception as e:
+                logging.warning(f"解壓本機鏡像的 ChromeDriver 失敗: {str(e)}")
         
-        # 獲取下載 URL
-        download_url = self.get_compatible_driver_url(chrome_version)
-        if not download_url:
-            raise Exception("無法獲取 ChromeDriver 下載 URL")
+        if not installed:
+            driver_version = self.get_driver_version(major_version)
+            if not driver_version:
+                raise Exception("無法獲取 ChromeDriver 下載 URL")
+                
+            download_url = self.get_download_url(driver_version)
+            logging.info(f"下載 ChromeDriver: {download_url}")
+            
+            # 下載並解壓驅動程式
+            installed = self.download_driver(download_url, os.path.join(self.store_dir, driver_version.split('.')[0]))
+            if not installed:
+                raise Exception("下載或解壓 ChromeDriver 失敗")
         
-        logging.info(f"下載 ChromeDriver: {download_url}")
+        driver_path, driver_size, driver_sha256 = installed
+        self.register_driver(driver_version.split('.')[0], driver_version, driver_path, driver_size, driver_sha256,
+                             used=not prefetch)
+        return driver_path
+    
+    def prefetch_next_driver(self, major_version):
+        """在背景預先下載下一個 Chrome 主版本的驅動程式，Chrome 自動更新後可直接使用"""
+        next_major = str(int(major_version) + 1)
+        if self.lookup_driver(next_major) or (self.prefetch_thread and self.prefetch_thread.is_alive()):
+            return
+            
+        def prefetch():
+            try:
+                # 下一版尚未釋出時查詢會失敗，待下次啟動再試
+                mirror_zip, _ = self.find_mirror_zip(next_major)
+                if mirror_zip or self.get_driver_version(next_major):
+                    self.provision_driver(next_major, prefetch=True)
+                    logging.info(f"已預先下載 Chrome {next_major} 的 ChromeDriver")
+            except Exception as e:
+                logging.info(f"預先下載 Chrome {next_major} 的 ChromeDriver 失敗: {str(e)}")
+                
+        self.prefetch_thread = threading.Thread(target=prefetch, daemon=True)
+        self.prefetch_thread.start()
+    
+    def install(self, wait_for_probe=False):
+        """
+        取得與當前 Chrome 版本兼容的 ChromeDriver，存放區已有對應版本時不需下載
+        
+        Args:
+            wait_for_probe: Chrome 執行檔變更時是否等待版本偵測完成，
+                            為 False 時先沿用最近使用的驅動程式並於背景偵測，
+                            使用該驅動程式啟動失敗而重試時應設為 True
+        """
+        self.migrate_legacy_driver()
+        
+        # Chrome 執行檔未變更時不需執行子程序即可取得版本
+        chrome_version = self.get_cached_chrome_version()
+        if not chrome_version:
+            last_used_major = self.get_last_used_major()
+            driver_path = self.lookup_driver(last_used_major, touch=True) if last_used_major else None
+            if driver_path and not wait_for_probe:
+                logging.info("使用最近使用的 ChromeDriver，於背景偵測 Chrome 版本")
+                self.start_version_probe()
+                return driver_path
+            chrome_version = self.get_chrome_version()
         
-        # 下載並解壓驅動程式
-        driver_path = self.download_driver(download_url)
-        if not driver_path:
-            raise Exception("下載或解壓 ChromeDriver 失敗")
+        logging.info(f"檢測到 Chrome 版本: {chrome_version}")
+        major_version = chrome_version.split('.')[0] if chrome_version else None
+        
+        # 存放區查詢
+        driver_path = self.lookup_driver(major_version, touch=True) if major_version else None
+        if driver_path:
+            logging.info(f"使用存放區的 ChromeDriver ({major_version})")
+        else:
+            driver_path = self.provision_driver(major_version)
+            major_version = major_version or self.get_last_used_major()
         
-        # 更新緩存信息
-        self.update_cache_info(chrome_version or "unknown")
+        # 預先準備下一個主版本的驅動程式
+        if major_version:
+            self.prefetch_next_driver(major_version)
         
-        return driver_path
\ No newline at end of file
+        return driver_path
@@ -1,10 +1,45 @@
-from bs4 import BeautifulSoup
-import pandas as pd
 import os, sys
+import json
+import hashlib
+import threading
 from datetime import datetime
+from history_store import HistoryStore
+
+# pandas、numpy 與 BeautifulSoup 載入較慢，延後到建立 ExcelExporter 時才由 load_dependencies() 載入
+pd = None
+np = None
+BeautifulSoup = None
+_dependencies_lock = threading.Lock()
+
+def load_dependencies():
+    """載入資料處理所需的套件（僅第一次呼叫時實際載入）"""
+    global pd, np, BeautifulSoup
+    with _dependencies_lock:
+        if pd is not None:
+            return
+        from bs4 import BeautifulSoup
+        import numpy as np
+        import pandas as pd
+
+# 報表基本欄位，其中預算與餘額為金額欄位
+BASE_COLUMNS = ['學年度', '計畫編號', '計畫名稱', '目前預算', '可用餘額']
+AMOUNT_BASE_COLUMNS = ['目前預算', '可用餘額']
+
+# 可選的匯出格式：顯示名稱與對應的匯出方法
+EXPORT_FORMATS = {
+    'xlsx': {'label': 'Excel', 'method': 'export_excel'},
+    'csv': {'label': 'CSV', 'method': 'export_csv'},
+    'jsonl': {'label': 'JSON Lines', 'method': 'export_jsonl'},
+    'parquet': {'label': 'Parquet', 'method': 'export_parquet'},
+    'delta': {'label': '僅異動', 'method': 'export_delta'}
+}
+
+# 異動報表欄位
+DELTA_COLUMNS = ['學年度', '計畫編號', '計畫名稱', '狀態', '項目', '變更前', '變更後', '差額']
 
 class ExcelExporter:
     def __init__(self):
+        load_dependencies()
         self.projects_data = []
         
     def extract_project_info(self, soup):
@@ -66,8 +101,8 @@ class ExcelExporter:
                         break
         return subtotals
 
-    def add_data(self, plan_code, html_content):
-        """處理 HTML 內容並提取所需資料"""
+    def add_data(self, plan_code, html_content, fetched_at=None):
+        """處理 HTML 內容並提取所需資料（fetched_at 為查詢時間，從封存檔重新解析時沿用原本的時間）"""
         soup = BeautifulSoup(html_content, 'html.parser')
         
         # 提取基本資訊
@@ -79,7 +114,8 @@ class ExcelExporter:
         # 儲存所有資料
         project_data = {
             'info': project_info,
-            'subtotals': subtotals
+            'subtotals': subtotals,
+            'fetched_at': fetched_at or datetime.now().isoformat(timespec='seconds')
         }
         
         # print(f"已處理計畫 {plan_code}:")
@@ -88,11 +124,176 @@ class ExcelExporter:
         
         self.projects_data.append(project_data)
 
-    def export_excel(self, output_folder):
-        """匯出資料到 Excel 檔案"""
+    def build_report_frame(self):
+        """將所有計畫資料整理為寬表：每個計畫一列，科目欄位為所有計畫科目代碼的聯集"""
+        project_count = len(self.projects_data)
+        
+        # 基本資訊
+        info = pd.DataFrame([project['info'] for project in self.projects_data], columns=BASE_COLUMNS)
+        for column in AMOUNT_BASE_COLUMNS:
+            info[column] = self._to_amount(info[column])
+        
+        # 將科目小計攤平成長表（列號、科目代碼、金額），再以 pivot 轉為寬表
+        subtotal_counts = np.fromiter((len(project['subtotals']) for project in self.projects_data),
+                                      dtype=np.int64, count=project_count)
+        long_table = pd.DataFrame({
+            'row': np.repeat(np.arange(project_count), subtotal_counts),
+            'code': [code for project in self.projects_data for code in project['subtotals']],
+            'amount': [amount for project in self.projects_data for amount in project['subtotals'].values()]
+        })
+        long_table['amount'] = self._to_amount(long_table['amount'])
+        
+        subjects = long_table.pivot(index='row', columns='code', values='amount')
+        subjects = subjects.reindex(index=range(project_count), columns=sorted(subjects.columns))
+        subjects.columns.name = None
+        subjects.index.name = None
+        
+        return pd.concat([info, subjects], axis=1)
+
+    @staticmethod
+    def _to_amount(values):
+        """將含千分位的金額字串轉為數值，無法轉換者視為空值"""
+        return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+    def save_history(self, history_store=None):
+        """將本次查詢結果寫入歷史資料庫，回傳該次的 run_id"""
+        if not self.projects_data:
+            return None
+            
+        if history_store is None:
+            history_store = HistoryStore()
+        return history_store.append_run(self.projects_data)
+
+    @staticmethod
+    def plan_fingerprint(project):
+        """計算計畫內容的雜湊值，金額統一轉為整數後再計算，與資料來源格式無關"""
+        def normalize(value):
+            try:
+                return int(str(value).replace(',', '').strip())
+            except (TypeError, ValueError):
+                return None
+            
+        info = project['info']
+        payload = json.dumps([
+            info['計畫名稱'],
+            normalize(info['目前預算']),
+            normalize(info['可用餘額']),
+            sorted((code, normalize(amount)) for code, amount in project['subtotals'].items())
+        ], ensure_ascii=False)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _build_long_frame(self, projects):
+        """將計畫資料轉為長表：每個計畫的預算、餘額與各科目小計各佔一列"""
+        plan_codes = []
+        items = []
+        amounts = []
+        for project in projects:
+            plan_code = project['info']['計畫編號']
+            entries = [(column, project['info'][column]) for column in AMOUNT_BASE_COLUMNS]
+            entries += list(project['subtotals'].items())
+            plan_codes += [plan_code] * len(entries)
+            items += [item for item, _ in entries]
+            amounts += [amount for _, amount in entries]
+            
+        long_table = pd.DataFrame({'計畫編號': plan_codes, '項目': items, 'amount': amounts})
+        long_table['amount'] = self._to_amount(long_table['amount'])
+        return long_table
+
+    def build_delta_frame(self, previous_data):
+        """
+        比對本次與前次的計畫資料，只保留有異動的計畫與項目
+        
+        Args:
+            previous_data: 前次的計畫資料，格式與 projects_data 相同
+        
+        Returns:
+            DataFrame: 欄位為 DELTA_COLUMNS，每個異動項目一列
+        """
+        previous = {project['info']['計畫編號']: project for project in previous_data}
+        current = {project['info']['計畫編號']: project for project in self.projects_data}
+        
+        # 以雜湊值快速排除未異動的計畫
+        changed_codes = [
+            plan_code for plan_code, project in current.items()
+            if plan_code not in previous or self.plan_fingerprint(project) != self.plan_fingerprint(previous[plan_code])
+        ]
+        if not changed_codes:
+            return pd.DataFrame(columns=DELTA_COLUMNS)
+            
+        # 對異動計畫的所有金額欄位做向量化比對
+        after = self._build_long_frame([current[code] for code in changed_codes])
+        before = self._build_long_frame([previous[code] for code in changed_codes if code in previous])
+        merged = after.merge(before, on=['計畫編號', '項目'], how='outer', suffixes=('_after', '_before'))
+        
+        unchanged = (merged['amount_after'] == merged['amount_before']) | \
+                    (merged['amount_after'].isna() & merged['amount_before'].isna())
+        delta = merged[~unchanged].copy()
+        
+        delta['變更前'] = delta.pop('amount_before')
+        delta['變更後'] = delta.pop('amount_after')
+        delta['差額'] = delta['變更後'].fillna(0) - delta['變更前'].fillna(0)
+        
+        plan_info = pd.DataFrame([current[code]['info'] for code in changed_codes])[['學年度', '計畫編號', '計畫名稱']]
+        plan_info['狀態'] = np.where(plan_info['計畫編號'].isin(list(previous)), '異動', '新增計畫')
+        delta = delta.merge(plan_info, on='計畫編號', how='left')
+        
+        # 依計畫順序排列，預算與餘額在前，科目依代碼排序
+        delta['plan_order'] = delta['計畫編號'].map({code: index for index, code in enumerate(changed_codes)})
+        delta['item_order'] = delta['項目'].map({column: index for index, column in enumerate(AMOUNT_BASE_COLUMNS)}).fillna(len(AMOUNT_BASE_COLUMNS))
+        delta = delta.sort_values(['plan_order', 'item_order', '項目'], kind='stable')
+        return delta[DELTA_COLUMNS].reset_index(drop=True)
+
+    def load_previous_snapshot(self, history_store=None):
+        """從歷史資料庫取得本次各學年度計畫的前次資料"""
+        if history_store is None:
+            history_store = HistoryStore()
+            
+        academic_years = dict.fromkeys(project['info']['學年度'] for project in self.projects_data)
+        previous_data = []
+        for academic_year in academic_years:
+            previous_data += history_store.get_latest_snapshot(academic_year)
+        return previous_data
+
+    def export_delta(self, output_folder, timestamp=None, history_store=None):
+        """匯出與前次查詢相比有異動的計畫與科目，無異動時不產生檔案"""
         if not self.projects_data:
             return None
             
+        delta = self.build_delta_frame(self.load_previous_snapshot(history_store))
+        if delta.empty:
+            return None
+            
+        output_file = self.get_output_file(output_folder, 'xlsx', timestamp, prefix='計畫經費異動')
+        try:
+            with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+                delta.to_excel(writer, sheet_name='異動明細', index=False)
+                workbook = writer.book
+                worksheet = writer.sheets['異動明細']
+                
+                # 金額格式（包含千分位）
+                money_format = workbook.add_format({'num_format': '#,##0'})
+                
+                # 設定欄寬
+                worksheet.set_column('A:A', 12)  # 學年度
+                worksheet.set_column('B:B', 15)  # 計畫編號
+                worksheet.set_column('C:C', 40)  # 計畫名稱
+                worksheet.set_column('D:E', 12)  # 狀態和項目
+                worksheet.set_column('F:H', 15, money_format)  # 金額
+                worksheet.autofilter(0, 0, len(delta), len(DELTA_COLUMNS) - 1)
+                worksheet.freeze_panes(1, 0)
+                
+            return output_file
+            
+        except Exception as e:
+            if os.path.exists(output_file):
+                try:
+                    os.unlink(output_file)
+                except:
+                    pass
+            raise e
+
+    def get_output_file(self, output_folder, extension, timestamp=None, prefix='計畫經費報表'):
+        """取得輸出檔案的完整路徑，同一次匯出的各格式共用相同時間戳記"""
         # 判斷是否為 exe 執行環境
         if getattr(sys, 'frozen', False):
             # 如果是 exe 執行檔
@@ -106,10 +307,77 @@ class ExcelExporter:
         os.makedirs(output_path, exist_ok=True)
         
         # 生成檔案名稱
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return os.path.join(output_path, f'{prefix}_{timestamp}.{extension}')
+
+    def export(self, output_folder, formats=('xlsx',)):
+        """依選擇的格式匯出資料，回傳所有輸出檔案路徑"""
+        if not self.projects_data:
+            return []
+            
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = os.path.join(output_path, f'計畫經費報表_{timestamp}.xlsx')
+        output_files = []
+        for export_format in formats:
+            export_method = getattr(self, EXPORT_FORMATS[export_format]['method'])
+            output_file = export_method(output_folder, timestamp)
+            if output_file:
+                output_files.append(output_file)
+        return output_files
+
+    def export_csv(self, output_folder, timestamp=None):
+        """匯出資料到 CSV 檔案（含 BOM，Excel 可直接開啟）"""
+        if not self.projects_data:
+            return None
+            
+        output_file = self.get_output_file(output_folder, 'csv', timestamp)
+        return self._write_sink(output_file, lambda report: report.to_csv(
+            output_file, index=False, encoding='utf-8-sig', chunksize=1000))
+
+    def export_jsonl(self, output_folder, timestamp=None):
+        """匯出資料到 JSON Lines 檔案，每個計畫一行"""
+        if not self.projects_data:
+            return None
+            
+        output_file = self.get_output_file(output_folder, 'jsonl', timestamp)
+        return self._write_sink(output_file, lambda report: report.to_json(
+            output_file, orient='records', lines=True, force_ascii=False))
+
+    def export_parquet(self, output_folder, timestamp=None):
+        """匯出資料到 Parquet 檔案（欄式儲存，zstd 壓縮）"""
+        if not self.projects_data:
+            return None
+            
+        output_file = self.get_output_file(output_folder, 'parquet', timestamp)
+        return self._write_sink(output_file, lambda report: report.to_parquet(
+            output_file, engine='pyarrow', compression='zstd', index=False))
+
+    def _write_sink(self, output_file, write):
+        """以合併後的寬表寫入輸出檔，失敗時刪除未完成的檔案"""
+        try:
+            write(self.build_report_frame())
+            return output_file
+        except Exception as e:
+            if os.path.exists(output_file):
+                try:
+                    os.unlink(output_file)
+                except:
+                    pass
+            raise e
+
+    def export_excel(self, output_folder, timestamp=None):
+        """匯出資料到 Excel 檔案"""
+        if not self.projects_data:
+            return None
+            
+        output_file = self.get_output_file(output_folder, 'xlsx', timestamp)
         
         try:
+            # 建立合併後的寬表
+            report = self.build_report_frame()
+            amount_columns = list(report.columns[len(BASE_COLUMNS) - len(AMOUNT_BASE_COLUMNS):])
+            totals = report[amount_columns].sum()
+            
             # 建立 Excel 寫入器
             with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
                 workbook = writer.book
@@ -144,79 +412,75 @@ class ExcelExporter:
                     'num_format': '#,##0'
                 })
                 
-                # 間隔列的格式（淺灰色背景）
-                alt_row_format = workbook.add_format({
+                # 合計列格式
+                total_format = workbook.add_format({
+                    'bold': True,
                     'align': 'center',
                     'valign': 'vcenter',
                     'border': 1,
-                    'font_size': 10,
-                    'text_wrap': True,
-                    'bg_color': '#F5F5F5'  # 淺灰色背景
+                    'font_size': 10
                 })
                 
-                alt_row_money_format = workbook.add_format({
+                total_money_format = workbook.add_format({
+                    'bold': True,
                     'align': 'right',
                     'valign': 'vcenter',
                     'border': 1,
                     'font_size': 10,
-                    'num_format': '#,##0',
-                    'bg_color': '#F5F5F5'  # 淺灰色背景
+                    'num_format': '#,##0'
                 })
                 
-                # 設定起始行
-                current_row = 0
+                # 欄位設定：文字欄位不加總，金額欄位於合計列加總（SUBTOTAL 會隨篩選結果變動）
+                columns = []
+                for column in report.columns:
+                    if column in amount_columns:
+                        columns.append({
+                            'header': column,
+                            'header_format': header_format,
+                            'format': money_format,
+                            'total_function': 'sum',
+                            'total_value': float(totals[column]),
+                            'total_format': total_money_format
+                        })
+                    else:
+                        columns.append({
+                            'header': column,
+                            'header_format': header_format,
+                            'format': data_format,
+                            'total_format': total_format
+                        })
+                columns[0]['total_string'] = '合計'
                 
-                # 處理每個計畫
-                for project in self.projects_data:
-                    # 準備基本欄位
-                    base_headers = ['學年度', '計畫編號', '計畫名稱', '目前預算', '可用餘額']
-                    
-                    # 獲取此計畫的科目代碼
-                    subject_codes = sorted(project['subtotals'].keys())
-                    
-                    # 合併所有標題
-                    headers = base_headers + subject_codes
-                    
-                    # 設定欄寬
-                    worksheet.set_column('A:A', 12)  # 學年度
-                    worksheet.set_column('B:B', 15)  # 計畫編號
-                    worksheet.set_column('C:C', 40)  # 計畫名稱
-                    worksheet.set_column('D:E', 15)  # 預算和餘額
-                    worksheet.set_column(5, len(headers), 15)  # 其他科目欄位
-                    
-                    # 寫入標題
-                    for col, header in enumerate(headers):
-                        worksheet.write(current_row, col, header, header_format)
-                    
-                    # 準備資料行
-                    row_data = [
-                        project['info']['學年度'],
-                        project['info']['計畫編號'],
-                        project['info']['計畫名稱'],
-                        int(project['info']['目前預算'].replace(',', '')),
-                        int(project['info']['可用餘額'].replace(',', ''))
-                    ]
-                    
-                    # 添加各科目小計
-                    for code in subject_codes:
-                        row_data.append(int(project['subtotals'][code]))
-                    
-                    # 寫入資料（使用間隔列格式）
-                    for col, value in enumerate(row_data):
-                        # 判斷是否為金額欄位（從第4列開始的都是金額）
-                        if col >= 3:
-                            format_to_use = money_format if (current_row + 1) % 6 != 0 else alt_row_money_format
-                        else:
-                            format_to_use = data_format if (current_row + 1) % 6 != 0 else alt_row_format
-                        
-                        worksheet.write(current_row + 1, col, value, format_to_use)
-                    
-                    # 設定第一欄的行高
-                    worksheet.set_row(current_row, 30)     # 標題列高度
-                    worksheet.set_row(current_row + 1, 25) # 資料列高度
-                    
-                    # 新增空白行
-                    current_row += 3
+                # 建立表格：一列標題、每個計畫一列、最後一列合計，並提供篩選與間隔列底色
+                worksheet.add_table(0, 0, len(report) + 1, len(columns) - 1, {
+                    'name': 'BudgetReport',
+                    'columns': columns,
+                    'total_row': True,
+                    'autofilter': True,
+                    'banded_rows': True,
+                    'style': 'Table Style Light 15'
+                })
+                
+                # 逐欄只寫入有值的儲存格（多數計畫只有少數科目，空白儲存格不寫入以加快匯出）
+                for col_index, column in enumerate(report.columns):
+                    values = report[column].to_numpy()
+                    present = report[column].notna().to_numpy()
+                    write = worksheet.write_number if column in amount_columns else worksheet.write
+                    cell_format = columns[col_index]['format']
+                    for row_index, value in zip(present.nonzero()[0].tolist(), values[present].tolist()):
+                        write(row_index + 1, col_index, value, cell_format)
+                
+                # 設定欄寬
+                worksheet.set_column('A:A', 12)  # 學年度
+                worksheet.set_column('B:B', 15)  # 計畫編號
+                worksheet.set_column('C:C', 40)  # 計畫名稱
+                worksheet.set_column('D:E', 15)  # 預算和餘額
+                if len(columns) > len(BASE_COLUMNS):
+                    worksheet.set_column(len(BASE_COLUMNS), len(columns) - 1, 15)  # 其他科目欄位
+                
+                # 標題列高度，並凍結標題列與計畫編號、名稱欄
+                worksheet.set_row(0, 30)
+                worksheet.freeze_panes(1, 3)
                 
             return output_file
             
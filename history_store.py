@@ -0,0 +1,194 @@
+import os
+import sys
+import sqlite3
+from datetime import datetime
+
+class HistoryStore:
+    """以 SQLite 保存每次查詢的計畫經費資料，供歷史趨勢查詢"""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS plans (
+            run_id INTEGER NOT NULL REFERENCES runs(run_id),
+            academic_year TEXT NOT NULL,
+            plan_code TEXT NOT NULL,
+            plan_name TEXT,
+            budget INTEGER,
+            available INTEGER,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, plan_code)
+        );
+        CREATE TABLE IF NOT EXISTS subtotals (
+            run_id INTEGER NOT NULL,
+            plan_code TEXT NOT NULL,
+            subject_code TEXT NOT NULL,
+            amount INTEGER,
+            PRIMARY KEY (run_id, plan_code, subject_code)
+        );
+        CREATE INDEX IF NOT EXISTS idx_plans_code ON plans (plan_code, fetched_at);
+        CREATE INDEX IF NOT EXISTS idx_plans_year ON plans (academic_year, plan_code, run_id);
+        CREATE INDEX IF NOT EXISTS idx_subtotals_subject ON subtotals (plan_code, subject_code, run_id);
+    '''
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            # 判斷是否為執行檔環境
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.abspath(__file__))
+            db_path = os.path.join(base_path, 'data', 'history.db')
+
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        conn = self.connect()
+        try:
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+
+    def connect(self):
+        """建立資料庫連線（WAL 模式，讀取時不阻擋寫入）"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @staticmethod
+    def _to_amount(value):
+        """將含千分位的金額字串轉為整數，無法轉換時回傳 None"""
+        try:
+            return int(str(value).replace(',', '').strip())
+        except (TypeError, ValueError):
+            return None
+
+    def append_run(self, projects_data):
+        """將一次查詢的所有計畫資料寫入資料庫，回傳該次的 run_id"""
+        if not projects_data:
+            return None
+
+        created_at = datetime.now().isoformat(timespec='seconds')
+        conn = self.connect()
+        try:
+            with conn:
+                run_id = conn.execute('INSERT INTO runs (created_at) VALUES (?)', (created_at,)).lastrowid
+
+                # 同一計畫重複查詢時保留最後一筆
+                latest_projects = {project['info']['計畫編號']: project for project in projects_data}
+
+                plan_rows = []
+                subtotal_rows = []
+                for project in latest_projects.values():
+                    info = project['info']
+                    plan_code = info['計畫編號']
+                    plan_rows.append((
+                        run_id,
+                        info['學年度'],
+                        plan_code,
+                        info['計畫名稱'],
+                        self._to_amount(info['目前預算']),
+                        self._to_amount(info['可用餘額']),
+                        project.get('fetched_at', created_at)
+                    ))
+                    for subject_code, amount in project['subtotals'].items():
+                        subtotal_rows.append((run_id, plan_code, subject_code, self._to_amount(amount)))
+
+                conn.executemany('INSERT INTO plans VALUES (?, ?, ?, ?, ?, ?, ?)', plan_rows)
+                conn.executemany('INSERT INTO subtotals VALUES (?, ?, ?, ?)', subtotal_rows)
+            return run_id
+        finally:
+            conn.close()
+
+    def get_plan_trend(self, plan_code, academic_year=None, since=None):
+        """查詢單一計畫歷次的預算與可用餘額"""
+        query = 'SELECT run_id, academic_year, plan_name, budget, available, fetched_at FROM plans WHERE plan_code = ?'
+        params = [plan_code]
+        if academic_year:
+            query += ' AND academic_year = ?'
+            params.append(academic_year)
+        if since:
+            query += ' AND fetched_at >= ?'
+            params.append(since)
+        query += ' ORDER BY fetched_at'
+
+        conn = self.connect()
+        try:
+            return [dict(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def get_subject_trend(self, plan_code, subject_code, since=None):
+        """查詢單一計畫某科目歷次的小計金額"""
+        query = '''
+            SELECT s.run_id, p.academic_year, s.amount, p.fetched_at
+            FROM subtotals s JOIN plans p ON p.run_id = s.run_id AND p.plan_code = s.plan_code
+            WHERE s.plan_code = ? AND s.subject_code = ?
+        '''
+        params = [plan_code, subject_code]
+        if since:
+            query += ' AND p.fetched_at >= ?'
+            params.append(since)
+        query += ' ORDER BY p.fetched_at'
+
+        conn = self.connect()
+        try:
+            return [dict(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def get_latest_snapshot(self, academic_year, before_run_id=None):
+        """
+        取得指定學年度每個計畫最近一次的資料
+
+        Args:
+            academic_year: 學年度，格式與報表相同，如 "113學年度"
+            before_run_id: 若指定，只取此 run_id 之前的資料
+
+        Returns:
+            list: 與 ExcelExporter.projects_data 相同格式的計畫資料
+        """
+        query = '''
+            SELECT p.* FROM plans p
+            JOIN (
+                SELECT plan_code, MAX(run_id) AS run_id FROM plans
+                WHERE academic_year = ? AND run_id < ?
+                GROUP BY plan_code
+            ) latest ON latest.plan_code = p.plan_code AND latest.run_id = p.run_id
+            ORDER BY p.plan_code
+        '''
+        params = (academic_year, before_run_id if before_run_id is not None else sys.maxsize)
+
+        conn = self.connect()
+        try:
+            projects = {}
+            for row in conn.execute(query, params):
+                projects[(row['run_id'], row['plan_code'])] = {
+                    'info': {
+                        '學年度': row['academic_year'],
+                        '計畫編號': row['plan_code'],
+                        '計畫名稱': row['plan_name'],
+                        '目前預算': row['budget'],
+                        '可用餘額': row['available']
+                    },
+                    'subtotals': {},
+                    'fetched_at': row['fetched_at']
+                }
+
+            # 一次取回這些計畫的科目小計
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS snapshot_keys (run_id INTEGER, plan_code TEXT)')
+            conn.execute('DELETE FROM snapshot_keys')
+            conn.executemany('INSERT INTO snapshot_keys VALUES (?, ?)', list(projects.keys()))
+            for row in conn.execute('''
+                SELECT s.run_id, s.plan_code, s.subject_code, s.amount FROM subtotals s
+                JOIN snapshot_keys k ON k.run_id = s.run_id AND k.plan_code = s.plan_code
+            '''):
+                projects[(row['run_id'], row['plan_code'])]['subtotals'][row['subject_code']] = row['amount']
+
+            return list(projects.values())
+        finally:
+            conn.close()
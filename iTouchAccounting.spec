@@ -43,10 +43,26 @@ hiddenimports = [
     'numpy',
     'keyring',
     'xlsxwriter',
+    'pyarrow',
+    'psutil',
     'xml.parsers.expat',
     'pkg_resources.py2_warn',
     'pkg_resources',
     'chrome_manager',
+    'history_store',
+    'browser_manager',
+    'status_bus',
+    'plan_registry',
+    'run_metrics',
+    'webdriver_profiler',
+    'page_scripts',
+    'tab_manager',
+    'browser_watchdog',
+    'timeout_policy',
+    'page_recorder',
+    'page_archive',
+    'run_profiler',
+    'openpyxl',
     'winreg;platform_system=="Windows"',
 ]
 
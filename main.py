@@ -1,21 +1,42 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import scrolledtext
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.service import Service
-import keyring
+from tkinter import filedialog
 import time
 import os, sys
-from excel_exporter import ExcelExporter
+from excel_exporter import EXPORT_FORMATS
+from status_bus import StatusBus
+from plan_registry import PlanCodeRegistry
+from run_metrics import RunMetrics
+from timeout_policy import TimeoutPolicy
+from page_scripts import SUBMIT_PLAN_SCRIPT, FIND_FIRST_SCRIPT, SET_RESULT_TARGET_SCRIPT
 import logging
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from selenium.webdriver.common.action_chains import ActionChains
-from chrome_manager import ChromeDriverManager
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+# selenium 載入較慢，延後到初始化瀏覽器時才由 load_selenium() 載入
+webdriver = None
+By = None
+WebDriverWait = None
+EC = None
+TimeoutException = None
+ActionChains = None
+_selenium_lock = threading.Lock()
+
+def load_selenium():
+    """載入 selenium 相關模組（僅第一次呼叫時實際載入）"""
+    global webdriver, By, WebDriverWait, EC, TimeoutException, ActionChains
+    with _selenium_lock:
+        if webdriver is not None:
+            return
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.action_chains import ActionChains
+        from selenium import webdriver
 
 class ErrorLogger:
     def __init__(self, log_dir='logs'):
@@ -61,7 +82,7 @@ class ErrorLogger:
         try:
             current_time = time.time()
             for filename in os.listdir(self.log_dir):
-                if filename.startswith('error_') and filename.endswith('.log'):
+                if filename.startswith(('error_', 'status_', 'metrics_')) and filename.endswith(('.log', '.jsonl')):
                     filepath = os.path.join(self.log_dir, filename)
                     file_time = os.path.getmtime(filepath)
                     
@@ -83,51 +104,74 @@ class ItouchCrawler:
         # 加入開發人員控制變數(開發人員模式：True=顯示瀏覽器，False=無頭模式)
         self.DEVELOPER_MODE = False 
         
+        # 訊息文字框最多保留的行數，以及是否將完整狀態訊息另存至 logs/status_YYYYMMDD.log
+        self.STATUS_MAX_LINES = 1000
+        self.STATUS_LOG_TO_FILE = False
+        
+        # WebDriver 指令計數與計時（True=查詢結束時列出往返次數最多的指令、階段與計畫）
+        self.PROFILE_WEBDRIVER = False
+        
+        # 整次執行（登入到匯出）的效能分析（None=關閉，'cprofile' 或 'sampling'；也可用命令列參數 --profile 指定），
+        # 每次查詢結束時於匯出資料夾寫入 效能分析_*.prof 與耗時最多函式的文字摘要（見 run_profiler.py）
+        self.PROFILE_RUN = None
+        
+        # iTouch 登入頁網址（效能測試時改為本機模擬伺服器，見 benchmarks/mock_itouch.py）
+        self.ITOUCH_URL = 'https://itouch.cycu.edu.tw/home/'
+        
+        # 將查詢結果頁面去識別化後保存為效能測試樣本（True=存入 fixtures/pages，見 page_recorder.py）
+        self.RECORD_PAGES = False
+        
+        # 將查詢結果頁面的原始 HTML 壓縮封存至 data/archive，可從封存檔重新匯出（見 page_archive.py）
+        self.ARCHIVE_PAGES = True
+        
         self.root = root
         self.root.title('iTouch-會計帳目自動抓取程式 v4')
         
-        # 顯示載入提示
-        self.loading_label = ttk.Label(root, text="正在初始化...", font=('Helvetica', 12))
-        self.loading_label.place(relx=0.5, rely=0.5, anchor='center')
-        
         # 初始化錯誤記錄器
         self.error_logger = ErrorLogger()
         
-        # 在背景執行初始化
-        self.initialization_thread = threading.Thread(target=self.initialize_background)
-        self.initialization_thread.start()
+        # 各階段計時紀錄（logs/metrics_YYYYMMDD.jsonl）
+        self.metrics = RunMetrics(self.error_logger.log_dir)
+        
+        # 各步驟的等待逾時依過去實際等待時間調整（data/timeouts.json）
+        self.timeouts = TimeoutPolicy()
         
         # 初始化變數
         self.driver = None
         self.is_logged_in = False
-        self.plan_codes = []
+        self.plan_registry = PlanCodeRegistry()
+        self.visible_plan_codes = []  # 清單目前顯示（符合搜尋條件）的計畫編號
+        self.selected_plan_codes = set()  # 已選取的計畫編號，切換搜尋條件時保留
+        self.save_plan_codes_job = None
+        self.search_plan_job = None
+        
+        # 背景查詢執行器、取消旗標與介面更新佇列
+        self.query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='query')
+        self.query_future = None
+        self.reset_future = None  # 重啟程式時排在查詢之後的瀏覽器軟重置
+        self.cancel_event = threading.Event()
+        self.ui_queue = queue.Queue()
+        self.root.after(100, self.process_ui_queue)
         
         # 服務名稱和金鑰名稱
         self.service_id = 'itouch_crawler'
         self.username_key = 'saved_username'
         
-        # 綁定初始化完成事件
-        self.root.bind('<<InitializationComplete>>', lambda e: self.on_initialization_complete())
-        self.root.bind('<<InitializationError>>', lambda e: self.on_initialization_error())
+        # 瀏覽器選項於初始化瀏覽器時才建立，瀏覽器由 BrowserManager 管理並於重啟程式時沿用
+        self.options = None
+        self.browser = None
+        self.webdriver_profiler = None
+        self.page_recorder = None
+        self.page_archive = None
+        self.run_profiler = None
+        self.watchdog = None
         
-        # 定期檢查初始化狀態
-        self.check_initialization()
-
-    def initialize_background(self):
-        """在背景執行初始化工作"""
-        try:
-            # 預先準備瀏覽器選項
-            self.prepare_browser_options()
-            
-            # 完成後通知主線程
-            self.root.event_generate('<<InitializationComplete>>', when='tail')
-            
-        except Exception as e:
-            self.initialization_error = str(e)
-            self.root.event_generate('<<InitializationError>>', when='tail')
+        # 建立介面
+        self.setup_gui()
+        self.update_status("程式初始化完成")
 
     def prepare_browser_options(self):
-        """預先準備瀏覽器選項"""
+        """準備瀏覽器選項"""
         self.options = webdriver.ChromeOptions()
         
         # 根據開發人員模式決定是否使用無頭模式
@@ -145,123 +189,110 @@ class ItouchCrawler:
         self.options.add_argument('--disable-logging')
         self.options.add_argument('--log-level=3')
         self.options.page_load_strategy = 'eager'  # 加快頁面載入
-
-    def check_initialization(self):
-        """檢查初始化狀態"""
-        if not self.initialization_thread.is_alive():
-            self.loading_label.destroy()
-            self.setup_gui()
-        else:
-            self.root.after(100, self.check_initialization)
-
-    def on_initialization_complete(self):
-        """初始化完成的處理"""
-        self.loading_label.destroy()
-        self.setup_gui()
-        self.update_status("程式初始化完成")
-
-    def on_initialization_error(self):
-        """初始化錯誤的處理"""
-        self.loading_label.configure(text=f"初始化失敗: {self.initialization_error}")
-        self.error_logger.log_error(f"初始化失敗: {self.initialization_error}")
+        
+        # 添加更多兼容性選項
+        self.options.add_argument('--disable-web-security')
+        self.options.add_argument('--allow-running-insecure-content')
+        self.options.add_argument('--ignore-certificate-errors')
+        
+        # 避免被檢測為自動化軟體
+        self.options.add_argument('--disable-blink-features=AutomationControlled')
+        self.options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        self.options.add_experimental_option('useAutomationExtension', False)
+        return self.options
 
     def initialize_driver(self):
-        """使用自定義 ChromeDriver 管理器初始化瀏覽器"""
+        """取得瀏覽器：沿用仍可正常運作的瀏覽器，必要時才啟動新的瀏覽器"""
+        # 重啟程式時軟重置排在執行中的查詢之後，需等查詢停止且重置完成才能沿用瀏覽器，
+        # 避免重置在新的登入期間關閉分頁、清除 cookie，或兩個執行緒同時操作瀏覽器
+        reset_future = self.reset_future
+        if reset_future is not None:
+            if not reset_future.done():
+                self.update_status("正在等待上一批查詢停止...")
+            wait_futures([reset_future])
+            self.reset_future = None
+        
         if not self.driver:
             try:
-                # 使用自定義管理器獲取驅動程式路徑
-                driver_manager = ChromeDriverManager()
-                driver_path = driver_manager.install()
-                
-                # 添加更多兼容性選項
-                self.options.add_argument('--disable-dev-shm-usage')
-                self.options.add_argument('--no-sandbox')
-                self.options.add_argument('--disable-web-security')
-                self.options.add_argument('--allow-running-insecure-content')
-                self.options.add_argument('--ignore-certificate-errors')
-                
-                # 避免被檢測為自動化軟體
-                self.options.add_argument('--disable-blink-features=AutomationControlled')
-                self.options.add_experimental_option('excludeSwitches', ['enable-automation'])
-                self.options.add_experimental_option('useAutomationExtension', False)
-                
-                # 設定 chromedriver 執行環境
-                service = Service(driver_path)
+                # 載入 selenium 與瀏覽器管理器
+                load_selenium()
+                if self.browser is None:
+                    from browser_manager import BrowserManager
+                    self.browser = BrowserManager(self.prepare_browser_options, self.update_status)
+                    
+                # 新啟動的瀏覽器套用目前的頁面載入逾時
+                self.browser.page_load_timeout = self.timeouts.get('page_load')
+                self.driver = self.browser.get_driver()
                 
-                # 重試機制
-                max_retries = 3
-                retry_count = 0
+                # 開啟指令統計時包裝瀏覽器物件（重新啟動的瀏覽器需重新包裝）
+                if self.PROFILE_WEBDRIVER:
+                    if self.webdriver_profiler is None:
+                        from webdriver_profiler import WebDriverProfiler
+                        self.webdriver_profiler = WebDriverProfiler(self.metrics)
+                    self.webdriver_profiler.attach(self.driver)
                 
-                while retry_count < max_retries:
-                    try:
-                        self.driver = webdriver.Chrome(service=service, options=self.options)
-                        
-                        # 隱藏自動化控制特徵
-                        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                            'source': '''
-                                Object.defineProperty(navigator, 'webdriver', {
-                                    get: () => undefined
-                                });
-                            '''
-                        })
-                        
-                        # 設定頁面加載超時
-                        self.driver.set_page_load_timeout(30)
-                        
-                        # 當在無頭模式時才禁用登入按鈕
-                        if not self.DEVELOPER_MODE:
-                            self.login_button.config(state=tk.DISABLED)
-                            
-                        # 成功初始化，跳出迴圈
-                        break
-                        
-                    except Exception as e:
-                        retry_count += 1
-                        if retry_count >= max_retries:
-                            raise e
-                        else:
-                            self.update_status(f"初始化瀏覽器失敗，正在重試 ({retry_count}/{max_retries})...")
-                            time.sleep(2)  # 等待2秒後重試
+                # 當在無頭模式時才禁用登入按鈕
+                if not self.DEVELOPER_MODE:
+                    self.post_to_ui(lambda: self.login_button.config(state=tk.DISABLED))
                     
             except Exception as e:
                 self.error_logger.log_error("瀏覽器初始化失敗", e)
                 self.update_status("瀏覽器初始化失敗，請參考錯誤日誌", True)
 
+    def reset_browser(self):
+        """軟重置瀏覽器（保留 Chrome 程序），下次登入時沿用；瀏覽器無回應時會於下次登入重新啟動"""
+        self.driver = None
+        if self.browser:
+            self.browser.soft_reset()
+
     def login_and_query(self):
         """優化的登入查詢流程"""
         def background_login():
-            if self.login():
-                if self.navigate_to_query():
-                    self.root.event_generate('<<LoginSuccess>>', when='tail')
+            self.start_profiling()
+            try:
+                with self.metrics.phase('login'):
+                    logged_in = self.login()
+                if logged_in:
+                    with self.metrics.phase('navigate_to_query'):
+                        navigated = self.navigate_to_query()
+                    if navigated:
+                        self.root.event_generate('<<LoginSuccess>>', when='tail')
+                    else:
+                        self.root.event_generate('<<LoginError>>', when='tail')
                 else:
                     self.root.event_generate('<<LoginError>>', when='tail')
-            else:
-                self.root.event_generate('<<LoginError>>', when='tail')
+            finally:
+                self.stop_profiling()
 
         # 在背景執行登入
         threading.Thread(target=background_login).start()
 
+    def start_profiling(self):
+        """開啟效能分析時，開始分析目前執行緒（登入與查詢的分析結果累計到同一份報告）"""
+        if not self.PROFILE_RUN:
+            return
+        if self.run_profiler is None:
+            from run_profiler import RunProfiler
+            self.run_profiler = RunProfiler(self.PROFILE_RUN)
+        self.run_profiler.start()
+
+    def stop_profiling(self):
+        """暫停分析目前執行緒"""
+        if self.run_profiler:
+            self.run_profiler.stop()
+
     def update_status(self, message, is_error=False):
-        """更新狀態訊息"""
+        """更新狀態訊息（可從任何執行緒呼叫，由狀態訊息匯流排批次顯示）"""
         timestamp = time.strftime('%H:%M:%S')
         # 錯誤訊息
         if is_error and not message.startswith(("請先選擇學年", "請至少選擇一個計畫編號", "登入失敗", "請先登入系統")):
-            formatted_message = f'[{timestamp}] 發生錯誤，詳細資訊請查看錯誤記錄檔\n'
+            formatted_message = f'[{timestamp}] 發生錯誤，詳細資訊請查看錯誤記錄檔'
         else:
-            formatted_message = f'[{timestamp}] {message}\n'
-            
-        self.message_text.insert(tk.END, formatted_message)
-        if is_error:
-            # 計算標籤的起始和結束位置
-            last_line_start = self.message_text.index("end-1c linestart")
-            last_line_end = self.message_text.index("end-1c")
-            
-            # 只將紅色標記套用在這一行
-            self.message_text.tag_add('error', last_line_start, last_line_end)
-            self.message_text.tag_config('error', foreground='red')
-            
-        self.message_text.see(tk.END)
-        self.root.update()
+            formatted_message = f'[{timestamp}] {message}'
+
+        # 記錄檔保留完整訊息
+        log_message = f'[{timestamp}] {"[ERROR] " if is_error else ""}{message}'
+        self.status_bus.publish(formatted_message, is_error, log_message)
 
     def setup_gui(self):
         """設置GUI介面"""
@@ -338,6 +369,23 @@ class ItouchCrawler:
         self.year_select = ttk.Combobox(self.year_frame, state='readonly')
         self.year_select.grid(row=0, column=1, padx=5, pady=5)
         
+        # 匯出格式選擇（預設僅匯出 Excel）
+        ttk.Label(self.year_frame, text='匯出格式:').grid(row=1, column=0, padx=5, pady=5)
+        self.format_frame = ttk.Frame(self.year_frame)
+        self.format_frame.grid(row=1, column=1, columnspan=2, padx=5, pady=5, sticky=tk.W)
+        self.export_format_vars = {}
+        for col, (export_format, format_info) in enumerate(EXPORT_FORMATS.items()):
+            self.export_format_vars[export_format] = tk.BooleanVar(value=(export_format == 'xlsx'))
+            ttk.Checkbutton(self.format_frame, text=format_info['label'],
+                            variable=self.export_format_vars[export_format]).grid(row=0, column=col, padx=2)
+        
+        # 同時查詢數：大於 1 時先送出後續計畫，再依序讀取較早的結果
+        ttk.Label(self.year_frame, text='同時查詢:').grid(row=2, column=0, padx=5, pady=5)
+        self.pipeline_depth_var = tk.IntVar(value=1)
+        self.pipeline_depth_spinbox = ttk.Spinbox(self.year_frame, from_=1, to=4, width=5, state='readonly',
+                                                  textvariable=self.pipeline_depth_var)
+        self.pipeline_depth_spinbox.grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+        
         # 選擇提示標籤和查詢按鈕的容器框架
         self.select_frame = ttk.Frame(self.year_frame)
         self.select_frame.grid(row=5, column=0, columnspan=3, padx=5, pady=5)
@@ -362,29 +410,41 @@ class ItouchCrawler:
         self.add_plan_button = ttk.Button(self.plan_frame, text='加入計畫', command=self.add_plan_code)
         self.add_plan_button.grid(row=0, column=2, padx=5, pady=5)
         
+        # 計畫編號搜尋（輸入時篩選清單）
+        ttk.Label(self.plan_frame, text='搜尋:').grid(row=1, column=0, padx=5, pady=5)
+        self.plan_search_var = tk.StringVar()
+        self.plan_search_var.trace_add('write', lambda *args: self.schedule_plan_search())
+        self.plan_search_entry = ttk.Entry(self.plan_frame, textvariable=self.plan_search_var)
+        self.plan_search_entry.grid(row=1, column=1, padx=5, pady=5)
+        
+        # 匯入計畫按鈕（從 CSV / Excel 批次匯入）
+        self.import_plan_button = ttk.Button(self.plan_frame, text='匯入計畫', command=self.import_plan_codes)
+        self.import_plan_button.grid(row=1, column=2, padx=5, pady=5)
+        
         # 計畫編號清單(使用 Listbox 支援多重選擇)
         self.plan_codes_list = tk.Listbox(self.plan_frame, selectmode=tk.MULTIPLE, height=10)
-        self.plan_codes_list.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        self.plan_codes_list.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        self.plan_codes_list.bind('<<ListboxSelect>>', lambda e: self.sync_plan_selection())
         
         # 計畫編號捲軸
         scrollbar = ttk.Scrollbar(self.plan_frame, orient="vertical", command=self.plan_codes_list.yview)
-        scrollbar.grid(row=1, column=3, sticky=(tk.N, tk.S))
+        scrollbar.grid(row=2, column=3, sticky=(tk.N, tk.S))
         self.plan_codes_list.configure(yscrollcommand=scrollbar.set)
         
         # 移除選取計畫按鈕
         self.remove_plan_button = ttk.Button(self.plan_frame, text='移除選取計畫', 
                                            command=self.remove_selected_plans)
-        self.remove_plan_button.grid(row=2, column=2, padx=5, pady=5)
+        self.remove_plan_button.grid(row=3, column=2, padx=5, pady=5)
         
         # 全選按鈕
         self.select_all_button = ttk.Button(self.plan_frame, text='全選', 
                                       command=self.select_all_plans)
-        self.select_all_button.grid(row=2, column=0, padx=5, pady=5)
+        self.select_all_button.grid(row=3, column=0, padx=5, pady=5)
 
         # 取消全選按鈕
         self.deselect_all_button = ttk.Button(self.plan_frame, text='取消全選', 
                                         command=self.deselect_all_plans)
-        self.deselect_all_button.grid(row=2, column=1, padx=5, pady=5)
+        self.deselect_all_button.grid(row=3, column=1, padx=5, pady=5)
 
         # 按鈕框架 (左側框架)
         self.button_frame = ttk.Frame(self.left_frame)
@@ -398,6 +458,14 @@ class ItouchCrawler:
         self.message_text = scrolledtext.ScrolledText(self.right_container, height=25, width=60)
         self.message_text.grid(row=0, column=0, columnspan=2, pady=(0, 10), sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # 狀態訊息匯流排：背景執行緒送出的訊息由主執行緒批次寫入，文字框只保留最近的訊息
+        status_log_file = None
+        if self.STATUS_LOG_TO_FILE:
+            status_log_file = os.path.join(self.error_logger.log_dir, f"status_{time.strftime('%Y%m%d')}.log")
+        self.status_bus = StatusBus(self.root, self.message_text,
+                                    max_lines=self.STATUS_MAX_LINES,
+                                    log_file=status_log_file)
+        
         # 按鈕框架
         button_container = ttk.Frame(self.right_container)
         button_container.grid(row=1, column=0, columnspan=2, pady=(0, 5), sticky=(tk.W, tk.E))
@@ -409,6 +477,13 @@ class ItouchCrawler:
         self.query_button.grid(row=0, column=0, padx=(0, 5), sticky=(tk.W))
         self.query_button.grid_remove()  # 初始時隱藏按鈕
         
+        # 取消查詢按鈕（查詢執行中取代查詢按鈕）
+        self.cancel_button = ttk.Button(button_container, text='停止查詢',
+                                    command=self.cancel_query,
+                                    style='Large.TButton')
+        self.cancel_button.grid(row=0, column=0, padx=(0, 5), sticky=(tk.W))
+        self.cancel_button.grid_remove()
+        
         # 開啟報表位置按鈕 (右側)
         self.open_export_button = ttk.Button(button_container, text='報表位置',
                                          command=self.open_export_folder,
@@ -427,30 +502,46 @@ class ItouchCrawler:
         self.load_credentials()
         self.load_plan_codes()
         self.refresh_plan_codes_list()
-        self.excel_exporter = ExcelExporter()
+        self.excel_exporter = None
+
+    def show_login_running(self):
+        """登入期間禁用帳密輸入並顯示執行中標籤（於主執行緒執行）"""
+        self.username.config(state='disabled')
+        self.password.config(state='disabled')
+        self.remember_checkbox.config(state='disabled')
+        
+        self.login_button.grid_remove()  # 隱藏登入按鈕
+        self.running_label.grid()  # 顯示執行中標籤
+        self.restart_button.grid()  # 顯示重啟按鈕
+
+    def show_login_idle(self):
+        """登入失敗時恢復登入按鈕（於主執行緒執行）"""
+        self.running_label.grid_remove()
+        self.login_button.grid()
+        self.restart_button.grid_remove()  # 發生錯誤時隱藏重啟按鈕
+
+    def show_login_form(self):
+        """導航重試次數已達上限時恢復登入按鈕並啟用帳密輸入（於主執行緒執行）"""
+        self.show_login_idle()
+        self.username.config(state='normal')
+        self.password.config(state='normal')
+        self.remember_checkbox.config(state='normal')
 
     def login(self):
         """執行登入操作"""
         try:
-            # 禁用帳密輸入
-            self.username.config(state='disabled')
-            self.password.config(state='disabled')
-            self.remember_checkbox.config(state='disabled')
-            
-            self.login_button.grid_remove()  # 隱藏登入按鈕
-            self.running_label.grid()  # 顯示執行中標籤
-            self.restart_button.grid()  # 顯示重啟按鈕
-            self.root.update()  # 立即更新界面
+            # 登入於背景執行緒執行，介面狀態交由主執行緒更新
+            self.post_to_ui(self.show_login_running)
             
             self.initialize_driver()
-            self.driver.get('https://itouch.cycu.edu.tw/home/')
+            start = time.perf_counter()
+            self.driver.get(self.ITOUCH_URL)
+            self.timeouts.record('page_load', time.perf_counter() - start)
             
             self.update_status("正在登入系統...")
             
             # 等待登入表單出現
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "UserNm"))
-            )
+            self.wait_until('login', EC.presence_of_element_located((By.NAME, "UserNm")))
             
             # 輸入帳號密碼
             username_input = self.driver.find_element(By.NAME, "UserNm")
@@ -465,9 +556,7 @@ class ItouchCrawler:
             
             # 等待登入後的元素出現
             try:
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "app-header__logo"))
-                )
+                self.wait_until('login', EC.presence_of_element_located((By.CLASS_NAME, "app-header__logo")))
                 self.update_status("登入成功")
                 self.is_logged_in = True
                 
@@ -484,9 +573,7 @@ class ItouchCrawler:
                 self.update_status("登入失敗，請檢查帳號密碼", True)
                 self.is_logged_in = False
                 # 登入失敗時恢復登入按鈕
-                self.running_label.grid_remove()
-                self.login_button.grid()
-                self.restart_button.grid_remove()  # 發生錯誤時隱藏重啟按鈕
+                self.post_to_ui(self.show_login_idle)
                 return False
                 
         except Exception as e:
@@ -494,13 +581,12 @@ class ItouchCrawler:
             self.update_status("登入失敗", True)
             self.is_logged_in = False
             # 發生錯誤時恢復登入按鈕
-            self.running_label.grid_remove()
-            self.login_button.grid()
-            self.restart_button.grid_remove()  # 發生錯誤時隱藏重啟按鈕
+            self.post_to_ui(self.show_login_idle)
             return False
 
     def save_credentials(self):
         """儲存認證資訊"""
+        import keyring
         if self.remember_var.get():
             username = self.username.get()
             password = self.password.get()
@@ -517,6 +603,7 @@ class ItouchCrawler:
 
     def load_credentials(self):
         """載入儲存的認證資訊"""
+        import keyring
         try:
             saved_username = keyring.get_password(self.service_id, self.username_key)
             if saved_username:
@@ -530,103 +617,131 @@ class ItouchCrawler:
 
     def load_plan_codes(self):
         """讀取本地儲存的計畫編號清單"""
-        # 判斷是否為執行檔
-        if getattr(sys, 'frozen', False):
-            # 如果是執行檔，使用執行檔所在目錄
-            base_path = os.path.dirname(sys.executable)
-        else:
-            # 如果是一般 Python 腳本，使用腳本所在目錄
-            base_path = os.path.dirname(__file__)
-            
-        plans_path = os.path.join(base_path, 'plan_codes.txt')
-        self.plan_codes = []
-        
-        # 如果檔案不存在，建立一個空的檔案
-        if not os.path.exists(plans_path):
-            try:
-                with open(plans_path, 'w', encoding='utf-8') as f:
-                    pass  # 建立空檔案
-            except Exception as e:
-                self.error_logger.log_error("建立計畫編號檔案失敗", e)
-                return
-
         try:
-            with open(plans_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    # 去除空白並檢查是否為註解或空行
-                    code = line.strip()
-                    if code and not code.startswith('#') and code not in self.plan_codes:
-                        self.plan_codes.append(code)
+            self.plan_registry.load()
         except Exception as e:
             self.error_logger.log_error("讀取計畫編號檔案失敗", e)
             self.update_status("讀取計畫編號檔案失敗", True)
 
     def save_plan_codes(self):
-        """儲存計畫編號清單到本地檔案"""
-        # 判斷是否為執行檔
-        if getattr(sys, 'frozen', False):
-            # 如果是執行檔，使用執行檔所在目錄
-            base_path = os.path.dirname(sys.executable)
-        else:
-            # 如果是一般 Python 腳本，使用腳本所在目錄
-            base_path = os.path.dirname(os.path.abspath(__file__))
-            
-        plans_path = os.path.join(base_path, 'plan_codes.txt')
-        
+        """將整份計畫編號清單寫回本地檔案"""
+        self.save_plan_codes_job = None
         try:
-            with open(plans_path, 'w', encoding='utf-8') as f:
-                for code in self.plan_codes:
-                    f.write(f"{code}\n")
+            self.plan_registry.save()
             self.update_status("計畫編號已儲存")
         except Exception as e:
             self.error_logger.log_error("儲存計畫編號檔案失敗", e)
             self.update_status("儲存計畫編號檔案失敗", True)
 
-    def add_plan_code(self):
-        """新增計畫編號到清單"""
-        code = self.plan_code_entry.get().strip().upper()
-        if code and code not in self.plan_codes:
-            self.plan_codes.append(code)
-            self.plan_codes_list.insert(tk.END, code)
+    def schedule_save_plan_codes(self, delay=1000):
+        """延遲儲存計畫編號清單，連續移除多次時只寫入一次檔案"""
+        if self.save_plan_codes_job:
+            self.root.after_cancel(self.save_plan_codes_job)
+        self.save_plan_codes_job = self.root.after(delay, self.save_plan_codes)
+
+    def flush_plan_codes(self):
+        """立即寫入尚未儲存的變更（關閉程式前呼叫）"""
+        if self.save_plan_codes_job:
+            self.root.after_cancel(self.save_plan_codes_job)
+            self.save_plan_codes_job = None
+        if self.plan_registry.dirty:
             self.save_plan_codes()
+
+    def add_plan_code(self):
+        """新增計畫編號到清單（新增的編號直接附加到檔案尾端）"""
+        code = self.plan_code_entry.get()
+        try:
+            if self.plan_registry.add([code]):
+                self.refresh_plan_codes_list()
+                self.update_status("計畫編號已儲存")
+        except Exception as e:
+            self.error_logger.log_error("儲存計畫編號檔案失敗", e)
+            self.update_status("儲存計畫編號檔案失敗", True)
         self.plan_code_entry.delete(0, tk.END)
 
+    def import_plan_codes(self):
+        """從 CSV / Excel 檔案批次匯入計畫編號"""
+        file_path = filedialog.askopenfilename(
+            title='選擇要匯入的計畫編號檔案',
+            filetypes=[('計畫編號檔案', '*.csv *.txt *.xlsx *.xlsm'), ('所有檔案', '*.*')]
+        )
+        if not file_path:
+            return
+        try:
+            added = self.plan_registry.import_file(file_path)
+            self.refresh_plan_codes_list()
+            self.update_status(f"已匯入 {len(added)} 個計畫編號（共 {len(self.plan_registry)} 個）")
+        except Exception as e:
+            self.error_logger.log_error(f"匯入計畫編號失敗 ({file_path})", e)
+            self.update_status(f"匯入計畫編號失敗: {str(e)}", True)
+
+    def schedule_plan_search(self, delay=200):
+        """輸入搜尋字串時延遲更新清單，避免每個按鍵都重新篩選"""
+        if self.search_plan_job:
+            self.root.after_cancel(self.search_plan_job)
+        self.search_plan_job = self.root.after(delay, self.refresh_plan_codes_list)
+
     def refresh_plan_codes_list(self):
-        """更新計畫編號清單顯示"""
+        """依搜尋字串更新計畫編號清單顯示，並還原已選取的項目"""
+        self.search_plan_job = None
+        keyword = self.plan_search_var.get()
+        self.visible_plan_codes = self.plan_registry.search(keyword)
+        
+        # 以單次呼叫重新填入清單
         self.plan_codes_list.delete(0, tk.END)
-        for code in self.plan_codes:
-            self.plan_codes_list.insert(tk.END, code)
+        if self.visible_plan_codes:
+            self.plan_codes_list.insert(tk.END, *self.visible_plan_codes)
+        for idx, code in enumerate(self.visible_plan_codes):
+            if code in self.selected_plan_codes:
+                self.plan_codes_list.select_set(idx)
+
+    def sync_plan_selection(self):
+        """將清單中目前顯示項目的選取狀態同步到已選取集合"""
+        selected_indices = set(self.plan_codes_list.curselection())
+        for idx, code in enumerate(self.visible_plan_codes):
+            if idx in selected_indices:
+                self.selected_plan_codes.add(code)
+            else:
+                self.selected_plan_codes.discard(code)
 
     def get_selected_plan_codes(self):
-        """獲取已選擇的計畫編號"""
-        return [self.plan_codes_list.get(idx) for idx in self.plan_codes_list.curselection()]
+        """獲取已選擇的計畫編號（依清單順序，包含目前搜尋條件未顯示的項目）"""
+        return [code for code in self.plan_registry if code in self.selected_plan_codes]
 
     def remove_selected_plans(self):
-        """移除選取的計畫編號"""
-        selected_indices = self.plan_codes_list.curselection()
-        if not selected_indices:
+        """移除清單中目前顯示且已選取的計畫編號"""
+        selected_codes = [self.visible_plan_codes[idx] for idx in self.plan_codes_list.curselection()]
+        if not selected_codes:
             return
-        # 由大到小排序，以避免刪除時索引變化的問題
-        selected_indices = sorted(selected_indices, reverse=True)
-        # 移除選取的項目
-        for idx in selected_indices:
-            code = self.plan_codes_list.get(idx)
-            self.plan_codes.remove(code)
-            self.plan_codes_list.delete(idx)
-        self.save_plan_codes()
+        self.plan_registry.remove(selected_codes)
+        self.selected_plan_codes.difference_update(selected_codes)
+        self.refresh_plan_codes_list()
+        self.schedule_save_plan_codes()
+
+    def get_selected_export_formats(self):
+        """獲取已選擇的匯出格式，未選擇時預設匯出 Excel"""
+        formats = [export_format for export_format, var in self.export_format_vars.items() if var.get()]
+        return formats or ['xlsx']
 
     def select_all_plans(self):
         """全選所有計畫編號"""
         self.plan_codes_list.select_set(0, tk.END)
+        self.selected_plan_codes.update(self.visible_plan_codes)
         self.update_status("已全選所有計畫編號")
 
     def deselect_all_plans(self):
         """取消全選所有計畫編號"""
         self.plan_codes_list.selection_clear(0, tk.END)
+        self.selected_plan_codes.clear()
         self.update_status("已取消全選所有計畫編號")
 
-    def navigate_to_query(self):
-        """導航到會計經費查詢系統，支援多種導航路徑"""
+    def navigate_to_query(self, load_years=True):
+        """
+        導航到會計經費查詢系統，支援多種導航路徑
+
+        Args:
+            load_years: 是否載入學年選單並顯示查詢按鈕（查詢途中重新啟動瀏覽器時不需要）
+        """
         if not self.is_logged_in:
             self.update_status("請先登入系統", True)
             return False
@@ -641,24 +756,14 @@ class ItouchCrawler:
                 self.update_status("導航重試次數已達上限，請手動重新啟動程式", True)
                 # 重置重試計數
                 self.retry_count = 0
-                # 清理瀏覽器資源
-                if self.driver:
-                    self.driver.quit()
-                    self.driver = None
+                # 重置瀏覽器狀態
+                self.reset_browser()
                 # 重置登入狀態
                 self.is_logged_in = False
-                # 恢復介面狀態
-                self.running_label.grid_remove()
-                self.login_button.grid()
-                self.restart_button.grid_remove()
-                self.username.config(state='normal')
-                self.password.config(state='normal')
-                self.remember_checkbox.config(state='normal')
+                # 恢復介面狀態（導航可能於登入或查詢的背景執行緒執行，交由主執行緒更新）
+                self.post_to_ui(self.show_login_form)
                 return False
 
-            # 減少等待時間
-            wait = WebDriverWait(self.driver, 5)  # 從10秒減少到5秒
-            
             # ====== 處理網站地圖按鈕 ======
             map_selectors = [
                 (By.CLASS_NAME, "info"),
@@ -666,262 +771,71 @@ class ItouchCrawler:
                 (By.XPATH, "//a[contains(., '網站地圖')]"),
                 (By.CSS_SELECTOR, ".info")
             ]
-            
-            # 依序嘗試不同的選擇器
-            map_button = None
-            for selector in map_selectors:
-                try:
-                    # 縮短等待時間
-                    map_button = WebDriverWait(self.driver, 3).until(EC.element_to_be_clickable(selector))
-                    if map_button:
-                        break
-                except:
-                    continue
-                    
-            if not map_button:
+            if self.click_first(map_selectors, "網站地圖") is None:
                 raise Exception("找不到網站地圖按鈕")
-                
-            # 安全點擊地圖按鈕
-            try:
-                map_button.click()
-            except:
-                try:
-                    # 嘗試使用JavaScript點擊
-                    self.driver.execute_script("arguments[0].click();", map_button)
-                except:
-                    # 如果仍然失敗，嘗試第三種方法
-                    action = ActionChains(self.driver)
-                    action.move_to_element(map_button).click().perform()
-            
-            self.update_status("點擊網站地圖")
-            
-            # 縮短等待選單出現的時間
-            time.sleep(0.5)  # 從1秒減少到0.5秒
             
+            # ====== 直接點擊請款.授權.查詢系統，或從會計室選單進入 ======
+            # 兩條路徑的定位器一起查找，以索引判斷找到的是哪一個，不必等直接路徑逾時才改走選單
             direct_path_selectors = [
-                "//a[contains(., '請款.授權.查詢系統')]",
-                "//a[contains(text(), '請款') and contains(text(), '授權') and contains(text(), '查詢')]"
+                (By.XPATH, "//a[contains(., '請款.授權.查詢系統')]"),
+                (By.XPATH, "//a[contains(text(), '請款') and contains(text(), '授權') and contains(text(), '查詢')]")
             ]
-            
-            # 縮短直接路徑的等待時間
-            direct_path_found = False
-            for selector in direct_path_selectors:
-                try:
-                    query_element = WebDriverWait(self.driver, 3).until(
-                        EC.visibility_of_element_located((By.XPATH, selector)),
-                        message="直接路徑未找到請款.授權.查詢系統"
-                    )
-                    # 嘗試點擊
-                    try:
-                        query_element.click()
-                        self.update_status("直接點擊請款.授權.查詢系統")
-                        direct_path_found = True
-                        break
-                    except:
-                        try:
-                            # JavaScript點擊
-                            self.driver.execute_script("arguments[0].click();", query_element)
-                            self.update_status("直接點擊請款.授權.查詢系統 (JS)")
-                            direct_path_found = True
-                            break
-                        except:
-                            continue
-                except:
-                    # 如果找不到，則繼續嘗試傳統路徑
-                    pass
+            accounting_selectors = [
+                (By.XPATH, "//li[contains(@class, 'menuLevel1Folder') and contains(., '會計室')]"),
+                (By.XPATH, "//div[contains(@class, 'menuItem')]//a[contains(text(), '會計室')]"),
+                (By.XPATH, "//span[contains(text(), '會計室')]"),
+                (By.XPATH, "//a[contains(text(), '會計室')]")
+            ]
+            names = ["請款.授權.查詢系統"] * len(direct_path_selectors) + ["會計室"] * len(accounting_selectors)
+            index = self.click_first(direct_path_selectors + accounting_selectors, names)
+            if index is None:
+                raise Exception("無法找到或點擊會計室選單")
             
             # 如果直接路徑未成功，則使用傳統路徑（透過會計室->經費請款系統）
-            if not direct_path_found:
-                # ====== 等待選單出現並點擊會計室 ======
-                accounting_selectors = [
-                    "//li[contains(@class, 'menuLevel1Folder') and contains(., '會計室')]",
-                    "//div[contains(@class, 'menuItem')]//a[contains(text(), '會計室')]",
-                    "//span[contains(text(), '會計室')]",
-                    "//a[contains(text(), '會計室')]"
-                ]
-                
-                # 加速會計室選單項目的查找 - 並行處理
-                def try_find_and_click(selector):
-                    try:
-                        element = self.driver.find_element(By.XPATH, selector)
-                        return element
-                    except:
-                        return None
-                
-                # 使用線程池並行查詢所有選擇器
-                with ThreadPoolExecutor(max_workers=4) as executor:
-                    elements = list(executor.map(try_find_and_click, accounting_selectors))
-                
-                # 過濾出找到的元素
-                found_elements = [el for el in elements if el is not None]
-                
-                accounting_found = False
-                for element in found_elements:
-                    try:
-                        element.click()
-                        self.update_status("點擊會計室")
-                        accounting_found = True
-                        break
-                    except:
-                        try:
-                            self.driver.execute_script("arguments[0].click();", element)
-                            self.update_status("點擊會計室 (JS)")
-                            accounting_found = True
-                            break
-                        except:
-                            continue
-                
-                # 如果並行處理失敗，使用原始方法逐一嘗試
-                if not accounting_found:
-                    for selector in accounting_selectors:
-                        try:
-                            accounting_element = WebDriverWait(self.driver, 3).until(
-                                EC.visibility_of_element_located((By.XPATH, selector))
-                            )
-                            try:
-                                accounting_element.click()
-                                self.update_status("點擊會計室")
-                                accounting_found = True
-                                break
-                            except:
-                                try:
-                                    self.driver.execute_script("arguments[0].click();", accounting_element)
-                                    self.update_status("點擊會計室 (JS)")
-                                    accounting_found = True
-                                    break
-                                except Exception as e:
-                                    self.error_logger.log_error(f"點擊會計室失敗 (使用選擇器 {selector}): {str(e)}")
-                                    continue
-                        except:
-                            continue
-                        
-                if not accounting_found:
-                    raise Exception("無法找到或點擊會計室選單")
-                    
-                # ====== 等待經費請款系統選單出現 ======
-                # 縮短等待時間
-                time.sleep(0.3)  # 從1秒減少到0.3秒
-                
+            if index >= len(direct_path_selectors):
+                # ====== 點擊經費請款系統 ======
                 payment_selectors = [
-                    "//li[contains(@class, 'menuLevel2Folder') and contains(., '經費請款系統')]",
-                    "//li[contains(text(), '經費請款系統')]",
-                    "//a[contains(text(), '經費請款系統')]"
+                    (By.XPATH, "//li[contains(@class, 'menuLevel2Folder') and contains(., '經費請款系統')]"),
+                    (By.XPATH, "//li[contains(text(), '經費請款系統')]"),
+                    (By.XPATH, "//a[contains(text(), '經費請款系統')]")
                 ]
-                
-                # 嘗試多個選擇器，縮短等待時間
-                payment_found = False
-                for selector in payment_selectors:
-                    try:
-                        payment_element = WebDriverWait(self.driver, 3).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        try:
-                            payment_element.click()
-                            self.update_status("點擊經費請款系統")
-                            payment_found = True
-                            break
-                        except:
-                            try:
-                                self.driver.execute_script("arguments[0].click();", payment_element)
-                                self.update_status("點擊經費請款系統 (JS)")
-                                payment_found = True
-                                break
-                            except:
-                                continue
-                    except:
-                        continue
-                        
-                if not payment_found:
+                if self.click_first(payment_selectors, "經費請款系統") is None:
                     raise Exception("無法找到或點擊經費請款系統選單")
                 
-                # ====== 等待請款查詢系統選項出現 ======
-                # 縮短等待時間
-                time.sleep(0.3)  # 從1秒減少到0.3秒
-                
-                query_selectors = [
-                    "//a[contains(., '請款.授權.查詢系統')]",
-                    "//a[contains(text(), '請款') and contains(text(), '授權') and contains(text(), '查詢')]",
-                    "//a[contains(text(), '請款.授權.查詢')]"
+                # ====== 點擊請款.授權.查詢系統 ======
+                query_selectors = direct_path_selectors + [
+                    (By.XPATH, "//a[contains(text(), '請款.授權.查詢')]")
                 ]
-                
-                # 嘗試多個選擇器，縮短等待時間
-                query_found = False
-                for selector in query_selectors:
-                    try:
-                        query_element = WebDriverWait(self.driver, 3).until(
-                            EC.element_to_be_clickable((By.XPATH, selector))
-                        )
-                        try:
-                            query_element.click()
-                            self.update_status("點擊請款.授權.查詢系統")
-                            query_found = True
-                            break
-                        except:
-                            try:
-                                self.driver.execute_script("arguments[0].click();", query_element)
-                                self.update_status("點擊請款.授權.查詢系統 (JS)")
-                                query_found = True
-                                break
-                            except:
-                                continue
-                    except:
-                        continue
-                        
-                if not query_found:
+                if self.click_first(query_selectors, "請款.授權.查詢系統") is None:
                     raise Exception("無法找到或點擊請款.授權.查詢系統選單")
             
-            # 處理新分頁 - 縮短等待時間
-            WebDriverWait(self.driver, 5).until(lambda d: len(d.window_handles) > 1)
+            # 處理新分頁
+            self.wait_until('window', lambda d: len(d.window_handles) > 1)
             self.driver.switch_to.window(self.driver.window_handles[-1])
             
             # ====== 點擊會計經費查詢 ======
             finance_selectors = [
-                "//a[contains(., '會計經費查詢')]",
-                "//a[text()='會計經費查詢']"
+                (By.XPATH, "//a[contains(., '會計經費查詢')]"),
+                (By.XPATH, "//a[text()='會計經費查詢']")
             ]
-            
-            # 縮短等待時間
-            finance_found = False
-            for selector in finance_selectors:
-                try:
-                    finance_element = WebDriverWait(self.driver, 3).until(
-                        EC.element_to_be_clickable((By.XPATH, selector))
-                    )
-                    try:
-                        finance_element.click()
-                        self.update_status("點擊會計經費查詢")
-                        finance_found = True
-                        break
-                    except:
-                        try:
-                            self.driver.execute_script("arguments[0].click();", finance_element)
-                            self.update_status("點擊會計經費查詢 (JS)")
-                            finance_found = True
-                            break
-                        except:
-                            continue
-                except:
-                    continue
-                    
-            if not finance_found:
+            if self.click_first(finance_selectors, "會計經費查詢") is None:
                 raise Exception("無法找到或點擊會計經費查詢")
             
-            # 處理最後的分頁切換 - 縮短等待時間
-            WebDriverWait(self.driver, 5).until(lambda d: len(d.window_handles) > 2)
+            # 處理最後的分頁切換
+            self.wait_until('window', lambda d: len(d.window_handles) > 2)
             self.driver.switch_to.window(self.driver.window_handles[-1])
             
             self.update_status("成功進入會計經費查詢系統")
-            self.load_year_options()
+            if load_years:
+                self.load_year_options()
             return True
             
         except Exception as e:
             self.error_logger.log_error("導航過程發生錯誤", e)
             self.update_status("導航失敗，嘗試重新登入...", True)
             
-            # 關閉瀏覽器
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            # 重置瀏覽器狀態（保留 Chrome 程序，重新登入時沿用）
+            self.reset_browser()
                 
             # 重置登入狀態
             self.is_logged_in = False
@@ -932,18 +846,13 @@ class ItouchCrawler:
             # 重新登入並導航
             if self.retry_count < 2:  # 只有在未達到最大重試次數時才重試
                 if self.login():
-                    return self.navigate_to_query()
+                    return self.navigate_to_query(load_years)
             else:
                 self.update_status("重試次數已達上限，請手動重新啟動程式", True)
                 # 重置重試計數
                 self.retry_count = 0
                 # 恢復介面狀態
-                self.running_label.grid_remove()
-                self.login_button.grid()
-                self.restart_button.grid_remove()
-                self.username.config(state='normal')
-                self.password.config(state='normal')
-                self.remember_checkbox.config(state='normal')
+                self.post_to_ui(self.show_login_form)
             return False
 
     def load_year_options(self):
@@ -951,54 +860,112 @@ class ItouchCrawler:
         try:
             # 縮短等待時間
             time.sleep(0.5)  # 從1秒減少到0.5秒
-            # 重新獲取學年選擇元素，縮短等待時間
-            year_select_el = WebDriverWait(self.driver, 5).until(  # 從10秒減少到5秒
-                EC.presence_of_element_located((By.NAME, "swYear"))
-            )
+            # 重新獲取學年選擇元素
+            year_select_el = self.wait_until('element', EC.presence_of_element_located((By.NAME, "swYear")))
             options = year_select_el.find_elements(By.TAG_NAME, "option")
             
             # 過濾掉無效值
             year_list = [opt.get_attribute("value") for opt in options 
                         if opt.get_attribute("value").isdigit()]
             
-            self.year_select['values'] = year_list
-            if year_list:
-                self.year_select.set(year_list[0])
-                self.select_label.grid()  # 顯示選擇提示
+            # 於背景執行緒讀取網頁，學年選單與按鈕交由主執行緒更新
+            self.post_to_ui(self.show_year_options, year_list)
             self.update_status(f"成功載入學年選單: {year_list}")
-            self.show_select_year_and_report_button()
         except Exception as e:
             self.error_logger.log_error("載入學年選單失敗", e)
             self.update_status(f"載入學年選單失敗: {str(e)}", True)
 
+    def show_year_options(self, year_list):
+        """更新學年選單並顯示查詢按鈕（於主執行緒執行）"""
+        self.year_select['values'] = year_list
+        if year_list:
+            self.year_select.set(year_list[0])
+        self.show_select_year_and_report_button()
+
     def show_select_year_and_report_button(self):
         """在載入學年後顯示選擇學年和報表的按鈕"""
         self.select_label.grid()  # 顯示提示標籤
         self.query_button.grid()  # 顯示查詢按鈕
 
     def select_year_and_report(self):
-        try:
-            # 禁用查詢按鈕和開啟報表按鈕
-            self.query_button.config(state=tk.DISABLED)
-            self.open_export_button.config(state=tk.DISABLED)
+        """開始查詢：在主執行緒讀取查詢設定後，將查詢與匯出交由背景執行"""
+        # 上一批查詢仍在執行中
+        if self.query_future and not self.query_future.done():
+            return False
             
-            selected_year = self.year_select.get()
-            if not selected_year:
-                self.update_status("請先選擇學年", True)
-                # 重新啟用按鈕
-                self.query_button.config(state=tk.NORMAL)
-                self.open_export_button.config(state=tk.NORMAL)
-                return False
+        selected_year = self.year_select.get()
+        if not selected_year:
+            self.update_status("請先選擇學年", True)
+            return False
 
-            selected_plans = self.get_selected_plan_codes()
-            if not selected_plans:
-                self.update_status("請至少選擇一個計畫編號", True)
-                # 重新啟用按鈕
-                self.query_button.config(state=tk.NORMAL)
-                self.open_export_button.config(state=tk.NORMAL)
-                return False
+        selected_plans = self.get_selected_plan_codes()
+        if not selected_plans:
+            self.update_status("請至少選擇一個計畫編號", True)
+            return False
+            
+        export_formats = self.get_selected_export_formats()
+        depth = self.pipeline_depth_var.get()
+        
+        # 禁用開啟報表按鈕，並以取消按鈕取代查詢按鈕
+        self.open_export_button.config(state=tk.DISABLED)
+        self.query_button.grid_remove()
+        self.cancel_button.config(state=tk.NORMAL)
+        self.cancel_button.grid()
+        
+        self.cancel_event.clear()
+        self.query_future = self.query_executor.submit(
+            self.run_query_batch, selected_year, selected_plans, export_formats, depth)
+        return True
 
-            try:
+    def cancel_query(self):
+        """取消執行中的查詢，目前計畫完成後停止並匯出已完成的資料"""
+        if self.query_future and not self.query_future.done():
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.update_status("正在取消查詢，將於目前計畫完成後停止")
+
+    def on_query_finished(self):
+        """查詢結束後恢復按鈕狀態（於主執行緒執行）"""
+        self.cancel_button.grid_remove()
+        self.open_export_button.config(state=tk.NORMAL)
+        # 查詢期間若已重啟程式，需重新登入後才顯示查詢按鈕
+        if self.is_logged_in:
+            self.query_button.grid()
+            self.query_button.config(state=tk.NORMAL)
+
+    def post_to_ui(self, func, *args):
+        """將介面操作排入佇列，由主執行緒執行（Tk 元件不可跨執行緒操作）"""
+        self.ui_queue.put((func, args))
+
+    def process_ui_queue(self):
+        """定期在主執行緒處理背景執行緒送來的介面操作"""
+        try:
+            while True:
+                func, args = self.ui_queue.get_nowait()
+                try:
+                    func(*args)
+                except Exception as e:
+                    self.error_logger.log_error("更新介面時發生錯誤", e)
+        except queue.Empty:
+            pass
+        self.root.after(100, self.process_ui_queue)
+
+    def run_query_batch(self, selected_year, selected_plans, export_formats, depth=1, output_folder='Exports'):
+        """
+        在背景執行緒中查詢計畫並匯出報表
+
+        Args:
+            selected_year: 學年
+            selected_plans: 計畫編號清單，報表依此順序排列
+            export_formats: 匯出格式
+            depth: 同時查詢的計畫數（同時開啟的結果分頁數）
+            output_folder: 匯出資料夾
+        """
+        self.metrics.start_run()
+        self.start_profiling()
+        tabs = None
+        try:
+            with self.metrics.phase('navigate_input'):
                 # 檢查是否在明細帳頁面並返回
                 try:
                     # 尋找返回連結並點擊
@@ -1007,111 +974,255 @@ class ItouchCrawler:
                     self.update_status("返回年度選擇頁面")
                     
                     # 等待年度選擇頁面載入
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.NAME, "swYear"))
-                    )
+                    self.wait_until('element', EC.presence_of_element_located((By.NAME, "swYear")))
                 except:
                     pass  # 如果找不到返回連結，表示已經在正確頁面
                 
                 # 導航到明細帳頁面
-                self.navigate_to_project_input_page(selected_year)
-                input_page_handle = self.driver.current_window_handle
-                
-                # 初始化Excel匯出器
+                tabs = self.open_query_input_page(selected_year, depth)
+            
+            # 監看瀏覽器狀態，定期或效能下降時重新啟動瀏覽器
+            if self.watchdog is None:
+                import browser_watchdog
+                self.watchdog = browser_watchdog.BrowserWatchdog(self.browser)
+                if browser_watchdog.psutil is None:
+                    # 無法取樣記憶體時不會因記憶體用量重新啟動瀏覽器，需提醒使用者
+                    self.error_logger.log_error("未安裝 psutil，無法取樣瀏覽器記憶體用量，記憶體門檻不會觸發重新啟動")
+                    self.update_status("未安裝 psutil，將只依計畫數與回應延遲重新啟動瀏覽器")
+            
+            # 初始化Excel匯出器（首次使用時才載入 pandas 與 BeautifulSoup）
+            with self.metrics.phase('load_exporter'):
+                from excel_exporter import ExcelExporter
                 self.excel_exporter = ExcelExporter()
-                
-                # 依序處理每個計畫編號
-                for plan_code in selected_plans:
+            
+            if self.RECORD_PAGES and self.page_recorder is None:
+                from page_recorder import PageRecorder
+                self.page_recorder = PageRecorder()
+            if self.ARCHIVE_PAGES and self.page_archive is None:
+                from page_archive import PageArchive
+                self.page_archive = PageArchive()
+            
+            # 依序送出計畫編號；同時查詢數大於 1 時，先送出後續計畫再依送出順序讀取較早的結果
+            pending = deque()  # 已送出、尚未讀取結果的 (計畫編號, 結果槽, 送出時間)
+            next_index = 0
+            completed = 0
+            recycle_reason = None
+            while next_index < len(selected_plans) or pending:
+                # 補滿同時查詢數（需要重新啟動瀏覽器或已取消時不再送出新的計畫）
+                while (next_index < len(selected_plans) and len(pending) < tabs.depth
+                       and not recycle_reason and not self.cancel_event.is_set()):
+                    plan_code = selected_plans[next_index]
+                    next_index += 1
+                    slot = tabs.acquire_slot()
+                    started = time.perf_counter()
                     try:
-                        # 確保在輸入頁面
-                        self.driver.switch_to.window(input_page_handle)
-                        
-                        # 輸入並送出計畫編號
-                        self.input_and_submit_plan(plan_code)
-                        
-                        # 等待新的結果分頁開啟
-                        time.sleep(1)
-                        
-                        # 找到新開啟的結果分頁
-                        result_window = [h for h in self.driver.window_handles 
-                                       if h != input_page_handle][-1]
-                        
-                        # 切換到結果分頁
-                        self.driver.switch_to.window(result_window)
-                        
-                        # 等待結果頁面完全載入
-                        WebDriverWait(self.driver, 10).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "table"))
-                        )
-                        
-                        # 檢查是否為無搜尋結果頁面
-                        if "沒查詢到任何結果" in self.driver.page_source:
-                            self.update_status(f"計畫 {plan_code} 查無資料")
-                        else:
-                            # 在結果頁面獲取HTML內容並存入匯出器
-                            html_content = self.driver.page_source
-                            self.excel_exporter.add_data(plan_code, html_content)
-                            self.update_status(f"計畫 {plan_code} 查詢完成")
-                        
-                        # 關閉結果分頁
-                        time.sleep(1)
-                        self.driver.close()
-
+                        with self.metrics.phase('submit', plan_code):
+                            tabs.switch_to_input()
+                            self.input_and_submit_plan(plan_code, tabs.slot_name(slot))
+                            tabs.bind_slot(slot, timeout=self.timeouts.get('window'))
+                        pending.append((plan_code, slot, started))
                     except Exception as e:
-                        self.error_logger.log_error(f"處理計畫 {plan_code} 時發生錯誤", e)
-                        self.update_status(f"處理計畫 {plan_code} 時發生錯誤: {str(e)}", True)
-                        continue
+                        tabs.release_slot(slot, keep_result=False)
+                        self.report_plan_error(plan_code, e)
+                        completed += 1
+                        if not self.browser.is_healthy():
+                            recycle_reason = "瀏覽器無回應"
                 
-                # 修改這部分：匯出Excel時使用執行檔所在路徑
-                if getattr(sys, 'frozen', False):
-                    # 如果是 exe 執行檔
-                    application_path = os.path.dirname(sys.executable)
-                else:
-                    # 如果是一般 Python 腳本
-                    application_path = os.path.dirname(os.path.abspath(__file__))
-                    
-                output_folder = 'Exports' # 輸出資料夾名稱
+                if not pending:
+                    if self.cancel_event.is_set():
+                        self.update_status(f"查詢已取消，已完成 {completed}/{len(selected_plans)} 個計畫")
+                        break
+                    if recycle_reason:
+                        # 進行中的查詢都已讀取完畢，重新啟動瀏覽器後繼續查詢剩下的計畫
+                        try:
+                            tabs = self.recycle_browser(selected_year, recycle_reason, tabs.depth)
+                        except Exception as e:
+                            self.error_logger.log_error("重新啟動瀏覽器失敗", e)
+                            self.update_status(f"重新啟動瀏覽器失敗，已完成 {completed}/{len(selected_plans)} 個計畫", True)
+                            tabs = None
+                            break
+                        recycle_reason = None
+                    continue
+                
+                # 依送出順序讀取最早送出的計畫結果
+                plan_code, slot, started = pending.popleft()
+                plan_ok = self.collect_plan_result(tabs, plan_code, slot, selected_year)
+                self.metrics.record('plan', time.perf_counter() - started, plan_ok, plan_code)
+                completed += 1
+                
+                # 失敗時連同結果分頁一起關閉；不論成功與否都關閉多出的分頁並回到輸入頁，避免分頁累積
+                tabs.release_slot(slot, keep_result=plan_ok)
                 try:
-                    output_file = self.excel_exporter.export_excel(output_folder)
-                    if output_file:
-                        # 等待檔案系統完成寫入
-                        time.sleep(1)
-                        self.update_status(f"已匯出Excel檔案: {output_file}")
+                    with self.metrics.phase('close_orphans', plan_code):
+                        tabs.close_orphans()
                 except Exception as e:
-                    self.error_logger.log_error("匯出Excel檔案時發生錯誤", e)
-                    self.update_status(f"匯出Excel檔案時發生錯誤: {str(e)}", True)
-                
-                # 切回輸入頁面
-                self.driver.switch_to.window(input_page_handle)
-                self.update_status("爬蟲完成")
-                # 成功完成後重新啟用按鈕
-                self.query_button.config(state=tk.NORMAL)
-                self.open_export_button.config(state=tk.NORMAL)
-                return True
+                    self.error_logger.log_error("關閉多餘分頁時發生錯誤", e)
                 
+                # 檢查瀏覽器狀態，需要時於進行中的查詢讀取完畢後重新啟動
+                if next_index < len(selected_plans) and not recycle_reason:
+                    recycle_reason = self.watchdog.plan_done()
+                    if not plan_ok and not recycle_reason and not self.browser.is_healthy():
+                        recycle_reason = "瀏覽器無回應"
+            
+            try:
+                with self.metrics.phase('export'):
+                    output_files = self.excel_exporter.export(output_folder, export_formats)
+                for output_file in output_files:
+                    self.update_status(f"已匯出檔案: {output_file}")
             except Exception as e:
-                self.error_logger.log_error("查詢報表過程發生錯誤", e)
-                self.update_status(f"查詢過程發生錯誤: {str(e)}", True)
-                # 發生錯誤時重新啟用按鈕
-                self.query_button.config(state=tk.NORMAL)
-                self.open_export_button.config(state=tk.NORMAL)
-                return False
-
+                self.error_logger.log_error("匯出檔案時發生錯誤", e)
+                self.update_status(f"匯出檔案時發生錯誤: {str(e)}", True)
+            
+            # 記錄本次查詢結果至歷史資料庫（需在匯出之後，異動報表才會與前次結果比對）
+            try:
+                with self.metrics.phase('save_history'):
+                    saved = self.excel_exporter.save_history()
+                if saved:
+                    self.update_status("已記錄查詢結果至歷史資料庫")
+            except Exception as e:
+                self.error_logger.log_error("寫入歷史資料庫時發生錯誤", e)
+                self.update_status(f"寫入歷史資料庫時發生錯誤: {str(e)}", True)
+            
+            self.update_status("爬蟲完成")
+            return True
+            
         except Exception as e:
             self.error_logger.log_error("查詢報表過程發生錯誤", e)
             self.update_status(f"查詢過程發生錯誤: {str(e)}", True)
-            # 發生錯誤時重新啟用按鈕
-            self.query_button.config(state=tk.NORMAL)
-            self.open_export_button.config(state=tk.NORMAL)
             return False
+            
+        finally:
+            # 關閉結果分頁並切回輸入頁面
+            if tabs:
+                try:
+                    tabs.close_all()
+                    tab_summary = tabs.summary()
+                    self.update_status(f"查詢期間最多開啟 {tab_summary['max_open']} 個分頁，目前 {tab_summary['last_open']} 個")
+                except Exception as e:
+                    self.error_logger.log_error("關閉結果分頁時發生錯誤", e)
+            
+            # 保存本次觀察到的等待時間，並記錄目前使用的逾時
+            self.timeouts.save()
+            self.metrics.write({'type': 'timeouts', **self.timeouts.describe()})
+            
+            # 顯示各階段耗時統計
+            for line in RunMetrics.format_summary(self.metrics.summarize()):
+                self.update_status(line)
+            if self.webdriver_profiler:
+                for line in self.webdriver_profiler.format_summary(self.webdriver_profiler.summarize()):
+                    self.update_status(line)
+            
+            # 輸出效能分析結果（與報表放在同一個資料夾）
+            if self.run_profiler:
+                try:
+                    written = self.run_profiler.write(output_folder)
+                    if written:
+                        self.update_status(f"已輸出效能分析: {written[0]}")
+                except Exception as e:
+                    self.error_logger.log_error("輸出效能分析結果時發生錯誤", e)
+            
+            # 通知主執行緒恢復按鈕狀態
+            self.post_to_ui(self.on_query_finished)
+
+    @staticmethod
+    def to_script_locator(locator):
+        """將 selenium 定位器轉為 FIND_FIRST_SCRIPT 使用的 [類型, 值]"""
+        by, value = locator
+        if by == By.XPATH:
+            return ['xpath', value]
+        if by in (By.CSS_SELECTOR, By.TAG_NAME):
+            return ['css', value]
+        if by == By.CLASS_NAME:
+            return ['css', f'.{value}']
+        if by == By.ID:
+            return ['css', f'[id="{value}"]']
+        if by == By.NAME:
+            return ['css', f'[name="{value}"]']
+        raise ValueError(f"不支援的定位方式: {by}")
+
+    def wait_until(self, step, condition, timeout=None, poll_frequency=0.5):
+        """
+        以步驟目前的逾時等待條件成立，並記錄所花的時間（使用逾時策略的值而逾時時也記錄，供逾時策略放寬）
+
+        Args:
+            step: TimeoutPolicy 的步驟名稱
+            condition: WebDriverWait.until() 使用的條件
+            timeout: 指定逾時秒數，None 時使用逾時策略的值
+
+        Raises:
+            TimeoutException: 超過逾時仍未成立
+        """
+        wait_time = timeout or self.timeouts.get(step)
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, wait_time, poll_frequency=poll_frequency).until(condition)
+        except TimeoutException:
+            if timeout is None:
+                self.timeouts.record(step, wait_time, timed_out=True)
+            raise
+        self.timeouts.record(step, time.perf_counter() - start)
+        return result
+
+    def find_first(self, locators, wait_time=None):
+        """
+        在瀏覽器內依序比對多個定位器，回傳第一個可見且可點擊的元素
+
+        每次輪詢只需一次 execute_script，所有定位器共用同一個等待時間。
+
+        Args:
+            locators: 定位器清單，依優先順序排列
+            wait_time: 等待元素出現的秒數，None 時使用逾時策略的 selector 逾時
+
+        Returns:
+            tuple: (定位器索引, 元素)，逾時找不到時回傳 (None, None)
+        """
+        script_locators = [self.to_script_locator(locator) for locator in locators]
+        try:
+            index, element = self.wait_until(
+                'selector', lambda d: d.execute_script(FIND_FIRST_SCRIPT, script_locators),
+                timeout=wait_time, poll_frequency=0.1
+            )
+            return index, element
+        except TimeoutException:
+            return None, None
 
-    def safe_click(self, locator, wait_time=5, retries=3):  # 從10秒減少到5秒
+    def click_first(self, locators, name, wait_time=None):
+        """
+        點擊多個定位器中第一個可點擊的元素
+
+        Args:
+            locators: 定位器清單，依優先順序排列
+            name: 顯示於狀態訊息的元素名稱，也可以是與 locators 對應的名稱清單
+            wait_time: 等待元素出現的秒數，None 時使用逾時策略的 selector 逾時
+
+        Returns:
+            int: 點擊成功的定位器索引，失敗時回傳 None
+        """
+        index, element = self.find_first(locators, wait_time)
+        if element is None:
+            return None
+        if isinstance(name, list):
+            name = name[index]
+        try:
+            element.click()
+            self.update_status(f"點擊{name}")
+        except:
+            try:
+                # JavaScript點擊
+                self.driver.execute_script("arguments[0].click();", element)
+                self.update_status(f"點擊{name} (JS)")
+            except Exception as e:
+                self.error_logger.log_error(f"點擊{name}失敗 (使用選擇器 {locators[index]})", e)
+                return None
+        return index
+
+    def safe_click(self, locator, wait_time=None, retries=3):
         """
         安全地點擊元素，處理可能的 StaleElementReferenceException
         
         Args:
             locator: 元素定位器，格式為 (定位方法, 定位值) 如 (By.ID, "myId")
-            wait_time: 等待元素出現的秒數
+            wait_time: 等待元素出現的秒數，None 時使用逾時策略的 element 逾時
             retries: 重試次數
         
         Returns:
@@ -1120,9 +1231,7 @@ class ItouchCrawler:
         for attempt in range(retries):
             try:
                 # 每次重新找元素，避免 stale element
-                element = WebDriverWait(self.driver, wait_time).until(
-                    EC.element_to_be_clickable(locator)
-                )
+                element = self.wait_until('element', EC.element_to_be_clickable(locator), timeout=wait_time)
                 
                 # 嘗試三種點擊方法
                 try:
@@ -1155,14 +1264,14 @@ class ItouchCrawler:
         
         return False
 
-    def safe_send_keys(self, locator, text, wait_time=5, retries=3):  # 從10秒減少到5秒
+    def safe_send_keys(self, locator, text, wait_time=None, retries=3):
         """
         安全地向元素輸入文字，處理可能的 StaleElementReferenceException
         
         Args:
             locator: 元素定位器，格式為 (定位方法, 定位值) 如 (By.ID, "myId")
             text: 要輸入的文字
-            wait_time: 等待元素出現的秒數
+            wait_time: 等待元素出現的秒數，None 時使用逾時策略的 element 逾時
             retries: 重試次數
         
         Returns:
@@ -1171,9 +1280,7 @@ class ItouchCrawler:
         for attempt in range(retries):
             try:
                 # 每次重新找元素，避免 stale element
-                element = WebDriverWait(self.driver, wait_time).until(
-                    EC.visibility_of_element_located(locator)
-                )
+                element = self.wait_until('element', EC.visibility_of_element_located(locator), timeout=wait_time)
                 
                 # 先清空欄位再輸入
                 try:
@@ -1195,13 +1302,13 @@ class ItouchCrawler:
         
         return False
 
-    def safe_get_text(self, locator, wait_time=5, retries=3, default=""):  # 從10秒減少到5秒
+    def safe_get_text(self, locator, wait_time=None, retries=3, default=""):
         """
         安全地獲取元素文字，處理可能的 StaleElementReferenceException
         
         Args:
             locator: 元素定位器，格式為 (定位方法, 定位值) 如 (By.ID, "myId")
-            wait_time: 等待元素出現的秒數
+            wait_time: 等待元素出現的秒數，None 時使用逾時策略的 element 逾時
             retries: 重試次數
             default: 如果無法獲取文字時的預設值
         
@@ -1211,9 +1318,7 @@ class ItouchCrawler:
         for attempt in range(retries):
             try:
                 # 每次重新找元素，避免 stale element
-                element = WebDriverWait(self.driver, wait_time).until(
-                    EC.visibility_of_element_located(locator)
-                )
+                element = self.wait_until('element', EC.visibility_of_element_located(locator), timeout=wait_time)
                 
                 try:
                     return element.text
@@ -1251,18 +1356,16 @@ class ItouchCrawler:
             
             self.update_status(f"選擇學年: {selected_year}")
 
-            # 等待學年更新，縮短等待時間
-            WebDriverWait(self.driver, 5).until(  # 從10秒減少到5秒
-                EC.text_to_be_present_in_element((By.ID, "lblYear"), selected_year)
-            )
+            # 等待學年更新
+            self.wait_until('element', EC.text_to_be_present_in_element((By.ID, "lblYear"), selected_year))
 
             # 點擊經費申請明細帳(科目)
             detail_btn_locator = (By.XPATH, "//td[contains(., '經費申請明細帳(科目)')]")
             if not self.safe_click(detail_btn_locator):
                 raise Exception("無法點擊經費申請明細帳按鈕")
             
-            # 等待新分頁開啟，縮短等待時間
-            WebDriverWait(self.driver, 5).until(lambda d: len(d.window_handles) > 1)  # 從10秒減少到5秒
+            # 等待新分頁開啟
+            self.wait_until('window', lambda d: len(d.window_handles) > 1)
             
             # 切換到新分頁
             new_window = self.driver.window_handles[-1]
@@ -1270,19 +1373,146 @@ class ItouchCrawler:
             
             self.update_status("進入經費申請明細帳(科目)頁面")
 
-            # 等待新頁面載入，確認有計畫編號輸入欄位，縮短等待時間
-            WebDriverWait(self.driver, 5).until(  # 從10秒減少到5秒
-                EC.presence_of_element_located((By.ID, "pjNoFrom"))
-            )
+            # 等待新頁面載入，確認有計畫編號輸入欄位
+            self.wait_until('element', EC.presence_of_element_located((By.ID, "pjNoFrom")))
 
         except Exception as e:
             self.error_logger.log_error(f"導航到計畫編號頁面時發生錯誤 (學年: {selected_year})", e)
             self.update_status(f"導航到計畫編號頁面時發生錯誤: {str(e)}", True)
             raise
 
-    def input_and_submit_plan(self, plan_code):
-        """在計畫編號頁面輸入並送出查詢"""
+    def submit_plan_with_script(self, plan_code, target=None):
+        """
+        以單次 execute_script 填入兩個計畫編號欄位並送出查詢
+
+        Args:
+            plan_code: 計畫編號
+            target: 查詢結果開啟的視窗名稱，None 時沿用表單原本的設定
+
+        Returns:
+            bool: 是否已送出；回傳 False 時表單尚未送出，可改用逐步操作
+        """
         try:
+            result = self.driver.execute_script(SUBMIT_PLAN_SCRIPT, plan_code, target)
+        except Exception as e:
+            self.error_logger.log_error(f"以腳本送出查詢失敗 (計畫編號: {plan_code})", e)
+            return False
+
+        if not result or not result.get('ok'):
+            self.error_logger.log_error(f"以腳本送出查詢失敗 (計畫編號: {plan_code}): {result}")
+            return False
+        return True
+
+    def collect_plan_result(self, tabs, plan_code, slot, selected_year=None):
+        """
+        讀取結果槽中的查詢結果並存入匯出器
+
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            # 等待結果載入並切換到結果分頁
+            with self.metrics.phase('wait_result', plan_code):
+                result_timeout = self.timeouts.get('result')
+                start = time.perf_counter()
+                try:
+                    tabs.wait_for_result(slot, timeout=result_timeout)
+                except TimeoutError:
+                    self.timeouts.record('result', result_timeout, timed_out=True)
+                    raise
+                self.timeouts.record('result', time.perf_counter() - start)
+            
+            with self.metrics.phase('page_source', plan_code):
+                html_content = tabs.read_result()
+            
+            if self.page_archive:
+                self.archive_page(selected_year, plan_code, html_content)
+            if self.page_recorder:
+                self.record_page(selected_year, plan_code, html_content)
+            
+            # 檢查是否為無搜尋結果頁面
+            if "沒查詢到任何結果" in html_content:
+                self.metrics.count('no_result', plan_code=plan_code)
+                self.update_status(f"計畫 {plan_code} 查無資料")
+            else:
+                # 在結果頁面獲取HTML內容並存入匯出器
+                with self.metrics.phase('parse', plan_code):
+                    self.excel_exporter.add_data(plan_code, html_content)
+                self.update_status(f"計畫 {plan_code} 查詢完成")
+            self.metrics.plan_done()
+            return True
+            
+        except Exception as e:
+            self.report_plan_error(plan_code, e)
+            return False
+
+    def archive_page(self, selected_year, plan_code, html_content):
+        """封存結果頁面，失敗時只記錄錯誤，不影響查詢"""
+        try:
+            with self.metrics.phase('archive_page', plan_code):
+                self.page_archive.append(selected_year, plan_code, html_content, self.metrics.run_id)
+        except Exception as e:
+            self.error_logger.log_error(f"封存計畫 {plan_code} 的頁面時發生錯誤", e)
+
+    def record_page(self, selected_year, plan_code, html_content):
+        """保存效能測試樣本，失敗時只記錄錯誤，不影響查詢"""
+        try:
+            with self.metrics.phase('record_page', plan_code):
+                self.page_recorder.record(selected_year, plan_code, html_content)
+        except Exception as e:
+            self.error_logger.log_error(f"保存計畫 {plan_code} 的頁面樣本時發生錯誤", e)
+
+    def report_plan_error(self, plan_code, exception):
+        """記錄處理計畫時發生的錯誤"""
+        self.metrics.count('plan_error', plan_code=plan_code)
+        self.error_logger.log_error(f"處理計畫 {plan_code} 時發生錯誤", exception)
+        self.update_status(f"處理計畫 {plan_code} 時發生錯誤: {str(exception)}", True)
+
+    def open_query_input_page(self, selected_year, depth=1):
+        """進入計畫編號輸入頁，回傳管理查詢分頁的 TabManager"""
+        from tab_manager import TabManager
+        self.navigate_to_project_input_page(selected_year)
+        # 查詢結果固定開在 depth 個結果分頁，其他多出的分頁於每個計畫結束時關閉
+        tabs = TabManager(self.driver, self.metrics, depth=depth)
+        tabs.register_input_page()
+        return tabs
+
+    def recycle_browser(self, selected_year, reason, depth=1):
+        """
+        查詢途中重新啟動瀏覽器，重新登入並回到計畫編號輸入頁
+
+        Returns:
+            TabManager: 新瀏覽器的分頁管理器
+        """
+        self.update_status(f"重新啟動瀏覽器以維持查詢速度（{reason}）")
+        with self.metrics.phase('recycle_browser'):
+            self.driver = None
+            self.browser.hard_restart()
+            self.is_logged_in = False
+            if not self.login() or not self.navigate_to_query(load_years=False):
+                raise Exception("重新啟動瀏覽器後無法重新登入")
+            tabs = self.open_query_input_page(selected_year, depth)
+        self.watchdog.recycled()
+        self.metrics.count('browser_recycle')
+        return tabs
+
+    def input_and_submit_plan(self, plan_code, target=None):
+        """
+        在計畫編號頁面輸入並送出查詢（優先以單次腳本送出，失敗時改為逐步操作）
+
+        Args:
+            plan_code: 計畫編號
+            target: 查詢結果開啟的視窗名稱，None 時沿用表單原本的設定
+        """
+        try:
+            if self.submit_plan_with_script(plan_code, target):
+                self.update_status(f"送出查詢: {plan_code}")
+                return
+
+            self.metrics.count('submit_fallback', plan_code=plan_code)
+            if target:
+                self.driver.execute_script(SET_RESULT_TARGET_SCRIPT, target)
+            
             # 使用改進的安全元素操作
             if not self.safe_send_keys((By.ID, "pjNoFrom"), plan_code):
                 raise Exception("無法輸入計畫編號到第一個欄位")
@@ -1331,17 +1561,12 @@ class ItouchCrawler:
     def restart_program(self):
         """重啟程式功能"""
         try:
-            # 關閉瀏覽器
-            if self.driver:
-                try:
-                    self.driver.close()  # 先關閉視窗
-                except:
-                    pass
-                try:
-                    self.driver.quit()  # 再關閉驅動
-                except:
-                    pass
-                self.driver = None
+            # 停止執行中的查詢
+            self.cancel_event.set()
+            
+            # 在背景軟重置瀏覽器（排在執行中的查詢之後，查詢完成目前計畫前仍可使用瀏覽器），
+            # 保留 Chrome 程序供下次登入使用；重新登入時 initialize_driver() 會等待重置完成
+            self.reset_future = self.query_executor.submit(self.reset_browser)
             
             # 重置登入狀態
             self.is_logged_in = False
@@ -1352,6 +1577,7 @@ class ItouchCrawler:
             self.login_button.grid()
             self.login_button.config(state=tk.NORMAL)  # 確保登入按鈕為啟用狀態
             self.query_button.grid_remove()  # 隱藏查詢按鈕
+            self.cancel_button.grid_remove()  # 隱藏取消按鈕
             
             for widget in self.button_frame.winfo_children():
                 widget.destroy()
@@ -1397,15 +1623,8 @@ class ItouchCrawler:
 
     def __del__(self):
         """清理瀏覽器資源"""
-        if hasattr(self, 'driver') and self.driver:
-            try:
-                self.driver.close()
-            except:
-                pass
-            try:
-                self.driver.quit()
-            except:
-                pass
+        if getattr(self, 'browser', None):
+            self.browser.quit()
 
 def get_resource_path(relative_path):
     """獲取資源檔案的絕對路徑"""
@@ -1418,19 +1637,27 @@ def get_resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 if __name__ == '__main__':
+    import argparse
+    from run_profiler import PROFILE_MODES
+    parser = argparse.ArgumentParser(description='iTouch-會計帳目自動抓取程式')
+    parser.add_argument('--profile', choices=PROFILE_MODES, help='分析整次執行的效能，查詢結束時於匯出資料夾輸出結果')
+    args, _ = parser.parse_known_args()
+    
     root = tk.Tk()
     app = ItouchCrawler(root)
+    if args.profile:
+        app.PROFILE_RUN = args.profile
     def on_closing():
         # 關閉程式前進行清理
-        if hasattr(app, 'driver') and app.driver:
-            try:
-                app.driver.close()
-            except:
-                pass
-            try:
-                app.driver.quit()
-            except:
-                pass
+        app.cancel_event.set()
+        app.query_executor.shutdown(wait=False)
+        app.flush_plan_codes()
+        app.timeouts.save()
+        if app.page_archive:
+            app.page_archive.close()
+        app.status_bus.stop()
+        if app.browser:
+            app.browser.quit()
         
         # 強制進行垃圾回收
         import gc
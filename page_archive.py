@@ -0,0 +1,198 @@
+import os
+import sys
+import zlib
+import json
+import mmap
+import argparse
+import threading
+from datetime import datetime
+
+class PageArchive:
+    """
+    查詢結果頁面原始 HTML 的封存檔（只附加不修改）
+
+    每個頁面以 zlib 壓縮後依序附加到 data/archive/pages.dat，
+    索引 data/archive/pages.idx 每行記錄一個頁面的學年、計畫編號、查詢時間、查詢批次與在封存檔中的位置。
+    讀取時以 mmap 對應封存檔，依索引直接取出單一頁面解壓縮，不需讀取整個檔案；
+    因此可從封存檔重新解析或匯出過去任一批次的報表，不必重新查詢。
+    """
+
+    def __init__(self, archive_dir=None):
+        if archive_dir is None:
+            # 判斷是否為執行檔環境
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.abspath(__file__))
+            archive_dir = os.path.join(base_path, 'data', 'archive')
+
+        self.archive_dir = archive_dir
+        self.data_file = os.path.join(archive_dir, 'pages.dat')
+        self.index_file = os.path.join(archive_dir, 'pages.idx')
+        self.lock = threading.Lock()
+        self.map = None
+        self.map_file = None
+        os.makedirs(archive_dir, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self):
+        """讀取索引，寫入中斷而不完整的最後一行會被截斷，避免下一筆紀錄接在其後而無法讀取"""
+        if not os.path.exists(self.index_file):
+            return []
+        data_size = os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+        index = []
+        complete_size = 0
+        with open(self.index_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                complete_size += len(line)
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+                if entry['offset'] + entry['length'] <= data_size:
+                    index.append(entry)
+        if complete_size < os.path.getsize(self.index_file):
+            with open(self.index_file, 'r+b') as f:
+                f.truncate(complete_size)
+        return index
+
+    def append(self, year, plan_code, html_content, run_id=None, fetched_at=None):
+        """
+        封存一個頁面
+
+        Args:
+            year: 學年
+            plan_code: 計畫編號
+            html_content: 頁面 HTML
+            run_id: 查詢批次（RunMetrics 的 run_id），用於重新匯出整個批次
+            fetched_at: 查詢時間，None 時為目前時間
+
+        Returns:
+            dict: 索引紀錄
+        """
+        raw = html_content.encode('utf-8')
+        compressed = zlib.compress(raw, 6)
+        with self.lock:
+            # 附加前先關閉 mmap（Windows 上檔案被對應時無法改變大小），下次讀取時重新對應
+            self.close_map()
+            with open(self.data_file, 'ab') as f:
+                offset = f.tell()
+                f.write(compressed)
+            entry = {
+                'year': str(year) if year is not None else None,
+                'plan': plan_code,
+                'fetched_at': fetched_at or datetime.now().isoformat(timespec='seconds'),
+                'run': run_id,
+                'offset': offset,
+                'length': len(compressed),
+                'size': len(raw)
+            }
+            # 先寫入頁面再寫入索引，中斷時只會留下沒有索引的資料
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.index.append(entry)
+        return entry
+
+    def entries(self, year=None, plan_code=None, run_id=None):
+        """依學年、計畫編號或查詢批次篩選索引紀錄（依封存順序）"""
+        return [entry for entry in self.index
+                if (year is None or entry['year'] == str(year))
+                and (plan_code is None or entry['plan'] == plan_code)
+                and (run_id is None or entry['run'] == run_id)]
+
+    def latest(self, year, plan_code):
+        """取得計畫最近一次封存的索引紀錄，沒有時回傳 None"""
+        # 索引依封存順序排列，最後一筆即最近一次
+        matches = self.entries(year, plan_code)
+        return matches[-1] if matches else None
+
+    def runs(self):
+        """
+        列出所有查詢批次
+
+        Returns:
+            list: [{'run', 'pages', 'first', 'last'}]，依封存順序
+        """
+        runs = {}
+        for entry in self.index:
+            run = runs.setdefault(entry['run'], {'run': entry['run'], 'pages': 0,
+                                                 'first': entry['fetched_at'], 'last': entry['fetched_at']})
+            run['pages'] += 1
+            run['last'] = entry['fetched_at']
+        return list(runs.values())
+
+    def read(self, entry):
+        """讀取一個頁面的 HTML"""
+        with self.lock:
+            end = entry['offset'] + entry['length']
+            if self.map is None or len(self.map) < end:
+                self.open_map()
+            data = self.map[entry['offset']:end]
+        return zlib.decompress(data).decode('utf-8')
+
+    def open_map(self):
+        """以 mmap 對應目前的封存檔"""
+        self.close_map()
+        self.map_file = open(self.data_file, 'rb')
+        self.map = mmap.mmap(self.map_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close_map(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.map_file is not None:
+            self.map_file.close()
+            self.map_file = None
+
+    def close(self):
+        with self.lock:
+            self.close_map()
+
+    def load_run(self, exporter, run_id):
+        """
+        將一個查詢批次封存的頁面重新解析到匯出器（查無資料的頁面略過）
+
+        Returns:
+            int: 解析的頁面數
+        """
+        count = 0
+        for entry in self.entries(run_id=run_id):
+            html_content = self.read(entry)
+            if '沒查詢到任何結果' in html_content:
+                continue
+            exporter.add_data(entry['plan'], html_content, fetched_at=entry['fetched_at'])
+            count += 1
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列出封存的查詢批次，或從封存檔重新匯出報表')
+    parser.add_argument('--archive', help='封存資料夾，預設為 data/archive')
+    parser.add_argument('--export', metavar='RUN', help='重新匯出指定的查詢批次')
+    parser.add_argument('--formats', nargs='+', default=['xlsx'], help='匯出格式')
+    parser.add_argument('--output', default='Exports', help='匯出資料夾')
+    args = parser.parse_args()
+
+    archive = PageArchive(args.archive)
+    try:
+        if not args.export:
+            for run in archive.runs():
+                print(f"{run['run']}: {run['pages']} 頁（{run['first']} ～ {run['last']}）")
+            return 0
+
+        from excel_exporter import ExcelExporter
+        exporter = ExcelExporter()
+        if not archive.load_run(exporter, args.export):
+            print(f"封存檔中沒有查詢批次 {args.export} 的資料")
+            return 1
+        for output_file in exporter.export(args.output, args.formats):
+            print(f"已匯出檔案: {output_file}")
+        return 0
+    finally:
+        archive.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import os
+import re
+import sys
+import gzip
+import json
+import threading
+from datetime import datetime
+
+# 只含數字、日期與金額符號的文字（保留，解析金額需要）
+NUMERIC_TEXT = re.compile(r'^[\d\s,./:\-()%]*$')
+
+# 這些文字是解析時使用的標記，不需遮蔽
+KEEP_KEYWORDS = ('學年度', '小計', '預算收支', '目前預算', '可用餘額', '沒查詢到任何結果')
+
+class PageRecorder:
+    """
+    將查詢結果頁面去識別化後保存為效能測試用的樣本（預設關閉）
+
+    每個頁面以 gzip 壓縮存成 fixtures/pages/F00001.html.gz，並在 index.jsonl 附加一筆
+    中繼資料：大小、明細列數、科目小計數，以及去識別化後頁面的解析結果（供比對解析結果是否改變）。
+    計畫編號以流水號代替，計畫名稱、單位與明細摘要等文字以相同長度的符號遮蔽，
+    金額、日期與解析時使用的標記文字保留，隱藏欄位的值與頁面腳本則移除。
+    """
+
+    def __init__(self, fixture_dir=None):
+        if fixture_dir is None:
+            # 判斷是否為執行檔環境
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.abspath(__file__))
+            fixture_dir = os.path.join(base_path, 'fixtures', 'pages')
+
+        self.fixture_dir = fixture_dir
+        self.index_file = os.path.join(fixture_dir, 'index.jsonl')
+        self.lock = threading.Lock()
+        os.makedirs(fixture_dir, exist_ok=True)
+        self.next_number = len(self.load_index(fixture_dir)) + 1
+
+    @staticmethod
+    def load_index(fixture_dir):
+        """讀取樣本的中繼資料清單"""
+        index_file = os.path.join(fixture_dir, 'index.jsonl')
+        if not os.path.exists(index_file):
+            return []
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    @staticmethod
+    def read_page(fixture_dir, entry):
+        """讀取一個樣本頁面的 HTML"""
+        with gzip.open(os.path.join(fixture_dir, entry['file']), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    @staticmethod
+    def mask(text):
+        """以相同長度的符號取代文字（保留前後空白）"""
+        stripped = text.strip()
+        if not stripped:
+            return text
+        start = text.index(stripped[0])
+        return text[:start] + '○' * len(stripped) + text[start + len(stripped):]
+
+    def anonymize(self, html_content, plan_code, alias):
+        """
+        去識別化頁面
+
+        Returns:
+            BeautifulSoup: 去識別化後的頁面
+        """
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # 計畫編號只取代完整的編號（不取代金額或屬性名稱中相同的數字）
+        code_pattern = re.compile(rf'(?<![0-9A-Za-z]){re.escape(plan_code)}(?![0-9A-Za-z])')
+
+        for script in soup.find_all('script'):
+            script.string = ''
+        for element in soup.find_all(True):
+            for name, value in element.attrs.items():
+                if isinstance(value, str) and plan_code in value:
+                    element[name] = code_pattern.sub(alias, value)
+        for element in soup.find_all('input'):
+            if element.has_attr('value'):
+                element['value'] = ''
+
+        # 計畫資訊列：保留「標籤：」，取代標籤後的內容
+        table1 = soup.find('table', {'id': 'table1'})
+        info_row = table1.find_all('tr')[1] if table1 and len(table1.find_all('tr')) > 1 else None
+        if info_row:
+            for cell in info_row.find_all('td'):
+                text = cell.get_text(strip=True)
+                if '計畫名稱：' in text:
+                    cell.string = f'計畫名稱：計畫 {alias}'
+                elif '計畫編號：' in text:
+                    cell.string = f'計畫編號：{alias}'
+                elif '：' in text:
+                    cell.string = f"{text.split('：')[0]}：X000 單位"
+
+        # 其他文字：數字、標記文字、科目小計與計畫資訊列以外的內容一律遮蔽
+        for node in soup.find_all(string=True):
+            parent = node.parent
+            if parent is None or parent.name in ('script', 'style', '[document]'):
+                continue
+            if info_row is not None and info_row in parent.parents:
+                continue
+            text = code_pattern.sub(alias, str(node))
+            # 科目小計列的科目文字保留（報表欄位名稱）
+            cell = parent if parent.name == 'td' else parent.find_parent('td')
+            keep = (parent.name == 'title' or NUMERIC_TEXT.match(text) or alias in text
+                    or any(keyword in text for keyword in KEEP_KEYWORDS)
+                    or (cell is not None and '小計' in cell.get_text()))
+            if not keep:
+                text = self.mask(text)
+            if text != str(node):
+                node.replace_with(text)
+        return soup
+
+    @staticmethod
+    def describe(soup):
+        """計算頁面的明細列數與科目小計數（不含標題列與預算收支小計）"""
+        table2 = soup.find('table', {'id': 'table2'})
+        rows = [row.get_text() for row in table2.find_all('tr') if row.find('td')] if table2 else []
+        line_items = [text for text in rows if '小計' not in text]
+        subtotals = [text for text in rows if '小計' in text and '預算收支' not in text]
+        return len(line_items), len(subtotals)
+
+    def record(self, year, plan_code, html_content):
+        """
+        保存一個結果頁面
+
+        Returns:
+            dict: 該頁面的中繼資料
+        """
+        with self.lock:
+            number = self.next_number
+            self.next_number += 1
+        alias = f'F{number:05d}'
+
+        soup = self.anonymize(html_content, plan_code, alias)
+        page = str(soup)
+        rows, subtotals = self.describe(soup)
+        no_result = '沒查詢到任何結果' in page
+
+        expected = None
+        if not no_result:
+            # 以去識別化後的頁面解析，作為日後比對的基準
+            from excel_exporter import ExcelExporter
+            exporter = ExcelExporter()
+            expected = {'info': exporter.extract_project_info(soup), 'subtotals': exporter.extract_subtotals(soup)}
+
+        file_name = f'{alias}.html.gz'
+        data = page.encode('utf-8')
+        with gzip.open(os.path.join(self.fixture_dir, file_name), 'wb') as f:
+            f.write(data)
+
+        entry = {
+            'file': file_name,
+            'alias': alias,
+            'year': year,
+            'size': len(data),
+            'compressed_size': os.path.getsize(os.path.join(self.fixture_dir, file_name)),
+            'rows': rows,
+            'subtotals': subtotals,
+            'no_result': no_result,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'expected': expected
+        }
+        with self.lock:
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
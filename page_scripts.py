@@ -0,0 +1,132 @@
+"""
+在 iTouch 頁面中執行的 JavaScript
+
+每段腳本以 driver.execute_script() 一次送出，在瀏覽器內完成原本需要多次 WebDriver 往返的操作。
+"""
+
+# 輸入計畫編號並送出查詢
+# 參數：arguments[0] = 計畫編號，arguments[1] = 結果視窗名稱（選用）
+# 回傳：{ok, reason, from, to, via}，ok 為 false 時尚未送出，可改用逐步操作
+SUBMIT_PLAN_SCRIPT = r'''
+var code = arguments[0];
+var target = arguments[1];
+var fromInput = document.getElementById('pjNoFrom');
+var toInput = document.getElementById('pjNoTo');
+if (!fromInput || !toInput) {
+    return {ok: false, reason: 'missing_field'};
+}
+
+function fire(element, type) {
+    element.dispatchEvent(new Event(type, {bubbles: true}));
+}
+
+// 依使用者操作的順序觸發事件，讓頁面原本的自動填入邏輯照常執行
+fromInput.focus();
+fromInput.value = code;
+fire(fromInput, 'input');
+fire(fromInput, 'change');
+fire(fromInput, 'blur');
+
+toInput.focus();
+fire(toInput, 'focus');
+fire(toInput, 'click');
+if (toInput.value !== code) {
+    toInput.value = code;
+    fire(toInput, 'input');
+    fire(toInput, 'change');
+}
+if (fromInput.value !== code || toInput.value !== code) {
+    return {ok: false, reason: 'value_mismatch', from: fromInput.value, to: toInput.value};
+}
+
+// 優先點擊送出按鈕（保留表單的 onsubmit 與 target 設定）
+var form = fromInput.form || document.forms[0];
+if (form && target) {
+    form.target = target;
+}
+var scope = form || document;
+var button = document.getElementsByName('Submit')[0]
+    || scope.querySelector("input[value='查詢']")
+    || scope.querySelector("input[type='submit']");
+if (button) {
+    button.click();
+} else if (form) {
+    if (form.requestSubmit) { form.requestSubmit(); } else { form.submit(); }
+} else {
+    return {ok: false, reason: 'missing_submit'};
+}
+return {ok: true, from: fromInput.value, to: toInput.value, via: button ? 'button' : 'form'};
+'''
+
+# 依序嘗試多個定位器，回傳第一個可見且可點擊的元素
+# 參數：arguments[0] = [[類型, 值], ...]，類型為 'xpath' 或 'css'
+# 回傳：[定位器索引, 元素]，全部找不到時回傳 null（供 WebDriverWait 持續輪詢）
+FIND_FIRST_SCRIPT = r'''
+var locators = arguments[0];
+
+function isClickable(element) {
+    if (element.disabled) {
+        return false;
+    }
+    var style = window.getComputedStyle(element);
+    if (style.visibility === 'hidden' || style.display === 'none') {
+        return false;
+    }
+    return element.getClientRects().length > 0;
+}
+
+function matches(kind, value) {
+    if (kind === 'css') {
+        return Array.prototype.slice.call(document.querySelectorAll(value));
+    }
+    var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var elements = [];
+    for (var i = 0; i < snapshot.snapshotLength; i++) {
+        elements.push(snapshot.snapshotItem(i));
+    }
+    return elements;
+}
+
+for (var index = 0; index < locators.length; index++) {
+    var elements;
+    try {
+        elements = matches(locators[index][0], locators[index][1]);
+    } catch (e) {
+        continue;  // 定位器語法錯誤時略過
+    }
+    for (var j = 0; j < elements.length; j++) {
+        if (elements[j].nodeType === 1 && isClickable(elements[j])) {
+            return [index, elements[j]];
+        }
+    }
+}
+return null;
+'''
+
+# 讓查詢表單的結果固定開在同一個具名視窗，重複查詢時沿用該分頁
+# 參數：arguments[0] = 視窗名稱
+# 回傳：是否找到查詢表單
+SET_RESULT_TARGET_SCRIPT = r'''
+var input = document.getElementById('pjNoFrom');
+var form = (input && input.form) || document.forms[0];
+if (!form) {
+    return false;
+}
+form.target = arguments[0];
+return true;
+'''
+
+# 檢查結果分頁是否已載入新的查詢結果（讀取過的頁面會留下標記，避免重複讀到上一筆結果）
+RESULT_READY_SCRIPT = r'''
+if (document.readyState !== 'complete' || window.__itouchConsumed) {
+    return false;
+}
+return document.getElementsByTagName('table').length > 0
+    || (document.body && document.body.innerText.indexOf('沒查詢到任何結果') >= 0);
+'''
+
+# 讀取結果頁面的 HTML，並標記為已讀取
+READ_RESULT_SCRIPT = r'''
+window.__itouchConsumed = true;
+return document.documentElement.outerHTML;
+'''
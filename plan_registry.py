@@ -0,0 +1,218 @@
+import os
+import sys
+import csv
+import bisect
+
+class PlanCodeRegistry:
+    """
+    計畫編號清單
+
+    以 dict 作為有序集合保存計畫編號（值為加入的序號，保留加入順序、O(1) 查重），
+    另外維護排序後的清單供前綴搜尋，以及一至三字元索引供子字串搜尋。
+    新增的編號直接附加到檔案尾端，移除時才需要整份重寫（由呼叫端決定何時呼叫 save()）。
+    """
+
+    NGRAM_SIZE = 3
+
+    def __init__(self, file_path=None):
+        if file_path is None:
+            # 判斷是否為執行檔環境
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.abspath(__file__))
+            file_path = os.path.join(base_path, 'plan_codes.txt')
+
+        self.file_path = file_path
+        self.codes = {}
+        self.sorted_codes = []
+        self.ngram_index = {}
+        self.next_position = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.codes
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    @staticmethod
+    def normalize(code):
+        """統一計畫編號格式（去除空白並轉為大寫）"""
+        return str(code).strip().upper()
+
+    def load(self):
+        """
+        讀取計畫編號檔案，檔案不存在時建立空檔案
+
+        每行一個計畫編號，`#` 開頭為註解，空行忽略。
+        """
+        self.codes = {}
+        if not os.path.exists(self.file_path):
+            with open(self.file_path, 'w', encoding='utf-8'):
+                pass  # 建立空檔案
+        else:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # 去除空白並檢查是否為註解或空行
+                    code = self.normalize(line)
+                    if code and not code.startswith('#') and code not in self.codes:
+                        self.codes[code] = len(self.codes)
+        self.next_position = len(self.codes)
+        self.rebuild_index()
+        self.dirty = False
+
+    def save(self):
+        """將整份清單寫回檔案（先寫入暫存檔再取代，避免寫入中斷造成檔案損毀）"""
+        temp_path = f'{self.file_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(f'{code}\n' for code in self.codes)
+        os.replace(temp_path, self.file_path)
+        self.dirty = False
+
+    def rebuild_index(self):
+        """重建前綴與子字串搜尋索引"""
+        self.sorted_codes = sorted(self.codes)
+        self.ngram_index = {}
+        for code in self.codes:
+            for gram in self._ngrams(code):
+                self.ngram_index.setdefault(gram, set()).add(code)
+
+    def _ngrams(self, text):
+        # 索引所有長度 1～NGRAM_SIZE 的片段，短關鍵字也能直接查索引
+        return {text[i:i + size] for size in range(1, self.NGRAM_SIZE + 1)
+                for i in range(len(text) - size + 1)}
+
+    def _append_to_file(self, codes):
+        """將計畫編號附加到檔案尾端（檔案最後沒有換行時先補上，避免與最後一個編號接在一起）"""
+        needs_newline = False
+        if os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 0:
+            with open(self.file_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b'\n', b'\r')
+        with open(self.file_path, 'a', encoding='utf-8') as f:
+            if needs_newline:
+                f.write('\n')
+            f.writelines(f'{code}\n' for code in codes)
+
+    def add(self, codes):
+        """
+        新增計畫編號並附加到檔案尾端
+
+        Args:
+            codes: 計畫編號的可迭代物件
+
+        Returns:
+            list: 實際新增（原本不存在）的計畫編號
+        """
+        added = []
+        for code in codes:
+            code = self.normalize(code)
+            if code and not code.startswith('#') and code not in self.codes:
+                self.codes[code] = self.next_position
+                self.next_position += 1
+                bisect.insort(self.sorted_codes, code)
+                for gram in self._ngrams(code):
+                    self.ngram_index.setdefault(gram, set()).add(code)
+                added.append(code)
+
+        if added:
+            self._append_to_file(added)
+        return added
+
+    def remove(self, codes):
+        """移除計畫編號，檔案需待呼叫 save() 時才會更新"""
+        removed = []
+        for code in codes:
+            if code in self.codes:
+                del self.codes[code]
+                index = bisect.bisect_left(self.sorted_codes, code)
+                del self.sorted_codes[index]
+                for gram in self._ngrams(code):
+                    self.ngram_index[gram].discard(code)
+                removed.append(code)
+        if removed:
+            self.dirty = True
+        return removed
+
+    def search(self, keyword):
+        """
+        搜尋計畫編號，結果依清單原本的順序排列
+
+        Args:
+            keyword: 搜尋字串（不分大小寫），空字串回傳全部
+
+        Returns:
+            list: 符合的計畫編號，前綴相符者排在前面
+        """
+        keyword = self.normalize(keyword)
+        if not keyword:
+            return list(self.codes)
+
+        # 前綴相符：在排序清單中以二分搜尋找出範圍
+        start = bisect.bisect_left(self.sorted_codes, keyword)
+        end = bisect.bisect_left(self.sorted_codes, keyword + chr(0x10FFFF), start)
+        prefix_matches = self.sorted_codes[start:end]
+
+        # 子字串相符：關鍵字本身在索引中時直接取用，較長時以各三字元片段取交集縮小候選範圍
+        if len(keyword) <= self.NGRAM_SIZE:
+            candidates = self.ngram_index.get(keyword, set())
+        else:
+            candidates = None
+            for gram in {keyword[i:i + self.NGRAM_SIZE] for i in range(len(keyword) - self.NGRAM_SIZE + 1)}:
+                matches = self.ngram_index.get(gram, set())
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    break
+            candidates = {code for code in candidates or () if keyword in code}
+        prefix_set = set(prefix_matches)
+        substring_matches = [code for code in candidates if code not in prefix_set]
+
+        # 只排序符合的編號（依加入順序），不需掃描整份清單
+        position = self.codes.__getitem__
+        return sorted(prefix_matches, key=position) + sorted(substring_matches, key=position)
+
+    def import_file(self, path):
+        """
+        從 CSV / TXT / Excel 檔案匯入計畫編號
+
+        若標題列中有「計畫編號」欄則只讀取該欄，否則讀取第一欄。
+
+        Returns:
+            list: 實際新增的計畫編號
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension in ('.xlsx', '.xlsm'):
+            rows = self._read_excel_rows(path)
+        else:
+            rows = self._read_csv_rows(path)
+
+        column = 0
+        codes = []
+        for row_index, row in enumerate(rows):
+            cells = [str(cell).strip() if cell is not None else '' for cell in row]
+            if row_index == 0 and '計畫編號' in cells:
+                column = cells.index('計畫編號')
+                continue
+            if column < len(cells) and cells[column]:
+                codes.append(cells[column])
+        return self.add(codes)
+
+    @staticmethod
+    def _read_csv_rows(path):
+        # utf-8-sig 可同時處理 Excel 另存的 CSV（含 BOM）
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.reader(f)
+
+    @staticmethod
+    def _read_excel_rows(path):
+        # 匯入 Excel 時才載入 openpyxl
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
@@ -0,0 +1,156 @@
+import os
+import math
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+def percentile(values, pct):
+    """以最近排名法計算百分位數（樣本很少時也有意義）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+class RunMetrics:
+    """
+    查詢流程的計時與計數
+
+    每個階段（登入、導航、送出查詢、等待結果、讀取頁面、解析、匯出…）以 phase() 包住，
+    每筆紀錄以 JSON Lines 格式附加到 logs/metrics_YYYYMMDD.jsonl；
+    summarize() 彙總上次彙總後的紀錄（各階段 p50/p95、每分鐘處理計畫數）。
+    """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.log_file = os.path.join(log_dir, f"metrics_{time.strftime('%Y%m%d')}.jsonl")
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.durations = {}
+        self.counters = {}
+        self.plan_count = 0
+        self.started_at = time.perf_counter()
+
+    def start_run(self, run_id=None):
+        """開始新的一次查詢，之後的紀錄以新的 run_id 標記"""
+        with self.lock:
+            self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.plan_count = 0
+            self.started_at = time.perf_counter()
+
+    @property
+    def current_phase(self):
+        """目前執行緒所在的階段（巢狀時為最內層）"""
+        stack = getattr(self.local, 'phases', None)
+        return stack[-1] if stack else None
+
+    @property
+    def current_plan(self):
+        """目前執行緒正在處理的計畫編號"""
+        return getattr(self.local, 'plan_code', None)
+
+    @contextmanager
+    def phase(self, name, plan_code=None):
+        """
+        計時一個階段，結束時寫入一筆紀錄（發生例外時 ok 為 false，例外照常拋出）
+
+        Args:
+            name: 階段名稱
+            plan_code: 若指定，此階段內的紀錄都歸屬於該計畫
+        """
+        stack = getattr(self.local, 'phases', None)
+        if stack is None:
+            stack = self.local.phases = []
+        previous_plan = self.current_plan
+        if plan_code is not None:
+            self.local.plan_code = plan_code
+
+        stack.append(name)
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            self.record(name, seconds, ok, self.current_plan)
+            self.local.plan_code = previous_plan
+
+    def record(self, name, seconds, ok=True, plan_code=None):
+        """記錄一個階段的耗時"""
+        with self.lock:
+            self.durations.setdefault(name, []).append(seconds)
+        self.write({'type': 'phase', 'phase': name, 'plan': plan_code,
+                    'seconds': round(seconds, 4), 'ok': ok})
+
+    def count(self, name, value=1, plan_code=None):
+        """累加計數器（如查無資料、錯誤次數）"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.write({'type': 'count', 'counter': name, 'plan': plan_code or self.current_plan, 'value': value})
+
+    def plan_done(self):
+        """完成一個計畫（用於計算每分鐘處理計畫數）"""
+        with self.lock:
+            self.plan_count += 1
+
+    def write(self, event):
+        """以 JSON Lines 格式附加一筆紀錄，寫入失敗時略過"""
+        event = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'run_id': self.run_id, **event}
+        try:
+            line = json.dumps(event, ensure_ascii=False)
+            with self.lock:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def summarize(self):
+        """
+        彙總上次彙總之後的紀錄並清空，同時寫入一筆 summary 紀錄
+
+        Returns:
+            dict: phases（各階段的次數、總計、p50、p95）、counters、plans、plans_per_minute、elapsed
+        """
+        with self.lock:
+            elapsed = time.perf_counter() - self.started_at
+            phases = {
+                name: {
+                    'count': len(values),
+                    'total': sum(values),
+                    'p50': percentile(values, 50),
+                    'p95': percentile(values, 95)
+                }
+                for name, values in self.durations.items()
+            }
+            summary = {
+                'phases': phases,
+                'counters': dict(self.counters),
+                'plans': self.plan_count,
+                'elapsed': elapsed,
+                'plans_per_minute': self.plan_count / elapsed * 60 if elapsed > 0 else 0.0
+            }
+            self.durations = {}
+            self.counters = {}
+        self.write({'type': 'summary', **summary})
+        return summary
+
+    @staticmethod
+    def format_summary(summary):
+        """將彙總結果轉為顯示於狀態訊息的多行文字"""
+        lines = [f"本次共處理 {summary['plans']} 個計畫，耗時 {summary['elapsed']:.1f} 秒，"
+                 f"每分鐘 {summary['plans_per_minute']:.1f} 個計畫"]
+        # 依總耗時由大到小排列
+        for name, stats in sorted(summary['phases'].items(), key=lambda item: item[1]['total'], reverse=True):
+            lines.append(f"  {name}: {stats['count']} 次，p50 {stats['p50']:.2f} 秒，"
+                         f"p95 {stats['p95']:.2f} 秒，總計 {stats['total']:.1f} 秒")
+        for name, value in summary['counters'].items():
+            lines.append(f"  {name}: {value}")
+        return lines
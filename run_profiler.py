@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import marshal
+import threading
+from datetime import datetime
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+class RunProfiler:
+    """
+    整次執行（登入到匯出）的效能分析（預設關閉，供診斷使用者電腦上的效能問題）
+
+    cprofile：以 cProfile 記錄每個函式的呼叫次數與耗時，結果精確但會讓程式變慢。
+        Python 3.12 以前只分析呼叫 start() 的執行緒（登入與查詢的背景執行緒）。
+    sampling：每 interval 秒擷取一次執行緒的呼叫堆疊，依出現次數估計各函式的耗時，負擔很低。
+        除呼叫 start() 的執行緒外也會取樣主執行緒，可看出 Tk 介面更新的耗時。
+
+    兩種模式都輸出 pstats 格式的 .prof 檔（可用 pstats、snakeviz 等工具開啟）與耗時最多函式的文字摘要。
+    """
+
+    def __init__(self, mode='cprofile', interval=0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支援的效能分析模式: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.started_at = None
+        self.elapsed = 0.0
+
+        # cprofile
+        self.profile = None
+        self.enabled = False
+
+        # sampling：(檔名, 行號, 函式) -> [取樣次數, 自身時間, 累計時間, {呼叫者: 次數}]
+        self.samples = {}
+        self.sample_count = 0
+        self.thread_ids = set()
+        self.sampler = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """開始分析目前執行緒"""
+        with self.lock:
+            if self.started_at is None:
+                self.started_at = time.perf_counter()
+            if self.mode == 'cprofile':
+                import cProfile
+                if self.profile is None:
+                    self.profile = cProfile.Profile()
+                if not self.enabled:
+                    self.profile.enable()
+                    self.enabled = True
+            else:
+                self.thread_ids.add(threading.get_ident())
+                if self.sampler is None:
+                    self.stop_event.clear()
+                    self.sampler = threading.Thread(target=self.sample_loop, name='run-profiler', daemon=True)
+                    self.sampler.start()
+
+    def stop(self):
+        """停止分析目前執行緒"""
+        with self.lock:
+            if self.started_at is not None:
+                self.elapsed += time.perf_counter() - self.started_at
+                self.started_at = None
+            if self.mode == 'cprofile':
+                if self.enabled:
+                    self.profile.disable()
+                    self.enabled = False
+                return
+            self.thread_ids.discard(threading.get_ident())
+            sampler = self.sampler if not self.thread_ids else None
+            if sampler:
+                self.sampler = None
+                self.stop_event.set()
+        if sampler:
+            sampler.join()
+
+    def sample_loop(self):
+        """取樣執行緒：以實際間隔作為每次取樣的權重"""
+        main_id = threading.main_thread().ident
+        last = time.perf_counter()
+        while not self.stop_event.wait(self.interval):
+            now = time.perf_counter()
+            weight = now - last
+            last = now
+            with self.lock:
+                thread_ids = self.thread_ids | {main_id}
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.add_sample(frame, weight)
+
+    @staticmethod
+    def frame_key(frame):
+        code = frame.f_code
+        return (code.co_filename, code.co_firstlineno, code.co_name)
+
+    def add_sample(self, frame, weight):
+        """記錄一個呼叫堆疊：最內層函式計入自身時間，堆疊中每個函式（遞迴只算一次）計入累計時間"""
+        stack = []
+        while frame is not None:
+            stack.append(self.frame_key(frame))
+            frame = frame.f_back
+
+        with self.lock:
+            self.sample_count += 1
+            seen = set()
+            for index, key in enumerate(stack):
+                entry = self.samples.get(key)
+                if entry is None:
+                    entry = self.samples[key] = [0, 0.0, 0.0, {}]
+                if index == 0:
+                    entry[1] += weight
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry[0] += 1
+                entry[2] += weight
+                if index + 1 < len(stack):
+                    caller = stack[index + 1]
+                    entry[3][caller] = entry[3].get(caller, 0) + 1
+
+    def sampling_stats(self):
+        """將取樣結果轉為 pstats 的格式 {函式: (原始呼叫數, 呼叫數, 自身時間, 累計時間, {呼叫者: (...)})}"""
+        with self.lock:
+            samples = {key: (entry[0], entry[1], entry[2], dict(entry[3])) for key, entry in self.samples.items()}
+        return {
+            key: (count, count, self_time, total_time,
+                  {caller: (calls, calls, 0.0, calls * self.interval) for caller, calls in callers.items()})
+            for key, (count, self_time, total_time, callers) in samples.items()
+        }
+
+    def write(self, output_folder, top=40, timestamp=None):
+        """
+        輸出 .prof 檔與文字摘要，並清除目前的分析資料（下一次查詢重新開始）
+
+        Returns:
+            tuple: (.prof 路徑, 摘要路徑)，沒有分析資料時回傳 None
+        """
+        self.stop()
+        # 判斷是否為 exe 執行環境
+        if getattr(sys, 'frozen', False):
+            base_path = os.path.dirname(sys.executable)
+        else:
+            base_path = os.path.dirname(os.path.abspath(__file__))
+        output_path = os.path.join(base_path, output_folder)
+        os.makedirs(output_path, exist_ok=True)
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        prof_file = os.path.join(output_path, f'效能分析_{timestamp}.prof')
+        summary_file = os.path.join(output_path, f'效能分析_{timestamp}.txt')
+
+        if self.mode == 'cprofile':
+            if self.profile is None:
+                return None
+            self.profile.dump_stats(prof_file)
+            header = f"模式: cProfile，分析時間 {self.elapsed:.1f} 秒"
+        else:
+            if not self.samples:
+                return None
+            with open(prof_file, 'wb') as f:
+                marshal.dump(self.sampling_stats(), f)
+            header = (f"模式: 取樣（間隔 {self.interval * 1000:.0f} ms），分析時間 {self.elapsed:.1f} 秒，"
+                      f"共 {self.sample_count} 個堆疊（呼叫數欄位為取樣次數）")
+
+        import pstats
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            f.write(header + '\n\n')
+            stats = pstats.Stats(prof_file, stream=f)
+            stats.strip_dirs()
+            f.write(f"依累計時間排序（前 {top} 名）\n")
+            stats.sort_stats('cumulative').print_stats(top)
+            f.write(f"依自身時間排序（前 {top} 名）\n")
+            stats.sort_stats('tottime').print_stats(top)
+
+        self.reset()
+        return prof_file, summary_file
+
+    def reset(self):
+        with self.lock:
+            self.profile = None
+            self.samples = {}
+            self.sample_count = 0
+            self.elapsed = 0.0
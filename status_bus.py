@@ -0,0 +1,100 @@
+import queue
+import tkinter as tk
+
+class StatusBus:
+    """
+    狀態訊息匯流排
+
+    任何執行緒都可以呼叫 publish() 送出訊息（不操作 Tk 元件），
+    由主執行緒以 root.after 定期批次寫入文字框，文字框只保留最近 max_lines 行，
+    完整訊息可另外寫入檔案。
+    """
+
+    def __init__(self, root, text_widget, max_lines=1000, log_file=None, interval=100, batch_size=500):
+        """
+        Args:
+            root: Tk 根視窗
+            text_widget: 顯示訊息的 Text / ScrolledText 元件
+            max_lines: 文字框最多保留的行數
+            log_file: 完整訊息的記錄檔路徑，為 None 時不寫入檔案
+            interval: 檢查新訊息的間隔（毫秒）
+            batch_size: 每次最多寫入的訊息數
+        """
+        self.root = root
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.log_file = log_file
+        self.interval = interval
+        self.batch_size = batch_size
+
+        # SimpleQueue 的 put 不需額外鎖定，適合多個執行緒同時送出訊息
+        self.queue = queue.SimpleQueue()
+        self.text_widget.tag_config('error', foreground='red')
+        self.after_id = self.root.after(self.interval, self.drain)
+
+    def publish(self, message, is_error=False, log_message=None):
+        """
+        送出一行訊息（可從任何執行緒呼叫）
+
+        Args:
+            message: 顯示在文字框的訊息
+            is_error: 是否以紅色顯示
+            log_message: 寫入記錄檔的訊息，預設與 message 相同
+        """
+        self.queue.put((message, is_error, log_message or message))
+
+    def drain(self):
+        """取出佇列中的訊息並一次寫入文字框（於主執行緒執行）"""
+        messages = []
+        try:
+            while len(messages) < self.batch_size:
+                messages.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if messages:
+            self.write_log_file(messages)
+            self.write_widget(messages)
+
+        # 仍有未處理的訊息時盡快繼續，避免積壓
+        delay = self.interval if self.queue.empty() else 1
+        self.after_id = self.root.after(delay, self.drain)
+
+    def write_widget(self, messages):
+        """以單次 insert 寫入多行訊息，並刪除超過上限的舊訊息"""
+        insert_args = []
+        for message, is_error, _ in messages:
+            insert_args.append(message.rstrip('\n') + '\n')
+            insert_args.append(('error',) if is_error else ())
+        self.text_widget.insert(tk.END, *insert_args)
+
+        # 文字框最後一定有一個換行，實際行數為最後位置的行號減一
+        line_count = int(self.text_widget.index('end-1c').split('.')[0]) - 1
+        if line_count > self.max_lines:
+            self.text_widget.delete('1.0', f'{line_count - self.max_lines + 1}.0')
+
+        self.text_widget.see(tk.END)
+
+    def write_log_file(self, messages):
+        """將完整訊息附加到記錄檔"""
+        if not self.log_file:
+            return
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.writelines(log_message.rstrip('\n') + '\n' for _, _, log_message in messages)
+        except OSError:
+            # 記錄檔寫入失敗不影響畫面顯示
+            pass
+
+    def stop(self):
+        """停止定期檢查，並寫入剩餘的訊息"""
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        remaining = []
+        try:
+            while True:
+                remaining.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        self.write_log_file(remaining)
@@ -0,0 +1,191 @@
+import time
+import logging
+import itertools
+from collections import deque
+from page_scripts import RESULT_READY_SCRIPT, READ_RESULT_SCRIPT
+
+class TabManager:
+    """
+    管理查詢期間的瀏覽器分頁
+
+    查詢結果開在固定的具名視窗（結果槽），每次送出查詢都沿用結果槽的分頁，
+    不再每個計畫開一個新分頁再關閉。結果槽數量即同時查詢的計畫數（depth），
+    讀取完一個結果槽後才會再用來送出下一個計畫，因此每個分頁同時只對應一個計畫編號。
+    查詢期間出現的其他分頁視為孤兒分頁，由 close_orphans() 關閉。
+    """
+
+    # 每個 TabManager 使用不同的視窗名稱，上一次查詢未關閉的結果分頁不會被誤用
+    instance_counter = itertools.count(1)
+
+    def __init__(self, driver, metrics=None, result_name='itouch_result', depth=1):
+        """
+        Args:
+            driver: selenium WebDriver
+            metrics: RunMetrics 物件，用於記錄開啟的分頁數
+            result_name: 結果視窗名稱的前綴
+            depth: 結果槽數量（同時查詢的計畫數）
+        """
+        self.driver = driver
+        self.metrics = metrics
+        instance = next(self.instance_counter)
+        self.name_prefix = f'{result_name}_{instance}'
+        self.slot_names = [f'{self.name_prefix}_{slot}' for slot in range(max(1, depth))]
+        self.retired_names = itertools.count(1)
+
+        self.input_handle = None
+        self.result_handles = {}  # 結果槽 -> 分頁 handle
+        self.free_slots = deque(range(len(self.slot_names)))
+        self.protected_handles = set()  # 開始查詢前已存在的分頁（入口網站、查詢系統），不主動關閉
+        self.known_handles = set()
+        self.open_counts = []
+
+    @property
+    def depth(self):
+        return len(self.slot_names)
+
+    def register_input_page(self):
+        """以目前分頁作為計畫編號輸入頁"""
+        self.input_handle = self.driver.current_window_handle
+        self.protected_handles = set(self.driver.window_handles)
+        self.known_handles = set(self.protected_handles)
+
+    def switch_to_input(self):
+        """切換回計畫編號輸入頁"""
+        if self.driver.current_window_handle != self.input_handle:
+            self.driver.switch_to.window(self.input_handle)
+
+    def acquire_slot(self):
+        """取得一個空閒的結果槽，沒有空閒時回傳 None"""
+        return self.free_slots.popleft() if self.free_slots else None
+
+    def slot_name(self, slot):
+        """結果槽的視窗名稱（作為查詢表單的 target）"""
+        return self.slot_names[slot]
+
+    def bind_slot(self, slot, timeout=5, poll_frequency=0.05):
+        """
+        送出查詢後，將新開啟的分頁對應到結果槽
+
+        只有視窗名稱等於結果槽名稱的新分頁才會對應到結果槽；其他新分頁（例如查詢失敗的計畫
+        較晚才開啟的結果分頁）視為孤兒分頁，於 close_orphans() 時關閉，避免讀到其他計畫的結果。
+        結果槽第一次使用時等待新分頁開啟；之後沿用同一個分頁，只檢查一次是否另開了新分頁。
+
+        Raises:
+            TimeoutError: 結果槽第一次使用時，超過等待時間仍未開啟分頁
+        """
+        name = self.slot_name(slot)
+        deadline = time.monotonic() + timeout
+        while True:
+            new_handles = [h for h in self.driver.window_handles if h not in self.known_handles]
+            if new_handles:
+                matched = None
+                for handle in new_handles:
+                    self.known_handles.add(handle)
+                    if self.window_name(handle) == name:
+                        matched = handle
+                # 讀取視窗名稱需切換分頁，檢查完切換回輸入頁
+                self.driver.switch_to.window(self.input_handle)
+                if matched:
+                    # 原本的分頁已關閉而重新開啟時改用新分頁
+                    self.result_handles[slot] = matched
+                    return matched
+            if slot in self.result_handles:
+                return self.result_handles[slot]
+            if time.monotonic() >= deadline:
+                raise TimeoutError("等待結果分頁開啟逾時")
+            time.sleep(poll_frequency)
+
+    def window_name(self, handle):
+        """讀取分頁的視窗名稱（會切換到該分頁），無法讀取時回傳 None"""
+        try:
+            self.driver.switch_to.window(handle)
+            return self.driver.execute_script('return window.name;')
+        except Exception as e:
+            logging.debug(f"讀取分頁名稱失敗: {str(e)}")
+            return None
+
+    def wait_for_result(self, slot, timeout=10, poll_frequency=0.1):
+        """
+        切換到結果槽的分頁，等待新的查詢結果取代已讀取的頁面
+
+        Returns:
+            str: 結果分頁的 handle
+
+        Raises:
+            TimeoutError: 超過等待時間仍未載入結果
+        """
+        handle = self.result_handles[slot]
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if self.driver.current_window_handle != handle:
+                    self.driver.switch_to.window(handle)
+                if self.driver.execute_script(RESULT_READY_SCRIPT):
+                    return handle
+            except Exception as e:
+                # 頁面載入中，下一輪重新確認
+                logging.debug(f"結果分頁尚未就緒: {str(e)}")
+
+            if time.monotonic() >= deadline:
+                raise TimeoutError("等待查詢結果逾時")
+            time.sleep(poll_frequency)
+
+    def read_result(self):
+        """讀取目前結果頁面的 HTML（單次往返），並標記為已讀取"""
+        return self.driver.execute_script(READ_RESULT_SCRIPT)
+
+    def release_slot(self, slot, keep_result=True):
+        """
+        歸還結果槽供下一個計畫使用
+
+        Args:
+            keep_result: 是否保留結果分頁；查詢失敗時應設為 False，
+                         分頁會於 close_orphans() 時關閉，避免逾時後才載入的結果被下一個計畫誤讀
+        """
+        if not keep_result:
+            self.result_handles.pop(slot, None)
+            # 結果槽改用新的視窗名稱，失敗的查詢較晚才開啟或載入的分頁不會再被對應到結果槽
+            self.slot_names[slot] = f'{self.name_prefix}_{slot}_{next(self.retired_names)}'
+        self.free_slots.append(slot)
+
+    def close_orphans(self):
+        """
+        關閉輸入頁、結果分頁與查詢前既有分頁以外的所有分頁，並切換回輸入頁
+
+        Returns:
+            int: 目前開啟的分頁數
+        """
+        keep = self.protected_handles | {self.input_handle} | set(self.result_handles.values())
+        for handle in self.driver.window_handles:
+            if handle not in keep:
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                except Exception as e:
+                    logging.warning(f"關閉分頁失敗: {str(e)}")
+        self.known_handles = set(self.driver.window_handles)
+        self.result_handles = {slot: handle for slot, handle in self.result_handles.items()
+                               if handle in self.known_handles}
+        # 目前分頁可能已被關閉，直接切換而不先查詢目前分頁
+        self.driver.switch_to.window(self.input_handle)
+        return self.record_open_count()
+
+    def record_open_count(self):
+        """記錄目前開啟的分頁數"""
+        count = len(self.driver.window_handles)
+        self.open_counts.append(count)
+        if self.metrics:
+            self.metrics.write({'type': 'tabs', 'plan': self.metrics.current_plan, 'open': count})
+        return count
+
+    def close_all(self):
+        """查詢結束時關閉所有結果分頁與孤兒分頁，切換回輸入頁"""
+        self.result_handles = {}
+        self.free_slots = deque(range(len(self.slot_names)))
+        return self.close_orphans()
+
+    def summary(self):
+        """回傳分頁數統計（最多、最後一次）"""
+        if not self.open_counts:
+            return None
+        return {'max_open': max(self.open_counts), 'last_open': self.open_counts[-1]}
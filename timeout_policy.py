@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import math
+import threading
+
+class TimeoutPolicy:
+    """
+    依實際觀察到的等待時間調整各步驟的逾時
+
+    每個步驟保留最近 max_samples 次等待所花的時間，逾時設為第 percentile 百分位數乘上 margin
+    再加上 padding，並限制在步驟的下限與上限之間：元素不存在時很快判定失敗，
+    伺服器尖峰時段變慢時則自動放寬。樣本不足 min_samples 時使用預設值。
+    等待逾時時以逾時值作為樣本（實際所需時間至少為此值），並將該步驟的逾時加倍（不超過上限），
+    之後每次成功等待減半一次，避免快速時段壓低逾時後，尖峰時段每次等待都逾時而無法回升。
+    樣本保存於 data/timeouts.json，下次啟動時沿用。
+    """
+
+    # 步驟 -> (預設逾時, 下限, 上限)，單位為秒
+    STEPS = {
+        'login': (10, 3, 30),       # 登入頁面與登入後的頁面
+        'page_load': (30, 10, 90),  # driver.get() 的頁面載入
+        'element': (5, 1, 15),      # 等待單一元素出現或可點擊
+        'selector': (3, 1, 10),     # 導航選單（多個定位器共用一次等待）
+        'window': (5, 1, 15),       # 等待新分頁開啟
+        'result': (10, 3, 60),      # 送出查詢到結果載入完成
+    }
+
+    # 逾時後的退避等級上限（逾時最多放大為 2 ** MAX_BACKOFF 倍，仍受步驟上限限制）
+    MAX_BACKOFF = 4
+
+    def __init__(self, file_path=None, percentile=95, margin=1.5, padding=0.5, min_samples=10, max_samples=200):
+        if file_path is None:
+            # 判斷是否為執行檔環境
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.abspath(__file__))
+            file_path = os.path.join(base_path, 'data', 'timeouts.json')
+
+        self.file_path = file_path
+        self.percentile = percentile
+        self.margin = margin
+        self.padding = padding
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples = self.load()
+        self.backoff = {}  # 步驟 -> 退避等級（只在本次執行期間有效）
+        self.dirty = False
+
+    def load(self):
+        """讀取保存的樣本，檔案不存在或格式錯誤時從頭開始"""
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {step: [float(value) for value in values][-self.max_samples:]
+                    for step, values in data.get('samples', {}).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+
+    def save(self):
+        """保存樣本（先寫入暫存檔再取代）"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'samples': {step: [round(value, 3) for value in values]
+                                for step, values in self.samples.items()}}
+            self.dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            temp_path = f'{self.file_path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.file_path)
+        except OSError:
+            pass
+
+    def record(self, step, seconds, timed_out=False):
+        """
+        記錄一次等待所花的時間
+
+        Args:
+            step: 步驟名稱
+            seconds: 等待的秒數，逾時時為當次使用的逾時
+            timed_out: 是否逾時，逾時時提高退避等級，成功時降低一級
+        """
+        with self.lock:
+            values = self.samples.setdefault(step, [])
+            values.append(seconds)
+            del values[:-self.max_samples]
+            level = self.backoff.get(step, 0)
+            self.backoff[step] = min(level + 1, self.MAX_BACKOFF) if timed_out else max(level - 1, 0)
+            self.dirty = True
+
+    def get(self, step):
+        """取得步驟目前的逾時（秒）"""
+        default, floor, cap = self.STEPS[step]
+        with self.lock:
+            values = sorted(self.samples.get(step, []))
+            level = self.backoff.get(step, 0)
+        if len(values) < self.min_samples:
+            timeout = default
+        else:
+            rank = max(1, math.ceil(len(values) * self.percentile / 100))
+            timeout = values[rank - 1] * self.margin + self.padding
+        return min(max(timeout, floor) * 2 ** level, cap)
+
+    def describe(self):
+        """回傳各步驟目前的逾時，供顯示或記錄"""
+        return {step: round(self.get(step), 2) for step in self.STEPS}
@@ -0,0 +1,108 @@
+import time
+import threading
+
+class WebDriverProfiler:
+    """
+    WebDriver 指令計數與計時（預設關閉，供除錯與效能分析使用）
+
+    selenium 的每個操作（find_element、click、get_attribute、switch_to.window、page_source…）
+    最後都會呼叫 driver.execute() 對 chromedriver 送出一次 HTTP 請求，
+    因此只需替換該瀏覽器物件的 execute() 即可統計所有往返次數與耗時。
+    統計依 RunMetrics 目前的階段與計畫編號分組。
+    """
+
+    def __init__(self, metrics=None):
+        """
+        Args:
+            metrics: RunMetrics 物件，用於取得目前的階段與計畫編號，並寫入統計紀錄
+        """
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.stats = {}  # (階段, 計畫編號, 指令) -> [次數, 總耗時]
+
+    def attach(self, driver):
+        """替換瀏覽器物件的 execute()，重複呼叫時不會重複包裝"""
+        if getattr(driver, '_profiler', None) is self:
+            return driver
+
+        original_execute = driver.execute
+
+        def execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return original_execute(driver_command, params)
+            finally:
+                self.record(driver_command, time.perf_counter() - start)
+
+        driver.execute = execute
+        driver._profiler = self
+        return driver
+
+    def record(self, command, seconds):
+        """記錄一次 WebDriver 指令"""
+        phase = self.metrics.current_phase if self.metrics else None
+        plan_code = self.metrics.current_plan if self.metrics else None
+        key = (phase, plan_code, command)
+        with self.lock:
+            entry = self.stats.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def _group(self, stats, index):
+        """依鍵值的某一欄彙總次數與耗時"""
+        grouped = {}
+        for key, (count, seconds) in stats.items():
+            entry = grouped.setdefault(key[index], [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        return grouped
+
+    def summarize(self):
+        """
+        彙總目前的統計並清空，同時寫入 RunMetrics 的紀錄檔
+
+        Returns:
+            dict: total（總往返次數）、seconds、by_command、by_phase、by_plan，
+                  各分組為 {名稱: {'count': 次數, 'seconds': 總耗時}}
+        """
+        with self.lock:
+            stats = self.stats
+            self.stats = {}
+
+        def to_dict(grouped):
+            # 不在任何階段內的指令歸類為「其他」
+            return {str(name) if name is not None else '其他': {'count': count, 'seconds': round(seconds, 4)}
+                    for name, (count, seconds) in grouped.items()}
+
+        summary = {
+            'total': sum(count for count, _ in stats.values()),
+            'seconds': round(sum(seconds for _, seconds in stats.values()), 4),
+            'by_command': to_dict(self._group(stats, 2)),
+            'by_phase': to_dict(self._group(stats, 0)),
+            'by_plan': to_dict({plan: value for plan, value in self._group(stats, 1).items() if plan is not None})
+        }
+        if self.metrics:
+            self.metrics.write({'type': 'webdriver', **summary})
+        return summary
+
+    @staticmethod
+    def format_summary(summary, top=5):
+        """將彙總結果轉為狀態訊息，列出耗時最多的指令與階段"""
+        if not summary['total']:
+            return []
+
+        def worst(grouped):
+            return sorted(grouped.items(), key=lambda item: item[1]['seconds'], reverse=True)[:top]
+
+        lines = [f"WebDriver 指令共 {summary['total']} 次，耗時 {summary['seconds']:.1f} 秒"]
+        plans = summary['by_plan']
+        if plans:
+            average = sum(stats['count'] for stats in plans.values()) / len(plans)
+            lines.append(f"  平均每個計畫 {average:.1f} 次")
+        for name, stats in worst(summary['by_command']):
+            lines.append(f"  指令 {name}: {stats['count']} 次，{stats['seconds']:.2f} 秒")
+        for name, stats in worst(summary['by_phase']):
+            lines.append(f"  階段 {name}: {stats['count']} 次，{stats['seconds']:.2f} 秒")
+        for name, stats in worst(plans):
+            lines.append(f"  計畫 {name}: {stats['count']} 次，{stats['seconds']:.2f} 秒")
+        return lines